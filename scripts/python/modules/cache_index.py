@@ -0,0 +1,256 @@
+import json
+import os
+import sqlite3
+import time
+from collections import namedtuple
+from contextlib import closing
+
+FOOTPRINT_DB_NAME = "cache_footprint.sqlite"
+
+# file_count: 文件数量; total_bytes: 字节数; newest_mtime_ns: 最新文件的修改时间,没有文件时为0
+FolderFootprint = namedtuple(
+    "FolderFootprint", ("file_count", "total_bytes", "newest_mtime_ns")
+)
+
+
+def get_default_footprint_path() -> str:
+    """
+    数据库按项目放在$JOB下,同一项目的所有会话共用;
+    没有$JOB时放在$HOUDINI_USER_PREF_DIR,都没有时(例如在普通python中)放在用户目录
+    """
+    base_dir = (
+        os.environ.get("JOB")
+        or os.environ.get("HOUDINI_USER_PREF_DIR")
+        or os.path.expanduser("~")
+    )
+    return os.path.join(base_dir, FOOTPRINT_DB_NAME).replace(os.sep, "/")
+
+
+class CacheFootprintIndex:
+    """
+    持久化的缓存文件夹占用统计
+
+    每个文件夹(包括子文件夹)记录一行:文件夹mtime、直接包含的文件数量、字节数、最新文件的mtime和子文件夹名称。
+    重新统计时仍然对每个文件夹调用一次stat,mtime未变化时直接使用记录,
+    只有mtime变化(增加、删除、重命名了文件)的文件夹才重新列举并stat其中的文件;
+    原地覆盖已有文件不会改变文件夹mtime,因此超过REFRESH_AFTER_SECONDS的记录也会重新列举。
+    帧序列统计按(文件夹, 帧序列正则)另外记录每帧的字节数,使用同样的mtime判断。
+    数据库使用WAL模式,多个会话可以同时读取,写入时不阻塞读取
+    """
+
+    REFRESH_AFTER_SECONDS = 24 * 3600
+
+    def __init__(self, in_db_path: str = None) -> None:
+        self.db_path = in_db_path or get_default_footprint_path()
+        self._init_db_()
+
+    def _connect_(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _init_db_(self):
+        with closing(self._connect_()) as conn:
+            # WAL模式会记录在数据库文件中;文件系统不支持时(部分网络存储)保持默认日志模式
+            try:
+                conn.execute("PRAGMA journal_mode = WAL")
+            except sqlite3.DatabaseError as error:
+                print(f"Fail To Enable WAL For {self.db_path}: {error}")
+            with conn:
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS dirs (
+                        path TEXT PRIMARY KEY,
+                        mtime_ns INTEGER NOT NULL,
+                        file_count INTEGER NOT NULL,
+                        total_bytes INTEGER NOT NULL,
+                        newest_mtime_ns INTEGER NOT NULL,
+                        children TEXT NOT NULL,
+                        scanned_at REAL NOT NULL
+                    )
+                    """
+                )
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS frames (
+                        path TEXT NOT NULL,
+                        frame_regex TEXT NOT NULL,
+                        mtime_ns INTEGER NOT NULL,
+                        frame_sizes TEXT NOT NULL,
+                        newest_mtime_ns INTEGER NOT NULL,
+                        scanned_at REAL NOT NULL,
+                        PRIMARY KEY (path, frame_regex)
+                    )
+                    """
+                )
+
+    def get_footprint(
+        self, in_folder_path: str, in_force_rescan: bool = False
+    ) -> FolderFootprint:
+        """
+        返回文件夹(递归)的文件数量、字节数和最新修改时间,只重新列举有变化的文件夹;
+        文件夹不存在时返回全0并删除对应记录
+
+        :param in_folder_path: 文件夹路径,通常是缓存的版本文件夹
+        :param in_force_rescan: 忽略记录,重新列举全部文件夹并更新记录;
+            用于可能被原地覆盖(文件夹mtime不变)的当前版本
+        :rtype: FolderFootprint
+        """
+        root = os.path.abspath(in_folder_path).replace(os.sep, "/").rstrip("/") or "/"
+        now = time.time()
+        with closing(self._connect_()) as conn:
+            # 先一次读出该文件夹下的全部记录,列举文件夹时不占用数据库
+            cached = {
+                record[0]: record[1:]
+                for record in conn.execute(
+                    "SELECT path, mtime_ns, file_count, total_bytes, newest_mtime_ns, "
+                    "children, scanned_at FROM dirs WHERE path = ? OR (path >= ? AND path < ?)",
+                    self._subtree_range_(root),
+                )
+            }
+            file_count = total_bytes = newest_mtime_ns = 0
+            updates = []
+            visited = set()
+            pending_dirs = [root]
+            while pending_dirs:
+                dir_path = pending_dirs.pop()
+                try:
+                    mtime_ns = os.stat(dir_path).st_mtime_ns
+                except OSError:
+                    continue
+                visited.add(dir_path)
+                record = cached.get(dir_path)
+                if (
+                    not in_force_rescan
+                    and record is not None
+                    and record[0] == mtime_ns
+                    and now - record[5] < self.REFRESH_AFTER_SECONDS
+                ):
+                    dir_footprint = FolderFootprint(*record[1:4])
+                    children = json.loads(record[4])
+                else:
+                    dir_footprint, children = self._scan_dir_(dir_path)
+                    updates.append(
+                        (dir_path, mtime_ns)
+                        + tuple(dir_footprint)
+                        + (json.dumps(children), now)
+                    )
+                file_count += dir_footprint.file_count
+                total_bytes += dir_footprint.total_bytes
+                newest_mtime_ns = max(newest_mtime_ns, dir_footprint.newest_mtime_ns)
+                pending_dirs.extend(
+                    f"{dir_path.rstrip('/')}/{child}" for child in children
+                )
+            removed_paths = [(path,) for path in cached if path not in visited]
+            if updates or removed_paths:
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO dirs (path, mtime_ns, file_count, total_bytes, "
+                        "newest_mtime_ns, children, scanned_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        updates,
+                    )
+                    conn.executemany("DELETE FROM dirs WHERE path = ?", removed_paths)
+        return FolderFootprint(file_count, total_bytes, newest_mtime_ns)
+
+    def get_frame_sizes(
+        self,
+        in_folder_path: str,
+        in_frame_regex: str,
+        in_scanner,
+        in_force_rescan: bool = False,
+    ) -> tuple:
+        """
+        返回文件夹中帧序列的({帧号: 字节数}, 最新一帧的修改时间),文件夹mtime未变化时使用记录,
+        否则调用in_scanner重新列举;文件夹不存在时返回None并删除对应记录
+
+        :param in_scanner: 回调(文件夹路径, 帧序列正则) -> 同样格式的结果或None,
+            通常是cache_utils.scan_frame_files
+        :param in_force_rescan: 忽略记录,重新列举并更新记录,见get_footprint
+        :rtype: tuple
+        """
+        folder_path = os.path.abspath(in_folder_path).replace(os.sep, "/").rstrip("/") or "/"
+        with closing(self._connect_()) as conn:
+            try:
+                mtime_ns = os.stat(folder_path).st_mtime_ns
+            except OSError:
+                with conn:
+                    conn.execute(
+                        "DELETE FROM frames WHERE path = ? AND frame_regex = ?",
+                        (folder_path, in_frame_regex),
+                    )
+                return None
+            record = conn.execute(
+                "SELECT mtime_ns, frame_sizes, newest_mtime_ns, scanned_at FROM frames "
+                "WHERE path = ? AND frame_regex = ?",
+                (folder_path, in_frame_regex),
+            ).fetchone()
+            now = time.time()
+            if (
+                not in_force_rescan
+                and record is not None
+                and record[0] == mtime_ns
+                and now - record[3] < self.REFRESH_AFTER_SECONDS
+            ):
+                # json的key只能是字符串,帧号按[帧号, 字节数]列表保存
+                return dict(json.loads(record[1])), record[2]
+            scan_result = in_scanner(folder_path, in_frame_regex)
+            if scan_result is None:
+                return None
+            frame_sizes, newest_mtime_ns = scan_result
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO frames (path, frame_regex, mtime_ns, frame_sizes, "
+                    "newest_mtime_ns, scanned_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        folder_path,
+                        in_frame_regex,
+                        mtime_ns,
+                        json.dumps(sorted(frame_sizes.items())),
+                        newest_mtime_ns,
+                        now,
+                    ),
+                )
+        return frame_sizes, newest_mtime_ns
+
+    def _scan_dir_(self, in_dir_path: str) -> tuple:
+        """
+        列举单个文件夹,返回(FolderFootprint, 子文件夹名称列表),不跟随符号链接
+        """
+        file_count = total_bytes = newest_mtime_ns = 0
+        children = []
+        try:
+            with os.scandir(in_dir_path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            children.append(entry.name)
+                        elif entry.is_file(follow_symlinks=False):
+                            entry_stat = entry.stat(follow_symlinks=False)
+                            file_count += 1
+                            total_bytes += entry_stat.st_size
+                            newest_mtime_ns = max(newest_mtime_ns, entry_stat.st_mtime_ns)
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        children.sort()
+        return FolderFootprint(file_count, total_bytes, newest_mtime_ns), children
+
+    def _subtree_range_(self, in_root: str) -> tuple:
+        # "/"的下一个字符是"0",[root/, root0)正好是root下的所有路径,可以使用主键索引
+        return (in_root, in_root.rstrip("/") + "/", in_root.rstrip("/") + "0")
+
+    def forget(self, in_folder_path: str):
+        """
+        删除文件夹及其子文件夹的记录,用于删除缓存之后
+        """
+        root = os.path.abspath(in_folder_path).replace(os.sep, "/").rstrip("/") or "/"
+        with closing(self._connect_()) as conn, conn:
+            for table in ("dirs", "frames"):
+                conn.execute(
+                    f"DELETE FROM {table} WHERE path = ? OR (path >= ? AND path < ?)",
+                    self._subtree_range_(root),
+                )
+
+    def clear(self):
+        with closing(self._connect_()) as conn, conn:
+            conn.execute("DELETE FROM dirs")
+            conn.execute("DELETE FROM frames")
@@ -0,0 +1,150 @@
+"""
+缓存节点注册表:节点类型 -> 输出路径参数和版本参数,供tools.CacheManager查找场景中所有写文件的节点
+
+可以通过环境变量CACHE_NODE_REGISTRY追加或覆盖节点类型,值为一个或多个json文件(以os.pathsep分隔):
+
+    [
+        {"category": "Sop", "type": "studio::cache::1.0", "output": "file", "version": "version"},
+        {"category": "Driver", "type": "opengl", "output": "picture", "version": null}
+    ]
+
+category为hou.nodeTypeCategories()中的名称(Sop、Dop、Driver、Lop、Cop2等),
+version为null时表示该节点没有版本参数;当前Houdini中不存在的节点类型会被忽略
+"""
+import json
+import os
+from collections import namedtuple
+
+import hou
+
+REGISTRY_ENV = "CACHE_NODE_REGISTRY"
+
+CacheNodeEntry = namedtuple(
+    "CacheNodeEntry", ("category", "type_name", "output_parm", "version_parm")
+)
+
+# 顺序即优先级:带版本的文件缓存节点在前,其内部的ROP与外层节点重复时保留外层节点
+DEFAULT_CACHE_NODE_ENTRIES = (
+    CacheNodeEntry("Sop", "filecache::2.0", "file", "version"),
+    CacheNodeEntry("Sop", "filecache", "file", "version"),
+    # 旧版本CACHE_NODES中的节点,在Sop、Dop和Driver中查找
+    *(
+        CacheNodeEntry(category, type_name, output_parm, "version")
+        for type_name, output_parm in (
+            ("rop_geometry", "sopoutput"),
+            ("rop_alembic", "filename"),
+            ("rop_fbx", "sopoutput"),
+            ("rop_dop", "dopoutput"),
+        )
+        for category in ("Sop", "Dop", "Driver")
+    ),
+    CacheNodeEntry("Driver", "geometry", "sopoutput", "version"),
+    CacheNodeEntry("Driver", "alembic", "filename", "version"),
+    CacheNodeEntry("Driver", "filmboxfbx", "sopoutput", "version"),
+    CacheNodeEntry("Driver", "dop", "dopoutput", "version"),
+    # USD
+    CacheNodeEntry("Lop", "usd_rop", "lopoutput", "version"),
+    CacheNodeEntry("Driver", "usd", "lopoutput", "version"),
+    CacheNodeEntry("Lop", "usdrender_rop", "outputimage", "version"),
+    CacheNodeEntry("Driver", "usdrender", "outputimage", "version"),
+    # 渲染和图片输出
+    CacheNodeEntry("Lop", "karma", "picture", "version"),
+    CacheNodeEntry("Driver", "karma", "picture", "version"),
+    CacheNodeEntry("Driver", "ifd", "vm_picture", "version"),
+    CacheNodeEntry("Driver", "opengl", "picture", "version"),
+    CacheNodeEntry("Driver", "comp", "copoutput", "version"),
+    CacheNodeEntry("Cop2", "rop_comp", "copoutput", "version"),
+)
+
+
+def load_registry(in_config_paths=None) -> tuple:
+    """
+    返回默认注册表加上配置文件中的节点类型,相同category和type的条目以后加载的为准
+
+    :param in_config_paths: json文件路径列表,默认读取环境变量CACHE_NODE_REGISTRY
+    :rtype: tuple
+    """
+    if in_config_paths is None:
+        in_config_paths = [
+            path for path in os.environ.get(REGISTRY_ENV, "").split(os.pathsep) if path
+        ]
+    entries = {
+        (entry.category, entry.type_name): entry for entry in DEFAULT_CACHE_NODE_ENTRIES
+    }
+    for config_path in in_config_paths:
+        try:
+            with open(config_path, "r", encoding="utf-8") as config_file:
+                config_entries = json.load(config_file)
+            for config_entry in config_entries:
+                entry = CacheNodeEntry(
+                    config_entry["category"],
+                    config_entry["type"],
+                    config_entry["output"],
+                    config_entry.get("version", "version"),
+                )
+                # 覆盖已有条目时保持原来的优先级
+                entries[(entry.category, entry.type_name)] = entry
+        except (OSError, ValueError, TypeError, KeyError) as error:
+            print(f"Fail To Load Cache Node Registry {config_path}: {error}")
+    return tuple(entries.values())
+
+
+class CacheNodeDiscovery:
+    """
+    按注册表查找场景中的缓存节点:每个注册的节点类型调用一次instances(),不遍历整个场景;
+    只缓存从注册表解析出的hou.NodeType,每次查找都重新调用instances(),不会漏掉新建的节点
+    """
+
+    def __init__(self, in_entries=None) -> None:
+        self.entries = tuple(in_entries) if in_entries is not None else load_registry()
+        # [(hou.NodeType, CacheNodeEntry)],None表示需要重新解析
+        self._node_types: list = None
+
+    def discover(self, in_force: bool = False) -> list:
+        """
+        返回[(节点, CacheNodeEntry)],in_force为True时重新读取注册表并重新解析节点类型
+        """
+        if in_force:
+            self.entries = load_registry()
+            self._node_types = None
+        if self._node_types is None:
+            self._node_types = self._resolve_node_types_()
+        try:
+            return self._collect_instances_()
+        except hou.ObjectWasDeleted:
+            # 卸载HDA后缓存的节点类型失效
+            self._node_types = self._resolve_node_types_()
+            return self._collect_instances_()
+
+    def _collect_instances_(self) -> list:
+        nodes = []
+        for node_type, entry in self._node_types:
+            nodes.extend((node, entry) for node in node_type.instances())
+        return nodes
+
+    def _resolve_node_types_(self) -> list:
+        # 当前Houdini中不存在的节点类型跳过;之后安装的HDA需要强制重新解析
+        node_types = []
+        categories = hou.nodeTypeCategories()
+        for entry in self.entries:
+            category = categories.get(entry.category)
+            if category is None:
+                continue
+            node_type = hou.nodeType(category, entry.type_name)
+            if node_type is None:
+                continue
+            node_types.append((node_type, entry))
+        return node_types
+
+
+_CACHE_NODE_DISCOVERY: CacheNodeDiscovery = None
+
+
+def get_cache_node_discovery() -> CacheNodeDiscovery:
+    """
+    每个会话共用一个查找器,注册表和节点类型只解析一次
+    """
+    global _CACHE_NODE_DISCOVERY
+    if _CACHE_NODE_DISCOVERY is None:
+        _CACHE_NODE_DISCOVERY = CacheNodeDiscovery()
+    return _CACHE_NODE_DISCOVERY
@@ -0,0 +1,290 @@
+"""
+缓存文件夹统计工具,不依赖hou,供tools.CacheManager使用
+"""
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import modules.cache_index as cache_index
+
+# 两帧文件名中不同的数字段即为帧号
+DIGIT_RUN_PATTERN = re.compile(r"(\d+)")
+VERSION_FOLDER_PATTERN = re.compile(r"v\d+")
+
+# frame_count: 帧数量; first_frame/last_frame: 首尾帧; missing_frames: 范围内缺失的整数帧;
+# total_bytes/min_bytes/max_bytes/mean_bytes: 帧文件大小统计; newest_mtime_ns: 最新一帧的修改时间
+FrameSequenceInfo = namedtuple(
+    "FrameSequenceInfo",
+    (
+        "frame_count",
+        "first_frame",
+        "last_frame",
+        "missing_frames",
+        "total_bytes",
+        "min_bytes",
+        "max_bytes",
+        "mean_bytes",
+        "newest_mtime_ns",
+    ),
+)
+
+
+def build_frame_regex(
+    in_frame_name: str, in_next_frame_name: str, in_version_name: str = None
+) -> str:
+    """
+    比较输出参数在相邻两帧展开后的文件名,把不同的数字段替换为帧号,返回匹配整个文件名的正则,
+    第一个帧号为frame分组;两个文件名相同(没有帧号)或不只是数字不同时返回None
+
+    :param in_frame_name: 起始帧的文件名
+    :param in_next_frame_name: 下一帧的文件名
+    :param in_version_name: 当前版本文件夹名(例如v3),文件名中出现时替换为任意版本号,
+        同一个正则可以用于所有版本文件夹
+    :rtype: str
+    """
+    frame_parts = DIGIT_RUN_PATTERN.split(in_frame_name)
+    next_parts = DIGIT_RUN_PATTERN.split(in_next_frame_name)
+    if len(frame_parts) != len(next_parts):
+        return None
+    parts = []
+    literal = ""
+    b_has_frame = False
+    # split结果中奇数位置是数字段
+    for index, (frame_part, next_part) in enumerate(zip(frame_parts, next_parts)):
+        if frame_part == next_part:
+            literal += frame_part
+            continue
+        if index % 2 == 0:
+            return None
+        parts.append(_escape_with_version_(literal, in_version_name))
+        literal = ""
+        # 以0开头的是补零的帧号,至少保持相同位数
+        if frame_part.startswith("0") and len(frame_part) == len(next_part):
+            frame_regex = rf"\d{{{len(frame_part)},}}"
+        else:
+            frame_regex = r"\d+"
+        parts.append(frame_regex if b_has_frame else f"(?P<frame>{frame_regex})")
+        b_has_frame = True
+    if not b_has_frame:
+        return None
+    parts.append(_escape_with_version_(literal, in_version_name))
+    return "".join(parts)
+
+
+def _escape_with_version_(in_text: str, in_version_name: str) -> str:
+    if not in_version_name or not VERSION_FOLDER_PATTERN.fullmatch(in_version_name):
+        return re.escape(in_text)
+    return r"v\d+".join(re.escape(part) for part in in_text.split(in_version_name))
+
+
+def scan_frame_files(in_folder_path: str, in_frame_regex: str) -> tuple:
+    """
+    用一次os.scandir统计文件夹中与正则匹配的帧文件,不逐帧拼接路径调用stat;
+    文件大小和修改时间来自DirEntry.stat,Windows上由列举结果直接提供,
+    POSIX上每个匹配文件仍有一次lstat系统调用(在C中完成并缓存在DirEntry上)
+
+    :param in_frame_regex: build_frame_regex返回的正则
+    :return: ({帧号: 字节数}, 最新一帧的修改时间),文件夹不存在时返回None
+    :rtype: tuple
+    """
+    frame_pattern = re.compile(in_frame_regex)
+    frame_sizes = {}
+    newest_mtime_ns = 0
+    try:
+        with os.scandir(in_folder_path) as entries:
+            for entry in entries:
+                match = frame_pattern.fullmatch(entry.name)
+                if match is None:
+                    continue
+                try:
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    entry_stat = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                frame = float(match.group("frame"))
+                frame = int(frame) if frame.is_integer() else frame
+                frame_sizes[frame] = frame_sizes.get(frame, 0) + entry_stat.st_size
+                newest_mtime_ns = max(newest_mtime_ns, entry_stat.st_mtime_ns)
+    except OSError:
+        return None
+    return frame_sizes, newest_mtime_ns
+
+
+def inspect_frame_sequence(
+    in_folder_path: str,
+    in_frame_regex: str,
+    in_frame_range: tuple = None,
+    in_footprint_index: cache_index.CacheFootprintIndex = None,
+    in_force_rescan: bool = False,
+) -> FrameSequenceInfo:
+    """
+    统计文件夹中的帧序列,见scan_frame_files
+
+    :param in_frame_regex: build_frame_regex返回的正则
+    :param in_frame_range: 节点设置的(起始帧, 结束帧, 间隔),提供时按该范围计算缺失帧,
+        否则使用实际的首尾帧,间隔取相邻帧号差的最大公约数
+    :param in_footprint_index: 提供时文件夹mtime未变化则直接使用记录的帧信息,不重新列举
+    :param in_force_rescan: 总是重新列举并更新记录,用于可能正在写入或被原地覆盖的当前版本
+    :return: 文件夹不存在时返回None
+    :rtype: FrameSequenceInfo
+    """
+    scan_result = None
+    if in_footprint_index is not None:
+        try:
+            scan_result = in_footprint_index.get_frame_sizes(
+                in_folder_path, in_frame_regex, scan_frame_files, in_force_rescan
+            )
+        except sqlite3.Error as error:
+            print(f"Fail To Use Cache Footprint Index For {in_folder_path}: {error}")
+            in_footprint_index = None
+    if in_footprint_index is None:
+        scan_result = scan_frame_files(in_folder_path, in_frame_regex)
+    if scan_result is None:
+        return None
+    frame_sizes, newest_mtime_ns = scan_result
+    if not frame_sizes:
+        return FrameSequenceInfo(0, None, None, [], 0, 0, 0, 0.0, 0)
+    first_frame = min(frame_sizes)
+    last_frame = max(frame_sizes)
+    if in_frame_range is not None:
+        range_start, range_end, range_step = in_frame_range
+    else:
+        integer_frames = sorted(int(frame) for frame in frame_sizes)
+        range_step = 0
+        for previous_frame, frame in zip(integer_frames, integer_frames[1:]):
+            range_step = math.gcd(range_step, frame - previous_frame)
+        range_start, range_end = first_frame, last_frame
+    missing_frames = [
+        frame
+        for frame in range(int(range_start), int(range_end) + 1, max(1, int(range_step)))
+        if frame not in frame_sizes
+    ]
+    sizes = frame_sizes.values()
+    total_bytes = sum(sizes)
+    return FrameSequenceInfo(
+        len(frame_sizes),
+        first_frame,
+        last_frame,
+        missing_frames,
+        total_bytes,
+        min(sizes),
+        max(sizes),
+        total_bytes / len(frame_sizes),
+        newest_mtime_ns,
+    )
+
+
+def format_frame_ranges(in_frames) -> str:
+    """
+    把整数帧列表压缩为"1001-1010, 1015"形式
+    """
+    ranges = []
+    for frame in sorted(in_frames):
+        if ranges and frame == ranges[-1][1] + 1:
+            ranges[-1][1] = frame
+        else:
+            ranges.append([frame, frame])
+    return ", ".join(
+        str(start) if start == end else f"{start}-{end}" for start, end in ranges
+    )
+
+
+def get_folder_size(in_folder_path: str) -> int:
+    """
+    递归统计文件夹中所有文件的字节数,使用os.scandir返回的DirEntry,
+    不再对每个文件拼接路径后单独调用getsize;不跟随符号链接,无法访问的子文件夹跳过
+
+    :param in_folder_path: 文件夹路径
+    :return: 字节数,文件夹不存在时为0
+    :rtype: int
+    """
+    folder_size = 0
+    pending_dirs = [in_folder_path]
+    while pending_dirs:
+        try:
+            with os.scandir(pending_dirs.pop()) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending_dirs.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            folder_size += entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return folder_size
+
+
+class FolderSizeEngine:
+    """
+    并行统计多个文件夹的大小,结果在对象生命周期内缓存;
+    每次扫描场景创建一个新对象,同一次扫描中重复查询的文件夹只统计一次;
+    提供cache_index.CacheFootprintIndex时只重新列举有变化的子文件夹;
+    add_fresh_paths标记的文件夹(各节点的当前版本)总是重新列举,不使用记录
+    """
+
+    def __init__(
+        self,
+        in_max_workers: int = None,
+        in_footprint_index: cache_index.CacheFootprintIndex = None,
+    ) -> None:
+        # 统计主要在等待文件系统,线程数可以多于CPU数量
+        self.max_workers = in_max_workers or min(32, (os.cpu_count() or 1) * 4)
+        self.footprint_index = in_footprint_index
+        self._sizes: dict = {}
+        # 不使用记录的文件夹,normpath后的路径
+        self._fresh_paths: set = set()
+        self._lock = threading.Lock()
+
+    def add_fresh_paths(self, in_folder_paths):
+        """
+        标记需要重新列举的文件夹,原地覆盖文件不会改变文件夹mtime,记录中的大小可能过期
+        """
+        with self._lock:
+            self._fresh_paths.update(os.path.normpath(path) for path in in_folder_paths)
+
+    def _measure_(self, in_folder_path: str) -> int:
+        if self.footprint_index is not None:
+            try:
+                with self._lock:
+                    b_fresh = os.path.normpath(in_folder_path) in self._fresh_paths
+                return self.footprint_index.get_footprint(
+                    in_folder_path, in_force_rescan=b_fresh
+                ).total_bytes
+            except sqlite3.Error as error:
+                # 数据库被长时间锁定或损坏时直接统计
+                print(f"Fail To Use Cache Footprint Index For {in_folder_path}: {error}")
+        return get_folder_size(in_folder_path)
+
+    def get_sizes(self, in_folder_paths) -> dict:
+        """
+        返回{文件夹路径: 字节数},未缓存的文件夹在线程池中并行统计
+        """
+        folder_paths = list(dict.fromkeys(in_folder_paths))
+        with self._lock:
+            missing_paths = [path for path in folder_paths if path not in self._sizes]
+        if len(missing_paths) == 1:
+            sizes = [self._measure_(missing_paths[0])]
+        elif missing_paths:
+            with ThreadPoolExecutor(
+                max_workers=min(self.max_workers, len(missing_paths))
+            ) as executor:
+                sizes = list(executor.map(self._measure_, missing_paths))
+        else:
+            sizes = []
+        with self._lock:
+            self._sizes.update(zip(missing_paths, sizes))
+            return {path: self._sizes[path] for path in folder_paths}
+
+    def get_size(self, in_folder_path: str) -> int:
+        return self.get_sizes((in_folder_path,))[in_folder_path]
+
+    def clear(self):
+        with self._lock:
+            self._sizes.clear()
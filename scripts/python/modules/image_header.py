@@ -0,0 +1,253 @@
+"""
+只读取文件头获取图片信息,不解码像素,支持PNG、JPEG、TIFF(包括tx)、EXR和TGA
+"""
+import os
+import struct
+from collections import namedtuple
+
+# format: png/jpeg/tiff/exr/tga
+# channels: 通道数量; bit_depth: 每个通道的位数; is_float: 是否为浮点数据
+# color_space: 文件头提示的颜色空间,"srgb"、"linear",无法判断时为None
+ImageHeader = namedtuple(
+    "ImageHeader",
+    ("format", "width", "height", "channels", "bit_depth", "is_float", "color_space"),
+)
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+EXR_MAGIC = b"\x76\x2f\x31\x01"
+# PNG color type -> 通道数量
+PNG_CHANNELS = {0: 1, 2: 3, 3: 3, 4: 2, 6: 4}
+# gAMA记录的是gamma*100000,1/2.2约为45455,线性为100000
+PNG_LINEAR_GAMMA = 100000
+# JPEG中表示帧头的SOF标记,不包括DHT(C4)、JPG(C8)和DAC(CC)
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# EXR channel pixel type -> (位数, 是否浮点)
+EXR_PIXEL_TYPES = {0: (32, False), 1: (16, True), 2: (32, True)}
+# EXR头中单个属性允许的最大字节数,防止损坏的文件读取过多数据
+EXR_MAX_ATTRIBUTE_SIZE = 1 << 20
+
+
+def probe_image_header(in_path: str):
+    """
+    读取图片文件头,格式不支持或文件头损坏时返回None,文件无法打开时抛出OSError
+
+    :param in_path: 图片路径
+    :rtype: ImageHeader | None
+    """
+    with open(in_path, "rb") as image_file:
+        magic = image_file.read(8)
+        image_file.seek(0)
+        try:
+            if magic.startswith(PNG_SIGNATURE):
+                return _read_png_header_(image_file)
+            if magic.startswith(b"\xff\xd8"):
+                return _read_jpeg_header_(image_file)
+            if magic[:4] in (b"II*\x00", b"MM\x00*"):
+                return _read_tiff_header_(image_file)
+            if magic.startswith(EXR_MAGIC):
+                return _read_exr_header_(image_file)
+            # TGA没有文件头标识,只能按后缀判断
+            if in_path.lower().endswith(".tga"):
+                return _read_tga_header_(image_file)
+        except (struct.error, ValueError, UnicodeDecodeError):
+            return None
+    return None
+
+
+def _read_exact_(in_file, in_size: int) -> bytes:
+    data = in_file.read(in_size)
+    if len(data) != in_size:
+        raise ValueError("Unexpected end of file")
+    return data
+
+
+def _read_png_header_(in_file) -> ImageHeader:
+    in_file.seek(len(PNG_SIGNATURE))
+    # IHDR一定是第一个数据块
+    length, chunk_type = struct.unpack(">I4s", _read_exact_(in_file, 8))
+    if chunk_type != b"IHDR":
+        raise ValueError("Missing IHDR")
+    width, height, bit_depth, color_type = struct.unpack(
+        ">IIBB", _read_exact_(in_file, 10)
+    )
+    in_file.seek(length - 10 + 4, os.SEEK_CUR)
+    color_space = None
+    # 颜色空间相关的数据块都在IDAT之前,遇到IDAT就停止
+    while True:
+        chunk_header = in_file.read(8)
+        if len(chunk_header) != 8:
+            break
+        length, chunk_type = struct.unpack(">I4s", chunk_header)
+        if chunk_type in (b"IDAT", b"IEND"):
+            break
+        if chunk_type == b"sRGB":
+            color_space = "srgb"
+        elif chunk_type == b"gAMA" and color_space is None:
+            (gamma,) = struct.unpack(">I", _read_exact_(in_file, 4))
+            in_file.seek(length - 4 + 4, os.SEEK_CUR)
+            color_space = "linear" if gamma == PNG_LINEAR_GAMMA else "srgb"
+            continue
+        in_file.seek(length + 4, os.SEEK_CUR)
+    if color_space is None and bit_depth <= 8:
+        color_space = "srgb"
+    return ImageHeader(
+        "png",
+        width,
+        height,
+        PNG_CHANNELS.get(color_type, 3),
+        bit_depth,
+        False,
+        color_space,
+    )
+
+
+def _read_jpeg_header_(in_file) -> ImageHeader:
+    in_file.seek(2)
+    while True:
+        marker_prefix = _read_exact_(in_file, 1)
+        if marker_prefix != b"\xff":
+            raise ValueError("Invalid JPEG marker")
+        marker = _read_exact_(in_file, 1)[0]
+        # 填充字节
+        while marker == 0xFF:
+            marker = _read_exact_(in_file, 1)[0]
+        # 没有长度字段的标记
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            continue
+        if marker in (0xD9, 0xDA):
+            raise ValueError("No SOF marker before image data")
+        (length,) = struct.unpack(">H", _read_exact_(in_file, 2))
+        if marker in JPEG_SOF_MARKERS:
+            precision, height, width, components = struct.unpack(
+                ">BHHB", _read_exact_(in_file, 6)
+            )
+            return ImageHeader(
+                "jpeg", width, height, components, precision, False, "srgb"
+            )
+        in_file.seek(length - 2, os.SEEK_CUR)
+
+
+def _read_tiff_header_(in_file) -> ImageHeader:
+    byte_order = "<" if _read_exact_(in_file, 2) == b"II" else ">"
+    (magic,) = struct.unpack(byte_order + "H", _read_exact_(in_file, 2))
+    if magic != 42:
+        # BigTIFF
+        raise ValueError("Unsupported TIFF variant")
+    (ifd_offset,) = struct.unpack(byte_order + "I", _read_exact_(in_file, 4))
+    in_file.seek(ifd_offset)
+    (entry_count,) = struct.unpack(byte_order + "H", _read_exact_(in_file, 2))
+    # 类型 -> (struct格式, 字节数)
+    field_types = {1: ("B", 1), 3: ("H", 2), 4: ("I", 4)}
+    tags = {}
+    entries = _read_exact_(in_file, entry_count * 12)
+    for index in range(entry_count):
+        tag, field_type, count, value = struct.unpack(
+            byte_order + "HHI4s", entries[index * 12 : index * 12 + 12]
+        )
+        if tag not in (256, 257, 258, 277, 339) or field_type not in field_types:
+            continue
+        value_format, value_size = field_types[field_type]
+        # 只需要第一个值,多个值超过4字节时存放在偏移位置
+        if count * value_size > 4:
+            (offset,) = struct.unpack(byte_order + "I", value)
+            position = in_file.tell()
+            in_file.seek(offset)
+            value = _read_exact_(in_file, value_size)
+            in_file.seek(position)
+        (tags[tag],) = struct.unpack(
+            byte_order + value_format, value[:value_size]
+        )
+    if 256 not in tags or 257 not in tags:
+        raise ValueError("Missing TIFF image size")
+    bit_depth = tags.get(258, 1)
+    is_float = tags.get(339, 1) == 3
+    if is_float:
+        color_space = "linear"
+    elif bit_depth <= 8:
+        color_space = "srgb"
+    else:
+        color_space = None
+    return ImageHeader(
+        "tiff",
+        tags[256],
+        tags[257],
+        tags.get(277, 1),
+        bit_depth,
+        is_float,
+        color_space,
+    )
+
+
+def _read_null_terminated_(in_file, in_max_size: int = 256) -> bytes:
+    data = bytearray()
+    while True:
+        char = _read_exact_(in_file, 1)
+        if char == b"\x00":
+            return bytes(data)
+        data += char
+        if len(data) > in_max_size:
+            raise ValueError("Attribute name too long")
+
+
+def _read_exr_header_(in_file) -> ImageHeader:
+    # 多part文件只读取第一个part的头
+    in_file.seek(8)
+    channels = []
+    data_window = None
+    while True:
+        name = _read_null_terminated_(in_file)
+        if not name:
+            break
+        _read_null_terminated_(in_file)
+        (size,) = struct.unpack("<i", _read_exact_(in_file, 4))
+        if size < 0 or size > EXR_MAX_ATTRIBUTE_SIZE:
+            raise ValueError("Invalid EXR attribute size")
+        value = _read_exact_(in_file, size)
+        if name == b"dataWindow":
+            data_window = struct.unpack("<iiii", value[:16])
+        elif name == b"channels":
+            position = 0
+            while position < len(value) and value[position] != 0:
+                name_end = value.index(b"\x00", position)
+                (pixel_type,) = struct.unpack("<i", value[name_end + 1 : name_end + 5])
+                channels.append(pixel_type)
+                # 名称、pixel_type、pLinear+保留字节、xSampling、ySampling
+                position = name_end + 1 + 16
+        if data_window is not None and channels:
+            break
+    if data_window is None or not channels:
+        raise ValueError("Missing EXR channels or dataWindow")
+    x_min, y_min, x_max, y_max = data_window
+    bit_depth, is_float = EXR_PIXEL_TYPES.get(max(channels), (32, True))
+    return ImageHeader(
+        "exr",
+        x_max - x_min + 1,
+        y_max - y_min + 1,
+        len(channels),
+        bit_depth,
+        is_float,
+        "linear",
+    )
+
+
+def _read_tga_header_(in_file) -> ImageHeader:
+    (
+        _id_length,
+        color_map_type,
+        image_type,
+        width,
+        height,
+        pixel_depth,
+        descriptor,
+    ) = struct.unpack("<BBB5x4xHHBB", _read_exact_(in_file, 18))
+    # 1/9:调色板 2/10:真彩色 3/11:灰度
+    if color_map_type > 1 or image_type not in (1, 2, 3, 9, 10, 11):
+        raise ValueError("Unsupported TGA image type")
+    alpha_bits = descriptor & 0x0F
+    if image_type in (3, 11):
+        channels = 1
+    else:
+        channels = 4 if alpha_bits or pixel_depth == 32 else 3
+    bit_depth = 8 if pixel_depth >= 24 or image_type in (3, 11) else 5
+    return ImageHeader("tga", width, height, channels, bit_depth, False, "srgb")
+
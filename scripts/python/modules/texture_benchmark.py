@@ -0,0 +1,198 @@
+"""
+纹理解析性能测试,不依赖hou,可以直接在python或hython中运行:
+
+    cd $MYLIB/scripts/python
+    python -m modules.texture_benchmark
+"""
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+import timeit
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import modules.texture_utils as texture_utils
+import modules.tx_convert as tx_convert
+
+# 模拟转换器:等待指定时间后写出输出文件,用于在没有imaketx的环境中测试调度吞吐量
+STAND_IN_CONVERTER_SOURCE = """
+import sys
+import time
+
+time.sleep(float(sys.argv[3]))
+with open(sys.argv[2], "wb") as output_file:
+    output_file.write(b"tx")
+"""
+
+
+def generate_synthetic_listing(in_file_count: int, in_seed: int = 0) -> list:
+    """
+    生成模拟的纹理文件夹列表,包含普通纹理、UDIM纹理和非纹理文件
+
+    :param in_file_count: 文件数量
+    :type in_file_count: int
+    :param in_seed: 随机种子,保证多次运行结果一致
+    :type in_seed: int
+    """
+    rng = random.Random(in_seed)
+    channels = ("diff", "rough", "metal", "nor_gl", "disp", "ao", "spec", "opacity")
+    resolutions = ("1k", "2k", "4k", "8k")
+    extensions = (".jpg", ".png", ".exr", ".tif")
+    listing = []
+    material_index = 0
+    while len(listing) < in_file_count:
+        material_name = f"asset{material_index:06d}"
+        resolution = rng.choice(resolutions)
+        extension = rng.choice(extensions)
+        use_udim = rng.random() < 0.2
+        for channel in channels:
+            if use_udim:
+                for tile in range(1001, 1005):
+                    listing.append(f"{material_name}_{channel}_{tile}{extension}")
+            else:
+                listing.append(f"{material_name}_{channel}_{resolution}{extension}")
+        listing.append(f"{material_name}_preview.txt")
+        material_index += 1
+    return listing[:in_file_count]
+
+
+def legacy_collect(in_file_names, in_tex_types=texture_utils.TEX_TYPE) -> dict:
+    """
+    旧版TxToMtlx._collect_images_in_dir的解析逻辑,仅用于对比
+    """
+    ordinary_pattern = re.compile(r"(\d+[Kk])")
+    udim_pattern = re.compile(r"(_\d{4})")
+    material_collection = {}
+    for elem in in_file_names:
+        if not elem.endswith(texture_utils.SUPPORT_IMAGE_FORMAT):
+            continue
+        name_keywords = elem.split(".")[0].lower().split("_")
+        texure_type = ""
+        for type in in_tex_types:
+            for name_keyword in name_keywords[1:]:
+                if type in name_keyword:
+                    texure_type = name_keyword
+                    break
+        if texure_type == "":
+            continue
+        material_info = material_collection.setdefault(name_keywords[0], {})
+        material_info.setdefault(texure_type, []).append(elem)
+        tex_res = ordinary_pattern.search(elem)
+        if not tex_res == None:
+            material_info["res"] = tex_res.group(1)
+        material_info["UDIM"] = udim_pattern.search(elem) != None
+    return material_collection
+
+
+def run_classifier_benchmark(in_sizes=(10000, 100000), in_repeat: int = 3) -> dict:
+    """
+    对比旧逻辑与TextureClassifier的耗时,返回{文件数量: (旧耗时, 新耗时)},单位秒
+    """
+    classifier = texture_utils.get_texture_classifier(
+        texture_utils.TEX_TYPE, texture_utils.TEXTURE_TYPE_SORTED
+    )
+    result = {}
+    for size in in_sizes:
+        listing = generate_synthetic_listing(size)
+        legacy_result = legacy_collect(listing)
+        new_result = texture_utils.build_texture_collection(
+            listing, classifier, texture_utils.SUPPORT_IMAGE_FORMAT
+        )
+        # 旧逻辑没有按分辨率分组,也不记录UDIM编号
+        for material_info in new_result.values():
+            material_info.pop(texture_utils.VARIANTS_KEY, None)
+            material_info.pop(texture_utils.UDIM_TILES_KEY, None)
+        if legacy_result != new_result:
+            raise RuntimeError(f"Classifier result differs from legacy at {size} files")
+        legacy_time = min(
+            timeit.repeat(lambda: legacy_collect(listing), number=1, repeat=in_repeat)
+        )
+        new_time = min(
+            timeit.repeat(
+                lambda: texture_utils.build_texture_collection(
+                    listing, classifier, texture_utils.SUPPORT_IMAGE_FORMAT
+                ),
+                number=1,
+                repeat=in_repeat,
+            )
+        )
+        print(
+            f"{size} files: legacy {legacy_time:.4f}s, classifier {new_time:.4f}s, speedup x{legacy_time / max(new_time, 1e-9):.1f}"
+        )
+        result[size] = (legacy_time, new_time)
+    return result
+
+
+def _write_stand_in_converter_(in_work_dir: str) -> str:
+    script_path = os.path.join(in_work_dir, "stand_in_maketx.py")
+    with open(script_path, "w") as script_file:
+        script_file.write(STAND_IN_CONVERTER_SOURCE)
+    return script_path
+
+
+def legacy_convert(in_texture_paths, in_build_command, in_max_workers: int):
+    """
+    旧版MtlxMaterial._convert_to_TX_的调度方式:每提交一个任务就等待之前所有任务完成
+    """
+    with ThreadPoolExecutor(max_workers=in_max_workers) as executor:
+        future_texture = {}
+        for path in in_texture_paths:
+            future_texture[
+                executor.submit(
+                    tx_convert.run_convert_command,
+                    path,
+                    in_build_command(path, tx_convert.get_tx_output_path(path)),
+                )
+            ] = path
+            for finished in as_completed(future_texture):
+                finished.result()
+
+
+def run_conversion_benchmark(
+    in_texture_count: int = 64, in_job_seconds: float = 0.2, in_max_workers: int = None
+) -> tuple:
+    """
+    使用模拟转换器对比旧调度与tx_convert.AsyncConvertEngine的耗时,返回(旧耗时, 新耗时),单位秒
+
+    :param in_texture_count: 纹理数量
+    :param in_job_seconds: 每个模拟转换进程的耗时
+    :param in_max_workers: 并行数量,默认与MtlxMaterial.PROCESS_USE_LIMIT一致
+    """
+    max_workers = in_max_workers or round(max(1.0, (os.cpu_count() or 1) * 0.8))
+    with tempfile.TemporaryDirectory() as work_dir:
+        converter = _write_stand_in_converter_(work_dir)
+        texture_paths = []
+        for index in range(in_texture_count):
+            path = os.path.join(work_dir, f"bench_diff_{index:04d}.png")
+            open(path, "wb").close()
+            texture_paths.append(path)
+
+        def build_command(in_source_path: str, in_output_path: str):
+            return [
+                sys.executable,
+                converter,
+                in_source_path,
+                in_output_path,
+                str(in_job_seconds),
+            ]
+
+        start_time = time.perf_counter()
+        legacy_convert(texture_paths, build_command, max_workers)
+        legacy_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        engine = tx_convert.AsyncConvertEngine(build_command, max_workers)
+        report = tx_convert.convert_textures_async(texture_paths, engine)
+        new_time = time.perf_counter() - start_time
+    failed_count = sum(1 for result in report if not result.success)
+    print(
+        f"{in_texture_count} textures x {in_job_seconds}s, {max_workers} workers: legacy {legacy_time:.2f}s, scheduler {new_time:.2f}s, speedup x{legacy_time / max(new_time, 1e-9):.1f}, failed {failed_count}"
+    )
+    return legacy_time, new_time
+
+
+if __name__ == "__main__":
+    run_classifier_benchmark()
+    run_conversion_benchmark()
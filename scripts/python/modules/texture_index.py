@@ -0,0 +1,286 @@
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+import modules.image_header as image_header
+import modules.texture_utils as texture_utils
+
+
+def get_default_index_path() -> str:
+    """
+    纹理索引数据库默认位于$HOUDINI_USER_PREF_DIR,没有该变量时(例如在普通python中)放在用户目录
+    """
+    pref_dir = os.environ.get("HOUDINI_USER_PREF_DIR") or os.path.expanduser("~")
+    return os.path.join(pref_dir, "tex_to_mtlx_index.sqlite").replace(os.sep, "/")
+
+
+class TextureIndexCache:
+    """
+    持久化的纹理文件夹解析结果
+
+    每个文件夹记录路径、文件夹mtime和图片数量,每个图片记录一次分类结果;
+    文件夹mtime未变化时直接从数据库读取,不再列举文件夹;
+    mtime变化时重新列举,只对新增文件调用分类器并删除已不存在的记录。
+    图片文件头信息按需读取,以文件mtime和大小判断是否有效,随文件夹一起淘汰。
+    按最近访问时间淘汰,文件夹数量和图片记录数量都有上限
+    """
+
+    MAX_FOLDERS = 500
+    MAX_FILES = 500000
+
+    def __init__(self, in_db_path: str = None) -> None:
+        self.db_path = in_db_path or get_default_index_path()
+        self._init_db_()
+
+    def _connect_(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    def _init_db_(self):
+        with closing(self._connect_()) as conn, conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS folders (
+                    path TEXT PRIMARY KEY,
+                    mtime_ns INTEGER NOT NULL,
+                    entry_count INTEGER NOT NULL,
+                    signature TEXT NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS files (
+                    folder TEXT NOT NULL REFERENCES folders(path) ON DELETE CASCADE,
+                    name TEXT NOT NULL,
+                    material TEXT,
+                    key TEXT,
+                    channel TEXT,
+                    res TEXT,
+                    udim TEXT,
+                    PRIMARY KEY (folder, name)
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS headers (
+                    folder TEXT NOT NULL REFERENCES folders(path) ON DELETE CASCADE,
+                    name TEXT NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    format TEXT,
+                    width INTEGER,
+                    height INTEGER,
+                    channels INTEGER,
+                    bit_depth INTEGER,
+                    is_float INTEGER,
+                    color_space TEXT,
+                    PRIMARY KEY (folder, name)
+                )
+                """
+            )
+
+    def load_collection(
+        self,
+        in_dir_path: str,
+        in_classifier: texture_utils.TextureClassifier,
+        in_image_formats: tuple,
+    ) -> dict:
+        """
+        返回文件夹对应的tex_collection,路径无效时抛出OSError
+
+        :param in_dir_path: 纹理文件夹路径
+        :param in_classifier: 纹理分类器,关键字表变化时缓存整体失效
+        :param in_image_formats: 支持的图片后缀
+        :rtype: dict
+        """
+        folder = os.path.abspath(in_dir_path).replace(os.sep, "/")
+        mtime_ns = os.stat(folder).st_mtime_ns
+        with closing(self._connect_()) as conn, conn:
+            row = conn.execute(
+                "SELECT mtime_ns, signature FROM folders WHERE path = ?", (folder,)
+            ).fetchone()
+            if row is None or row[1] != in_classifier.signature:
+                conn.execute("DELETE FROM folders WHERE path = ?", (folder,))
+                row = None
+            if row is None or row[0] != mtime_ns:
+                self._refresh_folder_(
+                    conn, folder, mtime_ns, in_classifier, in_image_formats
+                )
+            else:
+                conn.execute(
+                    "UPDATE folders SET last_access = ? WHERE path = ?",
+                    (time.time(), folder),
+                )
+            records = conn.execute(
+                "SELECT name, material, key, channel, res, udim FROM files "
+                "WHERE folder = ? ORDER BY name",
+                (folder,),
+            ).fetchall()
+            self._evict_(conn)
+        return texture_utils.collect_classified_textures(
+            (
+                record[0],
+                texture_utils.TextureClassification(*record[1:])
+                if record[2] is not None
+                else None,
+            )
+            for record in records
+        )
+
+    def _refresh_folder_(
+        self,
+        in_conn: sqlite3.Connection,
+        in_folder: str,
+        in_mtime_ns: int,
+        in_classifier: texture_utils.TextureClassifier,
+        in_image_formats: tuple,
+    ):
+        # 只列举一次文件夹,和已有记录做差集
+        image_files = set(texture_utils.scan_texture_dir(in_folder, in_image_formats))
+        cached_files = {
+            record[0]
+            for record in in_conn.execute(
+                "SELECT name FROM files WHERE folder = ?", (in_folder,)
+            )
+        }
+        in_conn.execute(
+            "INSERT INTO folders (path, mtime_ns, entry_count, signature, last_access) "
+            "VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(path) DO UPDATE SET mtime_ns = excluded.mtime_ns, "
+            "entry_count = excluded.entry_count, last_access = excluded.last_access",
+            (
+                in_folder,
+                in_mtime_ns,
+                len(image_files),
+                in_classifier.signature,
+                time.time(),
+            ),
+        )
+        removed_files = cached_files - image_files
+        if removed_files:
+            in_conn.executemany(
+                "DELETE FROM files WHERE folder = ? AND name = ?",
+                ((in_folder, name) for name in removed_files),
+            )
+            in_conn.executemany(
+                "DELETE FROM headers WHERE folder = ? AND name = ?",
+                ((in_folder, name) for name in removed_files),
+            )
+        new_records = []
+        for name in image_files - cached_files:
+            classified = in_classifier.classify(name)
+            # 非纹理文件也记录下来,下次不用再次分类
+            new_records.append(
+                (in_folder, name) + (tuple(classified) if classified else (None,) * 5)
+            )
+        if new_records:
+            in_conn.executemany(
+                "INSERT INTO files (folder, name, material, key, channel, res, udim) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                new_records,
+            )
+
+    def get_image_headers(self, in_dir_path: str, in_file_names) -> dict:
+        """
+        返回文件夹中指定图片的文件头信息,未缓存或文件已变化时重新读取文件头
+
+        :param in_dir_path: 图片所在文件夹
+        :param in_file_names: 文件名列表
+        :return: {文件名: image_header.ImageHeader},无法读取的文件不在结果中
+        :rtype: dict
+        """
+        folder = os.path.abspath(in_dir_path).replace(os.sep, "/")
+        result = {}
+        with closing(self._connect_()) as conn, conn:
+            if (
+                conn.execute("SELECT 1 FROM folders WHERE path = ?", (folder,)).fetchone()
+                is None
+            ):
+                # 只缓存已建立索引的文件夹,保证文件头记录随文件夹淘汰
+                return self._probe_headers_(folder, in_file_names)
+            cached = {
+                record[0]: record[1:]
+                for record in conn.execute(
+                    "SELECT name, mtime_ns, size, format, width, height, channels, "
+                    "bit_depth, is_float, color_space FROM headers WHERE folder = ?",
+                    (folder,),
+                )
+            }
+            new_records = []
+            for name in in_file_names:
+                try:
+                    file_stat = os.stat(os.path.join(folder, name))
+                except OSError:
+                    continue
+                record = cached.get(name)
+                if record and record[0] == file_stat.st_mtime_ns and record[1] == file_stat.st_size:
+                    if record[2] is not None:
+                        result[name] = image_header.ImageHeader(
+                            record[2],
+                            record[3],
+                            record[4],
+                            record[5],
+                            record[6],
+                            bool(record[7]),
+                            record[8],
+                        )
+                    continue
+                header = self._probe_headers_(folder, (name,)).get(name)
+                if header is not None:
+                    result[name] = header
+                # 不支持的格式也记录下来,避免重复读取
+                new_records.append(
+                    (folder, name, file_stat.st_mtime_ns, file_stat.st_size)
+                    + (tuple(header) if header else (None,) * 7)
+                )
+            if new_records:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO headers (folder, name, mtime_ns, size, format, "
+                    "width, height, channels, bit_depth, is_float, color_space) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    new_records,
+                )
+        return result
+
+    def _probe_headers_(self, in_folder: str, in_file_names) -> dict:
+        headers = {}
+        for name in in_file_names:
+            try:
+                header = image_header.probe_image_header(os.path.join(in_folder, name))
+            except OSError:
+                continue
+            if header is not None:
+                headers[name] = header
+        return headers
+
+    def _evict_(self, in_conn: sqlite3.Connection):
+        """
+        按最近访问时间淘汰最久未使用的文件夹,直到数量和记录总数都在上限内
+        """
+        folder_count, file_count = in_conn.execute(
+            "SELECT (SELECT COUNT(*) FROM folders), (SELECT COALESCE(SUM(entry_count), 0) FROM folders)"
+        ).fetchone()
+        if folder_count <= self.MAX_FOLDERS and file_count <= self.MAX_FILES:
+            return
+        evict_paths = []
+        for path, entry_count in in_conn.execute(
+            "SELECT path, entry_count FROM folders ORDER BY last_access ASC"
+        ).fetchall():
+            # 至少保留最近访问的一个文件夹
+            if folder_count <= 1:
+                break
+            if folder_count <= self.MAX_FOLDERS and file_count <= self.MAX_FILES:
+                break
+            evict_paths.append((path,))
+            folder_count -= 1
+            file_count -= entry_count
+        in_conn.executemany("DELETE FROM folders WHERE path = ?", evict_paths)
+
+    def clear(self):
+        with closing(self._connect_()) as conn, conn:
+            conn.execute("DELETE FROM folders")
@@ -0,0 +1,317 @@
+"""
+tex_to_mtlx纹理扫描与分类的性能回归测试,使用timeit计时,不依赖pytest;
+没有hou或PySide6的环境中(普通python)使用轻量替身导入tools.tex_to_mtlx:
+
+    cd $MYLIB/scripts/python
+    python -m modules.texture_regression --update-baseline   # 记录本机基线
+    python -m modules.texture_regression --threshold 20      # 吞吐量比基线下降超过20%时返回1
+
+测试内容:
+    TxToMtlx._collect_images_in_dir / _contain_any_image_file_ (扫描磁盘上的纹理文件夹)
+    MtlxMaterial._surface_texture_sort_iterator_ / _get_texture_path_
+
+基线与机器相关,默认保存在$HOUDINI_USER_PREF_DIR(没有时为用户目录)
+"""
+import argparse
+import importlib.util
+import json
+import os
+import random
+import sys
+import tempfile
+import timeit
+import types
+
+DEFAULT_SIZES = (100, 10000, 100000)
+DEFAULT_THRESHOLD = 20.0
+BASELINE_FILE_NAME = "texture_regression_baseline.json"
+
+QUIXEL_CHANNELS = (
+    "Albedo",
+    "Roughness",
+    "Normal",
+    "Displacement",
+    "AO",
+    "Cavity",
+    "Specular",
+    "Gloss",
+)
+POLYHAVEN_CHANNELS = ("diff", "rough", "nor_gl", "nor_dx", "disp", "ao", "arm", "metal")
+SUBSTANCE_CHANNELS = (
+    "BaseColor",
+    "Roughness",
+    "Metallic",
+    "Normal",
+    "Height",
+    "AmbientOcclusion",
+    "OcclusionRoughnessMetallic",
+    "Emissive",
+)
+POLYHAVEN_WORDS = ("old", "rusty", "brick", "forest", "wood", "plaster", "floor", "rock")
+
+
+def _quixel_names_(in_rng: random.Random, in_index: int) -> list:
+    # Megascans: <资产id>_<分辨率>_<通道>.jpg,EXR位移
+    asset_id = f"{in_rng.choice('abcdefghijklmnopqrstuvwxyz')}{in_index:06x}"
+    resolution = in_rng.choice(("2K", "4K", "8K"))
+    names = [
+        f"{asset_id}_{resolution}_{channel}.{'exr' if channel == 'Displacement' else 'jpg'}"
+        for channel in QUIXEL_CHANNELS
+    ]
+    names.append(f"{asset_id}_Preview.png")
+    names.append(f"{asset_id}.json")
+    return names
+
+
+def _polyhaven_names_(in_rng: random.Random, in_index: int) -> list:
+    # Poly Haven: <名称>_<通道>_<分辨率>.<后缀>,一个资产常带多个分辨率
+    asset_name = f"{in_rng.choice(POLYHAVEN_WORDS)}{in_index}_{in_rng.choice(POLYHAVEN_WORDS)}_01"
+    names = []
+    for resolution in in_rng.sample(("1k", "2k", "4k", "8k"), 2):
+        for channel in POLYHAVEN_CHANNELS:
+            extension = "exr" if channel in ("nor_gl", "nor_dx", "disp") else "jpg"
+            names.append(f"{asset_name}_{channel}_{resolution}.{extension}")
+    return names
+
+
+def _substance_names_(in_rng: random.Random, in_index: int) -> list:
+    # Substance Painter导出: <模型>_<纹理集>_<通道>.<UDIM>.png 或 <模型>_<纹理集>_<通道>.png
+    texture_set = f"mesh{in_index:05d}_{in_rng.choice(('body', 'head', 'cloth', 'metal'))}"
+    tiles = range(1001, 1001 + in_rng.choice((1, 1, 4, 10)))
+    names = []
+    for channel in SUBSTANCE_CHANNELS:
+        if len(tiles) == 1:
+            names.append(f"{texture_set}_{channel}.png")
+        else:
+            names.extend(f"{texture_set}_{channel}.{tile}.png" for tile in tiles)
+    return names
+
+
+VENDOR_GENERATORS = {
+    "quixel": _quixel_names_,
+    "polyhaven": _polyhaven_names_,
+    "substance": _substance_names_,
+}
+
+
+def generate_vendor_listing(in_file_count: int, in_seed: int = 0) -> list:
+    """
+    按Quixel、Poly Haven和Substance的命名方式轮流生成文件名,直到达到指定数量
+
+    :param in_file_count: 文件数量
+    :param in_seed: 随机种子,保证多次运行结果一致
+    """
+    rng = random.Random(in_seed)
+    generators = tuple(VENDOR_GENERATORS.values())
+    listing = []
+    index = 0
+    while len(listing) < in_file_count:
+        listing.extend(generators[index % len(generators)](rng, index))
+        index += 1
+    return listing[:in_file_count]
+
+
+def create_fixture_dir(in_root: str, in_file_count: int) -> str:
+    """
+    在in_root下创建包含in_file_count个空文件的纹理文件夹,返回文件夹路径
+    """
+    fixture_dir = os.path.join(in_root, f"textures_{in_file_count}")
+    os.makedirs(fixture_dir, exist_ok=True)
+    for file_name in generate_vendor_listing(in_file_count):
+        open(os.path.join(fixture_dir, file_name), "wb").close()
+    return fixture_dir
+
+
+class _StubMeta(type):
+    def __getattr__(cls, in_name):
+        if in_name.startswith("__"):
+            raise AttributeError(in_name)
+        return _Stub
+
+
+class _Stub(metaclass=_StubMeta):
+    """
+    可以被继承、调用和任意取属性的替身,只用于让模块能够导入
+    """
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __call__(self, *args, **kwargs):
+        return _Stub()
+
+    def __getattr__(self, in_name):
+        if in_name.startswith("__"):
+            raise AttributeError(in_name)
+        return _Stub()
+
+
+class _StubModule(types.ModuleType):
+    def __getattr__(self, in_name):
+        if in_name.startswith("__"):
+            raise AttributeError(in_name)
+        return _Stub
+
+
+def install_stubs() -> list:
+    """
+    hou或PySide6无法导入时,在sys.modules中放入替身模块,返回被替换的模块名
+    """
+    stubbed = []
+    if importlib.util.find_spec("hou") is None:
+        hou_stub = _StubModule("hou")
+        # MtlxMaterial.setup_imaketx使用$HB查找转换器
+        hou_stub.text = types.SimpleNamespace(expandString=os.path.expandvars)
+        sys.modules["hou"] = hou_stub
+        stubbed.append("hou")
+    if importlib.util.find_spec("PySide6") is None:
+        pyside_stub = _StubModule("PySide6")
+        pyside_stub.__path__ = []
+        sys.modules["PySide6"] = pyside_stub
+        for sub_name in ("QtCore", "QtGui", "QtWidgets", "QtUiTools"):
+            sub_module = _StubModule(f"PySide6.{sub_name}")
+            setattr(pyside_stub, sub_name, sub_module)
+            sys.modules[f"PySide6.{sub_name}"] = sub_module
+        stubbed.append("PySide6")
+    return stubbed
+
+
+def _best_seconds_(in_function, in_repeat: int) -> float:
+    return max(min(timeit.repeat(in_function, number=1, repeat=in_repeat)), 1e-9)
+
+
+def run_suite(in_sizes=DEFAULT_SIZES, in_repeat: int = 3, in_work_dir: str = None) -> dict:
+    """
+    对每种文件数量执行全部测试,返回{"测试名@文件数量": 每秒处理数量}
+
+    :param in_work_dir: 生成测试文件夹的位置,默认使用临时文件夹并在结束后删除
+    """
+    install_stubs()
+    import tools.tex_to_mtlx as tex_to_mtlx
+
+    tool = tex_to_mtlx.TxToMtlx.__new__(tex_to_mtlx.TxToMtlx)
+    result = {}
+    with tempfile.TemporaryDirectory(dir=in_work_dir) as work_dir:
+        for size in in_sizes:
+            fixture_dir = create_fixture_dir(work_dir, size)
+            result[f"collect_images_in_dir@{size}"] = size / _best_seconds_(
+                lambda: tool._collect_images_in_dir(fixture_dir), in_repeat
+            )
+            result[f"contain_any_image_file@{size}"] = size / _best_seconds_(
+                lambda: tool._contain_any_image_file_(fixture_dir), in_repeat
+            )
+
+            tex_collection = tool._collect_images_in_dir(fixture_dir)
+            materials = [
+                tex_to_mtlx.MtlxMaterial(
+                    material_name, False, "", None, fixture_dir, tex_collection
+                )
+                for material_name in tex_collection
+            ]
+            material_infos = [
+                (material, material._get_material_info_()) for material in materials
+            ]
+
+            def sort_textures():
+                for material, material_info in material_infos:
+                    for _ in material._surface_texture_sort_iterator_(material_info):
+                        pass
+
+            result[f"surface_texture_sort_iterator@{size}"] = len(
+                materials
+            ) / _best_seconds_(sort_textures, in_repeat)
+
+            texture_jobs = [
+                (material, texture_info["name"], material_info)
+                for material, material_info in material_infos
+                for _, texture_info in material._surface_texture_sort_iterator_(
+                    material_info
+                )
+            ]
+
+            def get_texture_paths():
+                for material, texture_name, material_info in texture_jobs:
+                    material._get_texture_path_(texture_name, material_info)
+
+            result[f"get_texture_path@{size}"] = max(
+                len(texture_jobs), 1
+            ) / _best_seconds_(get_texture_paths, in_repeat)
+
+            print(
+                f"{size} files: {len(tex_collection)} materials, {len(texture_jobs)} texture paths"
+            )
+    return result
+
+
+def get_default_baseline_path() -> str:
+    pref_dir = os.environ.get("HOUDINI_USER_PREF_DIR") or os.path.expanduser("~")
+    return os.path.join(pref_dir, BASELINE_FILE_NAME).replace(os.sep, "/")
+
+
+def compare_with_baseline(in_result: dict, in_baseline: dict, in_threshold: float) -> list:
+    """
+    返回吞吐量比基线下降超过in_threshold百分比的测试,[(测试名, 基线, 当前)]
+    """
+    regressions = []
+    for case_name, throughput in in_result.items():
+        baseline_throughput = in_baseline.get(case_name)
+        if not baseline_throughput:
+            continue
+        if throughput < baseline_throughput * (1.0 - in_threshold / 100.0):
+            regressions.append((case_name, baseline_throughput, throughput))
+    return regressions
+
+
+def main(in_argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Texture scanning and classification regression benchmark"
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Fail when throughput drops by more than this percentage",
+    )
+    parser.add_argument("--baseline", default=get_default_baseline_path())
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Store this run as the new baseline",
+    )
+    parser.add_argument("--work-dir", help="Where to create the fixture folders")
+    args = parser.parse_args(in_argv)
+
+    result = run_suite(args.sizes, args.repeat, args.work_dir)
+    baseline = {}
+    if os.path.isfile(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+
+    for case_name, throughput in result.items():
+        baseline_throughput = baseline.get(case_name)
+        change = (
+            f"{(throughput / baseline_throughput - 1.0) * 100.0:+.1f}%"
+            if baseline_throughput
+            else "no baseline"
+        )
+        print(f"{case_name:<40} {throughput:>14.1f}/s  {change}")
+
+    if args.update_baseline:
+        baseline.update(result)
+        with open(args.baseline, "w", encoding="utf-8") as baseline_file:
+            json.dump(baseline, baseline_file, indent=4, sort_keys=True)
+        print(f"Baseline Saved To {args.baseline}")
+        return 0
+
+    regressions = compare_with_baseline(result, baseline, args.threshold)
+    for case_name, baseline_throughput, throughput in regressions:
+        print(
+            f"Regression: {case_name} {throughput:.1f}/s < baseline {baseline_throughput:.1f}/s (-{args.threshold}%)"
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
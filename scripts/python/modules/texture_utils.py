@@ -0,0 +1,630 @@
+import fnmatch
+import hashlib
+import os
+import re
+import threading
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+# 支持的图片格式
+SUPPORT_IMAGE_FORMAT = (
+    ".jpg",
+    ".jpeg",
+    ".png",
+    ".bmp",
+    ".tif",
+    ".tiff",
+    ".exr",
+    ".targa",
+)
+# 纹理关键字,顺序即匹配优先级,越靠后优先级越高
+TEX_TYPE = (
+    "diffuse",
+    "diff",
+    "albedo",
+    "alb",
+    "base",
+    "col",
+    "color",
+    "basecolor",
+    "metallic",
+    "metalness",
+    "metal",
+    "mlt",
+    "met",
+    "speculatiry",
+    "specular",
+    "spec",
+    "spc",
+    "roughness",
+    "rough",
+    "rgh",
+    "gloss",
+    "glossy",
+    "glossiness",
+    "transmission",
+    "transparency",
+    "trans",
+    "translucency",
+    "sss",
+    "emission",
+    "emissive",
+    "emit",
+    "emm",
+    "opacity",
+    "opac",
+    "alpha",
+    "ambient_occlusion",
+    "ao",
+    "occlusion",
+    "cavity",
+    "bump",
+    "bmp",
+    "displacement",
+    "displace",
+    "disp",
+    "dsp",
+    "heightmap",
+    "height",
+    "user",
+    "mask",
+    "normal",
+    "nor",
+    "nrm",
+    "nrml",
+    "norm",
+)
+# 纹理关键字按材质通道分组
+TEXTURE_TYPE_SORTED = {
+    "texturesColor": [
+        "diffuse",
+        "diff",
+        "albedo",
+        "alb",
+        "base",
+        "col",
+        "color",
+        "basecolor",
+    ],
+    "texturesMetal": ["metallic", "metalness", "metal", "mlt", "met"],
+    "texturesSpecular": ["speculatiry", "specular", "spec", "spc"],
+    "texturesRough": ["roughness", "rough", "rgh"],
+    "texturesGloss": ["gloss", "glossy", "glossiness"],
+    "texturesTrans": ["transmission", "transparency", "trans"],
+    "texturesEmm": ["emission", "emissive", "emit", "emm"],
+    "texturesAplha": ["opacity", "opac", "alpha"],
+    "texturesAO": ["ambient_occlusion", "ao", "occlusion"],
+    "texturesBump": ["bump", "bmp", "height"],
+    "texturesDisp": ["displacement", "displace", "disp", "dsp", "heightmap"],
+    "texturesExtra": ["user", "mask"],
+    "texturesNormal": ["normal", "nor", "nrm", "nrml", "norm"],
+    "texturesSSS": ["translucency", "sss"],
+}
+
+# 打包纹理:一张图的R/G/B分别存放不同通道,只按完整字段匹配(不做包含匹配,避免armor之类误判)
+# 关键字 -> (R通道分组, G通道分组, B通道分组)
+PACKED_TEXTURE_TYPES = {
+    "orm": ("texturesAO", "texturesRough", "texturesMetal"),
+    "arm": ("texturesAO", "texturesRough", "texturesMetal"),
+    "rma": ("texturesRough", "texturesMetal", "texturesAO"),
+    "mra": ("texturesMetal", "texturesRough", "texturesAO"),
+}
+# 打包纹理R/G/B分量对应mtlxseparate3c的输出
+PACKED_TEXTURE_OUTPUTS = ("outr", "outg", "outb")
+
+# 材质信息中按分辨率分组的纹理,{分辨率: {纹理key: [文件名]}},没有分辨率的文件分在""中
+VARIANTS_KEY = "variants"
+# 多个分辨率时的选择方式:最高、最低、不超过上限的最高分辨率
+RESOLUTION_POLICIES = ("highest", "lowest", "cap")
+
+# 材质信息中UDIM纹理的编号,{文件名: UDIM编号}
+UDIM_TILES_KEY = "udim_tiles"
+# 只接受1001-1999,避免把2048、4096之类的分辨率字段当作UDIM
+UDIM_FIRST_TILE = 1001
+UDIM_LAST_TILE = 1999
+
+# 单个UDIM纹理通道的编号统计
+# tiles: 排序后的编号; missing: 编号包围盒(u 0-9, v)内缺失的编号; duplicates: 对应多个文件的编号
+# first/last: 最小和最大编号; u_range/v_range: 包围盒的(最小, 最大)u/v序号
+UdimInventory = namedtuple(
+    "UdimInventory",
+    ("tiles", "missing", "duplicates", "first", "last", "u_range", "v_range"),
+)
+
+# 单个纹理文件的解析结果
+# material: 材质名称(文件名第一段)
+# key: 命中的纹理关键字段,即tex_collection中的二级key
+# channel: key对应的TEXTURE_TYPE_SORTED分组,例如texturesColor,没有分组时为None
+# res: 文件名中的分辨率,例如2k,没有时为None
+# udim: UDIM编号字符串,例如1001,没有时为None
+TextureClassification = namedtuple(
+    "TextureClassification", ("material", "key", "channel", "res", "udim")
+)
+
+
+class TextureClassifier:
+    """
+    纹理文件名分类器,每个进程按关键字表只构建一次(见get_texture_classifier)
+
+    文件名中的每个字段只会和TEX_TYPE完整比较一次,分辨率和UDIM也在同一步中解析,
+    结果缓存在字典中,同一批纹理中重复出现的字段(分辨率、通道名、UDIM编号)
+    之后只需要一次字典查询
+    """
+
+    RES_REGEX_PATTERN = re.compile(r"\d+[Kk]")
+    UDIM_REGEX_PATTERN = re.compile(r"\d{4}")
+    # 解析规则的版本,规则变化时让持久化的解析结果失效
+    VERSION = 2
+    # 字段缓存上限,防止带随机ID的文件名让缓存无限增长
+    MAX_CACHED_TOKENS = 200000
+
+    def __init__(
+        self, in_tex_types: tuple, in_type_sorted: tuple, in_packed_types: tuple = ()
+    ) -> None:
+        """
+        :param in_tex_types: 纹理关键字,顺序即优先级,越靠后优先级越高
+        :type in_tex_types: tuple
+        :param in_type_sorted: ((分组名, (关键字,...)), ...)
+        :type in_type_sorted: tuple
+        :param in_packed_types: ((打包纹理关键字, (R分组, G分组, B分组)), ...),优先级高于所有in_tex_types
+        :type in_packed_types: tuple
+        """
+        self.tex_types = tuple(in_tex_types)
+        self.type_sorted = tuple(in_type_sorted)
+        self.packed_types = dict(in_packed_types)
+        # 关键字表的指纹,持久化的解析结果用它判断是否需要重新解析
+        self.signature = hashlib.sha1(
+            repr(
+                (self.VERSION, self.tex_types, self.type_sorted, tuple(in_packed_types))
+            ).encode("utf-8")
+        ).hexdigest()
+        # 原始字段 -> (小写且去掉后缀的字段, 是否包含".", 命中的TEX_TYPE最大序号, 分辨率, UDIM)
+        self._token_info: dict = {}
+        # key -> 命中的分组名元组
+        self._key_channels: dict = {}
+
+    def _token_info_(self, in_token: str) -> tuple:
+        info = self._token_info.get(in_token)
+        if info is None:
+            stem_part = in_token.split(".")[0].lower()
+            rank = -1
+            if stem_part in self.packed_types:
+                rank = len(self.tex_types)
+            else:
+                for index, tex_type in enumerate(self.tex_types):
+                    if tex_type in stem_part:
+                        rank = index
+            # 分辨率不会跨越"_",逐字段匹配与整个文件名匹配结果一致;
+            # 只有整个字段(去掉后缀)是1001-1999的四位数字时才是UDIM编号,wall2048之类不算
+            tex_res = self.RES_REGEX_PATTERN.search(in_token)
+            info = (
+                stem_part,
+                "." in in_token,
+                rank,
+                tex_res.group(0) if tex_res else None,
+                stem_part if is_udim_tile_token(stem_part) else None,
+            )
+            if len(self._token_info) >= self.MAX_CACHED_TOKENS:
+                self._token_info.clear()
+            self._token_info[in_token] = info
+        return info
+
+    def channels_of(self, in_key: str) -> tuple:
+        """
+        返回纹理key所属的全部TEXTURE_TYPE_SORTED分组,按分组顺序排列
+        """
+        channels = self._key_channels.get(in_key)
+        if channels is None:
+            lower_key = in_key.lower()
+            if lower_key in self.packed_types:
+                channels = tuple(dict.fromkeys(self.packed_types[lower_key]))
+            else:
+                channels = tuple(
+                    group
+                    for group, indicators in self.type_sorted
+                    if any(indicator in lower_key for indicator in indicators)
+                )
+            self._key_channels[in_key] = channels
+        return channels
+
+    def packed_layout(self, in_key: str):
+        """
+        纹理key是打包纹理时返回(R分组, G分组, B分组),否则返回None
+        """
+        return self.packed_types.get(in_key.lower())
+
+    def classify(self, in_file_name: str):
+        """
+        解析单个纹理文件名,不是纹理时返回None
+
+        :param in_file_name: 不包含路径的文件名,例如tires_Alb_1001.tif
+        :type in_file_name: str
+        :rtype: TextureClassification | None
+        """
+        raw_tokens = in_file_name.split("_")
+        # 第一段是材质名,几乎不重复,不进入缓存也不参与纹理关键字匹配
+        first_token = raw_tokens[0]
+        material_name = first_token.split(".")[0].lower()
+        in_suffix = "." in first_token
+        tex_res = self.RES_REGEX_PATTERN.search(first_token)
+        tex_res = tex_res.group(0) if tex_res else None
+        # 取命中优先级最高的字段,同优先级取最靠前的字段,"."之后的部分不参与匹配
+        best_rank = -1
+        texture_key = ""
+        udim = None
+        for raw_token in raw_tokens[1:]:
+            stem_part, has_dot, rank, token_res, token_udim = self._token_info_(
+                raw_token
+            )
+            if not in_suffix and rank > best_rank:
+                best_rank = rank
+                texture_key = stem_part
+            if tex_res is None:
+                tex_res = token_res
+            if udim is None:
+                udim = token_udim
+            in_suffix = in_suffix or has_dot
+        if best_rank < 0:
+            return None
+        channels = self.channels_of(texture_key)
+        return TextureClassification(
+            material_name,
+            texture_key,
+            channels[0] if channels else None,
+            tex_res,
+            udim,
+        )
+
+
+_CLASSIFIER_CACHE: dict = {}
+
+
+def get_texture_classifier(
+    in_tex_types, in_type_sorted: dict, in_packed_types: dict = None
+) -> TextureClassifier:
+    """
+    获取进程内共享的分类器,相同的关键字表只构建一次
+
+    :param in_tex_types: TxToMtlx.TEX_TYPE
+    :param in_type_sorted: MtlxMaterial.TEXTURE_TYPE_SORTED
+    :type in_type_sorted: dict
+    :param in_packed_types: 打包纹理关键字表,默认为PACKED_TEXTURE_TYPES
+    :type in_packed_types: dict
+    """
+    type_sorted = tuple(
+        (group, tuple(indicators)) for group, indicators in in_type_sorted.items()
+    )
+    if in_packed_types is None:
+        in_packed_types = PACKED_TEXTURE_TYPES
+    packed_types = tuple(
+        (key.lower(), tuple(layout)) for key, layout in in_packed_types.items()
+    )
+    cache_key = (tuple(in_tex_types), type_sorted, packed_types)
+    classifier = _CLASSIFIER_CACHE.get(cache_key)
+    if classifier is None:
+        classifier = TextureClassifier(in_tex_types, type_sorted, packed_types)
+        _CLASSIFIER_CACHE[cache_key] = classifier
+    return classifier
+
+
+def build_texture_collection(
+    in_file_names, in_classifier: TextureClassifier, in_image_formats: tuple
+) -> dict:
+    """
+    把文件名列表解析为TxToMtlx.tex_collection结构的二维字典
+
+    :param in_file_names: 文件名可迭代对象,不包含路径
+    :param in_classifier: 纹理分类器
+    :param in_image_formats: 支持的图片后缀
+    :return: {材质名: {纹理key: [文件名], "res": 分辨率, "UDIM": bool, "variants": {分辨率: {纹理key: [文件名]}}}}
+    :rtype: dict
+    """
+    return collect_classified_textures(
+        (elem, in_classifier.classify(elem))
+        for elem in in_file_names
+        if elem.endswith(in_image_formats)
+    )
+
+
+def collect_classified_textures(in_records) -> dict:
+    """
+    把(文件名, TextureClassification)记录整理为tex_collection结构,
+    classification为None的记录会被跳过
+
+    :param in_records: 可迭代的(文件名, TextureClassification | None)
+    :rtype: dict
+    """
+    material_collection: dict = {}
+    for elem, classified in in_records:
+        if classified is None:
+            continue
+        material_info = material_collection.get(classified.material)
+        if material_info is None:
+            material_info = material_collection[classified.material] = {}
+        material_info.setdefault(classified.key, []).append(elem)
+        variants = material_info.get(VARIANTS_KEY)
+        if variants is None:
+            variants = material_info[VARIANTS_KEY] = {}
+        variants.setdefault(classified.res or "", {}).setdefault(
+            classified.key, []
+        ).append(elem)
+        if classified.res is not None:
+            material_info["res"] = classified.res
+        material_info["UDIM"] = classified.udim is not None
+        if classified.udim is not None:
+            material_info.setdefault(UDIM_TILES_KEY, {})[elem] = int(classified.udim)
+    return material_collection
+
+
+def is_udim_tile_token(in_token: str) -> bool:
+    return (
+        len(in_token) == 4
+        and in_token.isdigit()
+        and UDIM_FIRST_TILE <= int(in_token) <= UDIM_LAST_TILE
+    )
+
+
+def replace_udim_token(in_file_name: str, in_placeholder: str = "<UDIM>") -> str:
+    """
+    只把文件名中作为独立字段的UDIM编号替换为占位符,
+    例如wall2048_diff_1001.exr -> wall2048_diff_<UDIM>.exr
+    """
+    tokens = in_file_name.split("_")
+    for index, token in enumerate(tokens[1:], 1):
+        stem_part, dot, suffix = token.partition(".")
+        if is_udim_tile_token(stem_part):
+            tokens[index] = in_placeholder + dot + suffix
+            break
+    return "_".join(tokens)
+
+
+def get_udim_inventory(in_material_info: dict) -> dict:
+    """
+    统计材质中每个UDIM纹理通道的编号,不需要再次读取磁盘
+
+    :return: {纹理key: UdimInventory},非UDIM材质返回空字典
+    :rtype: dict
+    """
+    udim_tiles: dict = in_material_info.get(UDIM_TILES_KEY)
+    if not udim_tiles:
+        return {}
+    inventory = {}
+    for key, files in in_material_info.items():
+        if not isinstance(files, list):
+            continue
+        tile_counts = {}
+        for file_name in files:
+            tile = udim_tiles.get(file_name)
+            if tile is not None:
+                tile_counts[tile] = tile_counts.get(tile, 0) + 1
+        if not tile_counts:
+            continue
+        tiles = tuple(sorted(tile_counts))
+        u_values = [(tile - UDIM_FIRST_TILE) % 10 for tile in tiles]
+        v_values = [(tile - UDIM_FIRST_TILE) // 10 for tile in tiles]
+        u_range = (min(u_values), max(u_values))
+        v_range = (min(v_values), max(v_values))
+        missing = tuple(
+            UDIM_FIRST_TILE + u + v * 10
+            for v in range(v_range[0], v_range[1] + 1)
+            for u in range(u_range[0], u_range[1] + 1)
+            if UDIM_FIRST_TILE + u + v * 10 not in tile_counts
+        )
+        duplicates = tuple(tile for tile in tiles if tile_counts[tile] > 1)
+        inventory[key] = UdimInventory(
+            tiles, missing, duplicates, tiles[0], tiles[-1], u_range, v_range
+        )
+    return inventory
+
+
+def resolution_to_int(in_resolution) -> int:
+    """
+    "2k"/"2K" -> 2,没有分辨率时为0
+    """
+    if not in_resolution:
+        return 0
+    digits = str(in_resolution).rstrip("Kk")
+    return int(digits) if digits.isdigit() else 0
+
+
+def select_resolution(
+    in_resolutions, in_policy: str = "highest", in_max_resolution=None
+) -> str:
+    """
+    按选择方式从可用分辨率中选出一个
+
+    :param in_resolutions: 可用分辨率,例如("1k", "4k")
+    :param in_policy: RESOLUTION_POLICIES之一
+    :param in_max_resolution: cap方式的上限,例如"2k"或2,没有不超过上限的分辨率时取最低分辨率
+    """
+    ordered = sorted(in_resolutions, key=resolution_to_int)
+    if in_policy == "lowest":
+        return ordered[0]
+    if in_policy == "cap" and in_max_resolution:
+        max_resolution = (
+            in_max_resolution
+            if isinstance(in_max_resolution, int)
+            else resolution_to_int(in_max_resolution)
+        )
+        capped = [res for res in ordered if resolution_to_int(res) <= max_resolution]
+        return capped[-1] if capped else ordered[0]
+    return ordered[-1]
+
+
+def resolve_resolution_variants(
+    in_material_info: dict, in_policy: str = "highest", in_max_resolution=None
+) -> dict:
+    """
+    返回只包含一种分辨率的材质信息副本,每个纹理key独立选择分辨率,
+    某个通道缺少目标分辨率时使用该通道最接近选择方式的分辨率;
+    返回值不再包含variants,"res"为实际选中的最高分辨率
+    """
+    resolved = {
+        key: value for key, value in in_material_info.items() if key != VARIANTS_KEY
+    }
+    variants: dict = in_material_info.get(VARIANTS_KEY)
+    if not variants or len(variants) < 2:
+        return resolved
+    chosen_resolutions = []
+    for key, value in in_material_info.items():
+        if not isinstance(value, list):
+            continue
+        key_variants = {
+            res: files[key] for res, files in variants.items() if key in files
+        }
+        if not key_variants:
+            continue
+        res = select_resolution(key_variants, in_policy, in_max_resolution)
+        resolved[key] = list(key_variants[res])
+        chosen_resolutions.append(res)
+    chosen_resolutions = [res for res in chosen_resolutions if res]
+    if chosen_resolutions:
+        resolved["res"] = max(chosen_resolutions, key=resolution_to_int)
+    return resolved
+
+
+def merge_folder_collection(
+    io_tex_collection: dict, in_dir_path: str, in_rel_path: str, in_collection: dict
+) -> list:
+    """
+    把递归解析得到的单个文件夹结果合并到总的tex_collection,
+    子文件夹中的材质使用相对路径作为前缀,避免不同文件夹的同名材质冲突,
+    并在材质信息中记录所在文件夹
+
+    :return: 新加入的材质名称列表
+    :rtype: list
+    """
+    prefix = in_rel_path.replace("/", "_") + "_" if in_rel_path else ""
+    material_keys = []
+    for material_name, material_info in in_collection.items():
+        material_info["folder"] = in_dir_path
+        material_key = prefix + material_name
+        io_tex_collection[material_key] = material_info
+        material_keys.append(material_key)
+    return material_keys
+
+
+def scan_texture_dir(in_dir_path: str, in_image_formats: tuple) -> list:
+    """
+    列举文件夹中的图片文件,不递归;文件夹只列举一次,
+    文件类型使用os.scandir返回的DirEntry缓存信息判断,不会对每个文件单独stat
+
+    :param in_dir_path: 纹理文件夹路径
+    :type in_dir_path: str
+    :param in_image_formats: 支持的图片后缀
+    :type in_image_formats: tuple
+    :return: 图片文件名列表,路径不存在时抛出OSError
+    :rtype: list
+    """
+    image_files = []
+    with os.scandir(in_dir_path) as entries:
+        for entry in entries:
+            if not entry.name.endswith(in_image_formats):
+                continue
+            if entry.is_file():
+                image_files.append(entry.name)
+    return image_files
+
+
+def contain_texture_file(in_image_files) -> bool:
+    """
+    检查scan_texture_dir的结果中是否包含使用_分段命名的图片
+    """
+    return any("_" in elem for elem in in_image_files)
+
+
+def _match_any_glob_(in_rel_path: str, in_globs) -> bool:
+    folder_name = in_rel_path.rsplit("/", 1)[-1]
+    return any(
+        fnmatch.fnmatch(in_rel_path, pattern) or fnmatch.fnmatch(folder_name, pattern)
+        for pattern in in_globs
+    )
+
+
+def _scan_texture_folder_(in_dir_path: str, in_image_formats: tuple) -> tuple:
+    """
+    一次scandir同时得到图片文件名和子文件夹
+    """
+    image_files = []
+    sub_dirs = []
+    with os.scandir(in_dir_path) as entries:
+        for entry in entries:
+            if entry.name.endswith(in_image_formats):
+                if entry.is_file():
+                    image_files.append(entry.name)
+            elif entry.is_dir(follow_symlinks=False):
+                sub_dirs.append(entry.name)
+    return image_files, sub_dirs
+
+
+def crawl_texture_tree(
+    in_root_path: str,
+    in_classifier: TextureClassifier,
+    in_image_formats: tuple,
+    in_on_folder_parsed,
+    in_max_depth: int = -1,
+    in_include_globs=(),
+    in_exclude_globs=(),
+    in_max_workers: int = 8,
+    in_cancel_event: threading.Event = None,
+) -> int:
+    """
+    递归解析纹理库,子文件夹在线程池中并行列举和分类,
+    每解析完一个包含材质的文件夹就调用一次回调,不需要等待全部完成
+
+    :param in_root_path: 纹理库根目录
+    :param in_classifier: 纹理分类器
+    :param in_image_formats: 支持的图片后缀
+    :param in_on_folder_parsed: 回调(文件夹路径, 相对根目录的路径, tex_collection),在调用者线程中执行
+    :param in_max_depth: 最大递归深度,根目录为0,小于0表示不限制
+    :param in_include_globs: 只有相对路径或文件夹名匹配其中之一的文件夹才会上报材质,为空时全部上报
+    :param in_exclude_globs: 相对路径或文件夹名匹配的文件夹连同子文件夹一起跳过
+    :param in_max_workers: 线程池大小
+    :param in_cancel_event: 设置后不再提交新的文件夹,返回已经上报的文件夹数量
+    :return: 上报过材质的文件夹数量
+    :rtype: int
+    """
+    root_path = os.path.abspath(in_root_path).replace(os.sep, "/")
+    reported_count = 0
+
+    def parse_folder(in_dir_path: str):
+        try:
+            image_files, sub_dirs = _scan_texture_folder_(in_dir_path, in_image_formats)
+        except OSError:
+            return {}, []
+        return (
+            build_texture_collection(image_files, in_classifier, in_image_formats),
+            sub_dirs,
+        )
+
+    with ThreadPoolExecutor(max_workers=max(1, in_max_workers)) as executor:
+        pending = {executor.submit(parse_folder, root_path): ("", 0)}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                rel_path, depth = pending.pop(future)
+                if in_cancel_event is not None and in_cancel_event.is_set():
+                    continue
+                tex_collection, sub_dirs = future.result()
+                dir_path = f"{root_path}/{rel_path}" if rel_path else root_path
+                if tex_collection and (
+                    not in_include_globs
+                    or _match_any_glob_(rel_path, in_include_globs)
+                ):
+                    in_on_folder_parsed(dir_path, rel_path, tex_collection)
+                    reported_count += 1
+                if 0 <= in_max_depth <= depth:
+                    continue
+                for sub_dir in sub_dirs:
+                    sub_rel_path = f"{rel_path}/{sub_dir}" if rel_path else sub_dir
+                    if _match_any_glob_(sub_rel_path, in_exclude_globs):
+                        continue
+                    pending[
+                        executor.submit(parse_folder, f"{root_path}/{sub_rel_path}")
+                    ] = (sub_rel_path, depth + 1)
+            if in_cancel_event is not None and in_cancel_event.is_set():
+                for future in pending:
+                    future.cancel()
+                pending = {}
+    return reported_count
@@ -0,0 +1,126 @@
+import hashlib
+import os
+import threading
+
+
+def get_default_thumbnail_dir() -> str:
+    """
+    缩略图缓存默认位于$HOUDINI_USER_PREF_DIR,没有该变量时(例如在普通python中)放在用户目录
+    """
+    pref_dir = os.environ.get("HOUDINI_USER_PREF_DIR") or os.path.expanduser("~")
+    return os.path.join(pref_dir, "tex_to_mtlx_thumbnails").replace(os.sep, "/")
+
+
+class ThumbnailCache:
+    """
+    按内容寻址的缩略图磁盘缓存
+
+    key由源图片的绝对路径、mtime、文件大小和缩略图尺寸计算,源文件变化后自动失效,
+    不需要读取源图片内容;缓存文件按key前两位分目录存放。
+    命中时更新缓存文件的mtime,总大小超过上限时按mtime淘汰最久未使用的缩略图。
+    不依赖Qt,图片的解码和写出由调用者完成
+    """
+
+    MAX_BYTES = 256 * 1024 * 1024
+    # 淘汰后保留的比例,避免每写入一张就触发一次淘汰
+    EVICT_TARGET_RATIO = 0.8
+    FILE_EXTENSION = ".png"
+
+    def __init__(self, in_cache_dir: str = None, in_max_bytes: int = None) -> None:
+        self.cache_dir = in_cache_dir or get_default_thumbnail_dir()
+        self.max_bytes = in_max_bytes or self.MAX_BYTES
+        self._lock = threading.Lock()
+        # 首次写入时统计一次目录大小,之后累加
+        self._total_bytes: int = None
+
+    def key_of(self, in_image_path: str, in_thumbnail_size: int) -> str:
+        """
+        返回源图片当前内容对应的key,文件无法访问时抛出OSError
+        """
+        image_path = os.path.abspath(in_image_path).replace(os.sep, "/")
+        image_stat = os.stat(image_path)
+        fingerprint = (
+            f"{image_path}|{image_stat.st_mtime_ns}|{image_stat.st_size}|{in_thumbnail_size}"
+        )
+        return hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()
+
+    def path_of(self, in_key: str) -> str:
+        return os.path.join(self.cache_dir, in_key[:2], in_key + self.FILE_EXTENSION)
+
+    def get(self, in_key: str):
+        """
+        返回已缓存的缩略图路径并标记为最近使用,没有缓存时返回None
+        """
+        cache_path = self.path_of(in_key)
+        try:
+            os.utime(cache_path)
+        except OSError:
+            return None
+        return cache_path
+
+    def reserve(self, in_key: str) -> str:
+        """
+        返回写入缩略图的路径并创建所在目录,写入完成后需要调用commit
+        """
+        cache_path = self.path_of(in_key)
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        return cache_path
+
+    def commit(self, in_key: str):
+        """
+        记录新写入的缩略图,总大小超过上限时淘汰最久未使用的缩略图
+        """
+        try:
+            file_size = os.stat(self.path_of(in_key)).st_size
+        except OSError:
+            return
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._iter_entries_())
+            else:
+                self._total_bytes += file_size
+            if self._total_bytes > self.max_bytes:
+                self._evict_()
+
+    def _iter_entries_(self):
+        """
+        遍历缓存文件,返回(路径, 大小, mtime)
+        """
+        try:
+            bucket_entries = list(os.scandir(self.cache_dir))
+        except OSError:
+            return
+        for bucket_entry in bucket_entries:
+            if not bucket_entry.is_dir():
+                continue
+            try:
+                with os.scandir(bucket_entry.path) as entries:
+                    for entry in entries:
+                        if entry.name.endswith(self.FILE_EXTENSION):
+                            entry_stat = entry.stat()
+                            yield entry.path, entry_stat.st_size, entry_stat.st_mtime_ns
+            except OSError:
+                continue
+
+    def _evict_(self):
+        entries = sorted(self._iter_entries_(), key=lambda entry: entry[2])
+        total_bytes = sum(size for _, size, _ in entries)
+        target_bytes = self.max_bytes * self.EVICT_TARGET_RATIO
+        for path, size, _ in entries:
+            if total_bytes <= target_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_bytes -= size
+        self._total_bytes = total_bytes
+
+    def clear(self):
+        with self._lock:
+            for path, _, _ in list(self._iter_entries_()):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._total_bytes = 0
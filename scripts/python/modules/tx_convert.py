@@ -0,0 +1,601 @@
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import time
+from collections import namedtuple
+
+
+# 单个纹理的转换结果
+# source: 源纹理路径
+# output: 目标tx路径
+# success: 是否转换成功
+# duration: 耗时,单位秒
+# message: 失败原因或转换器输出
+ConvertResult = namedtuple(
+    "ConvertResult", ("source", "output", "success", "duration", "message")
+)
+
+logger = logging.getLogger("TX Convertion")
+
+
+def get_tx_output_path(in_texture_path: str, in_extension: str = ".tx") -> str:
+    return os.path.splitext(in_texture_path)[0] + in_extension
+
+
+def run_convert_command(
+    in_texture_path: str, in_command, in_extension: str = ".tx"
+) -> ConvertResult:
+    """
+    执行单个转换命令,in_command为参数列表,不经过shell;为None时表示无需执行
+    """
+    output_path = get_tx_output_path(in_texture_path, in_extension)
+    start_time = time.time()
+    if in_command is None:
+        return ConvertResult(in_texture_path, output_path, True, 0.0, "Skipped")
+    try:
+        result = subprocess.run(in_command, capture_output=True, text=True)
+        success = result.returncode == 0
+        message = (result.stderr or result.stdout).strip()
+    except Exception as error:
+        success = False
+        message = str(error)
+    duration = round(time.time() - start_time, 2)
+    return ConvertResult(in_texture_path, output_path, success, duration, message)
+
+
+class ConverterBackend:
+    """
+    纹理转换器后端,负责把(源路径, 输出路径)组装成参数列表
+
+    可配置参数:
+        tile_size: 瓦片尺寸,例如64
+        compression: 压缩方式,例如zip
+        mip_filter: mipmap过滤器,例如box、lanczos3
+        extra_args: 追加在最后的其他参数列表
+    """
+
+    name = ""
+    executable_names: tuple = ()
+    output_extension = ".tx"
+
+    def __init__(
+        self,
+        in_executable: str,
+        tile_size: int = None,
+        compression: str = None,
+        mip_filter: str = None,
+        extra_args=(),
+    ) -> None:
+        self.executable = in_executable
+        self.tile_size = tile_size
+        self.compression = compression
+        self.mip_filter = mip_filter
+        self.extra_args = list(extra_args)
+
+    def _option_args_(self) -> list:
+        return []
+
+    def build_argv(self, in_source_path: str, in_output_path: str) -> list:
+        return [self.executable, in_source_path, in_output_path] + self._option_args_()
+
+    def args_signature(self) -> str:
+        """
+        转换器和参数的描述,写入tx清单,参数变化时纹理会重新转换
+        """
+        return " ".join(
+            [self.name, os.path.basename(self.executable or "")]
+            + self._option_args_()
+        )
+
+
+class ImaketxBackend(ConverterBackend):
+    """
+    Houdini自带的imaketx:imaketx [options] source dest
+    """
+
+    name = "imaketx"
+    executable_names = ("imaketx",)
+
+    def _option_args_(self) -> list:
+        args = []
+        if self.tile_size:
+            args += ["--tile", str(self.tile_size), str(self.tile_size)]
+        if self.compression:
+            args += ["--compression", self.compression]
+        if self.mip_filter:
+            args += ["--mipfilter", self.mip_filter]
+        return args + self.extra_args
+
+    def build_argv(self, in_source_path: str, in_output_path: str) -> list:
+        return [self.executable] + self._option_args_() + [in_source_path, in_output_path]
+
+
+class MaketxBackend(ConverterBackend):
+    """
+    OpenImageIO的maketx:maketx source -o dest [options]
+    """
+
+    name = "maketx"
+    executable_names = ("maketx",)
+
+    def _option_args_(self) -> list:
+        args = []
+        if self.tile_size:
+            args += ["--tile", str(self.tile_size), str(self.tile_size)]
+        if self.compression:
+            args += ["--compression", self.compression]
+        if self.mip_filter:
+            args += ["--filter", self.mip_filter]
+        return args + self.extra_args
+
+    def build_argv(self, in_source_path: str, in_output_path: str) -> list:
+        return [self.executable, in_source_path, "-o", in_output_path] + self._option_args_()
+
+
+class IconvertBackend(ConverterBackend):
+    """
+    Houdini的iconvert,输出Houdini原生的.rat mipmap纹理:iconvert [options] source dest
+    """
+
+    name = "iconvert"
+    executable_names = ("iconvert",)
+    output_extension = ".rat"
+
+    def _option_args_(self) -> list:
+        args = []
+        if self.compression:
+            args += ["-c", self.compression]
+        return args + self.extra_args
+
+    def build_argv(self, in_source_path: str, in_output_path: str) -> list:
+        return [self.executable] + self._option_args_() + [in_source_path, in_output_path]
+
+
+class NullBackend(ConverterBackend):
+    """
+    不执行任何转换的替身后端,用于测试和不需要生成tx的流程
+    """
+
+    name = "null"
+
+    def build_argv(self, in_source_path: str, in_output_path: str):
+        return None
+
+
+CONVERTER_BACKENDS = {
+    backend.name: backend
+    for backend in (ImaketxBackend, MaketxBackend, IconvertBackend, NullBackend)
+}
+
+
+@functools.lru_cache(maxsize=None)
+def discover_converter_backends(in_search_dirs: tuple = ()) -> dict:
+    """
+    查找可用的转换器可执行文件,结果在会话内缓存
+
+    :param in_search_dirs: 优先查找的文件夹,例如$HB,之后查找PATH
+    :return: {后端名称: 可执行文件路径},NullBackend总是可用
+    :rtype: dict
+    """
+    found = {NullBackend.name: ""}
+    for name, backend in CONVERTER_BACKENDS.items():
+        for executable_name in backend.executable_names:
+            executable = None
+            for search_dir in in_search_dirs:
+                if search_dir and os.path.isdir(search_dir):
+                    executable = shutil.which(executable_name, path=search_dir)
+                    if executable:
+                        break
+            executable = executable or shutil.which(executable_name)
+            if executable:
+                found[name] = executable.replace(os.sep, "/")
+                break
+    return found
+
+
+def get_converter_backend(
+    in_name: str, in_search_dirs: tuple = (), **in_options
+) -> ConverterBackend:
+    """
+    按名称创建转换器后端,找不到对应可执行文件时抛出RuntimeError
+    """
+    if in_name not in CONVERTER_BACKENDS:
+        raise RuntimeError(
+            f"Unknown TX Converter {in_name},Available:{', '.join(CONVERTER_BACKENDS)}"
+        )
+    executable = discover_converter_backends(tuple(in_search_dirs)).get(in_name)
+    if executable is None:
+        raise RuntimeError(f"Fail To Find TX Converter {in_name} In {in_search_dirs} Or PATH")
+    return CONVERTER_BACKENDS[in_name](executable, **in_options)
+
+
+# 记录已转换纹理的清单文件,位于纹理所在文件夹
+MANIFEST_FILE_NAME = ".tx_manifest.json"
+HASH_CHUNK_SIZE = 4 * 1024 * 1024
+# 超过该大小的纹理默认只对文件大小和首尾数据块计算哈希
+PARTIAL_HASH_THRESHOLD = 512 * 1024 * 1024
+
+
+def hash_texture_file(in_file_path: str, in_partial_threshold: int = None) -> tuple:
+    """
+    分块读取并计算纹理内容哈希
+
+    :param in_file_path: 纹理路径
+    :param in_partial_threshold: 文件大小达到该值时只读取首尾各一个数据块,
+        并把文件大小计入哈希;为None时总是读取整个文件
+    :return: (哈希字符串, 文件大小)
+    :rtype: tuple
+    """
+    file_hash = hashlib.blake2b(digest_size=20)
+    with open(in_file_path, "rb") as texture_file:
+        file_size = os.fstat(texture_file.fileno()).st_size
+        if in_partial_threshold is not None and file_size >= in_partial_threshold:
+            file_hash.update(str(file_size).encode("utf-8"))
+            file_hash.update(texture_file.read(HASH_CHUNK_SIZE))
+            texture_file.seek(max(0, file_size - HASH_CHUNK_SIZE))
+            file_hash.update(texture_file.read(HASH_CHUNK_SIZE))
+            return "partial:" + file_hash.hexdigest(), file_size
+        chunk = texture_file.read(HASH_CHUNK_SIZE)
+        while chunk:
+            file_hash.update(chunk)
+            chunk = texture_file.read(HASH_CHUNK_SIZE)
+    return file_hash.hexdigest(), file_size
+
+
+class TxManifest:
+    """
+    单个纹理文件夹的转换清单,记录每张已生成tx的源纹理哈希、大小和转换参数
+    """
+
+    def __init__(self, in_folder: str) -> None:
+        self.folder = in_folder
+        self.manifest_path = os.path.join(in_folder, MANIFEST_FILE_NAME).replace(
+            os.sep, "/"
+        )
+        self.records: dict = {}
+        self.changed = False
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as manifest_file:
+                self.records = json.load(manifest_file).get("textures", {})
+        except (OSError, ValueError):
+            self.records = {}
+
+    def is_up_to_date(
+        self,
+        in_source_path: str,
+        in_hash: str,
+        in_size: int,
+        in_args: str,
+        in_output_extension: str = ".tx",
+    ) -> bool:
+        record = self.records.get(os.path.basename(in_source_path))
+        if record is None:
+            return False
+        if (record.get("hash"), record.get("size"), record.get("args")) != (
+            in_hash,
+            in_size,
+            in_args,
+        ):
+            return False
+        return os.path.isfile(get_tx_output_path(in_source_path, in_output_extension))
+
+    def record(self, in_source_path: str, in_hash: str, in_size: int, in_args: str):
+        self.records[os.path.basename(in_source_path)] = {
+            "hash": in_hash,
+            "size": in_size,
+            "args": in_args,
+        }
+        self.changed = True
+
+    def save(self):
+        if not self.changed:
+            return
+        # 先写临时文件再替换,避免中断时留下损坏的清单
+        temp_path = self.manifest_path + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as manifest_file:
+                json.dump({"version": 1, "textures": self.records}, manifest_file)
+            os.replace(temp_path, self.manifest_path)
+            self.changed = False
+        except OSError as error:
+            logger.error(f"Fail To Save TX Manifest {self.manifest_path}:{error}")
+
+
+class AsyncConvertEngine:
+    """
+    基于asyncio.create_subprocess_exec的转换引擎,不需要为每个转换进程占用一个python线程
+
+    - 信号量限制同时运行的转换进程数量
+    - 待转换纹理经过有界队列逐个送入,十万级纹理时内存占用保持平稳
+    - 每个任务有独立超时,超时和进程启动失败视为临时错误,按指数退避重试
+    - 传入in_args_signature时使用TxManifest跳过未变化的纹理
+
+    不依赖hou和Qt,可以在hython中直接用于农场预转换,见main()
+    """
+
+    def __init__(
+        self,
+        in_build_command,
+        in_max_concurrency: int,
+        in_timeout: float = None,
+        in_retries: int = 2,
+        in_backoff: float = 1.0,
+        in_queue_size: int = None,
+        in_output_extension: str = ".tx",
+        in_args_signature: str = None,
+        in_partial_threshold: int = PARTIAL_HASH_THRESHOLD,
+        in_cancel_event: threading.Event = None,
+    ) -> None:
+        """
+        :param in_build_command: 回调(源路径, 输出路径) -> 参数列表,返回None表示无需执行
+        :param in_max_concurrency: 同时运行的转换进程数量
+        :param in_timeout: 单个转换进程的超时时间,单位秒,None表示不限制
+        :param in_retries: 临时错误的最大重试次数
+        :param in_backoff: 第一次重试前的等待时间,之后每次翻倍
+        :param in_queue_size: 待转换队列长度,默认为并行数量的4倍
+        :param in_output_extension: 输出文件后缀
+        :param in_args_signature: 转换器参数描述,传入时启用TxManifest增量转换
+        :param in_partial_threshold: 见hash_texture_file
+        :param in_cancel_event: 设置后不再启动新的转换,剩余纹理返回"Cancelled"结果
+        """
+        self.build_command = in_build_command
+        self.max_concurrency = max(1, in_max_concurrency)
+        self.timeout = in_timeout
+        self.retries = max(0, in_retries)
+        self.backoff = in_backoff
+        self.queue_size = in_queue_size or self.max_concurrency * 4
+        self.output_extension = in_output_extension
+        self.args_signature = in_args_signature
+        self.partial_threshold = in_partial_threshold
+        self.cancel_event = in_cancel_event
+        self._manifests: dict = {}
+
+    def _get_manifest_(self, in_texture_path: str) -> TxManifest:
+        folder = os.path.dirname(in_texture_path)
+        manifest = self._manifests.get(folder)
+        if manifest is None:
+            manifest = self._manifests[folder] = TxManifest(folder)
+        return manifest
+
+    async def _run_process_(self, in_command) -> tuple:
+        """
+        执行一次转换进程,返回(返回码, 输出),超时时杀死进程并抛出asyncio.TimeoutError
+        """
+        process = await asyncio.create_subprocess_exec(
+            *in_command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(
+                process.communicate(), timeout=self.timeout
+            )
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise
+        message = (stderr or stdout or b"").decode("utf-8", "replace").strip()
+        return process.returncode, message
+
+    async def convert_one(
+        self, in_texture_path: str, in_semaphore: asyncio.Semaphore
+    ) -> ConvertResult:
+        output_path = get_tx_output_path(in_texture_path, self.output_extension)
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            return ConvertResult(in_texture_path, output_path, False, 0.0, "Cancelled")
+        file_hash = file_size = None
+        if self.args_signature is not None:
+            try:
+                file_hash, file_size = await asyncio.to_thread(
+                    hash_texture_file, in_texture_path, self.partial_threshold
+                )
+            except OSError as error:
+                return ConvertResult(in_texture_path, output_path, False, 0.0, str(error))
+            if self._get_manifest_(in_texture_path).is_up_to_date(
+                in_texture_path,
+                file_hash,
+                file_size,
+                self.args_signature,
+                self.output_extension,
+            ):
+                return ConvertResult(
+                    in_texture_path, output_path, True, 0.0, "Up To Date"
+                )
+        command = self.build_command(in_texture_path, output_path)
+        if command is None:
+            return ConvertResult(in_texture_path, output_path, True, 0.0, "Skipped")
+        start_time = time.time()
+        message = ""
+        success = False
+        for attempt in range(self.retries + 1):
+            if attempt > 0:
+                await asyncio.sleep(self.backoff * (2 ** (attempt - 1)))
+            try:
+                async with in_semaphore:
+                    return_code, message = await self._run_process_(command)
+            except asyncio.TimeoutError:
+                message = f"Timeout After {self.timeout}s (Attempt {attempt + 1})"
+                continue
+            except OSError as error:
+                message = f"{error} (Attempt {attempt + 1})"
+                continue
+            # 转换器明确返回失败时不重试
+            success = return_code == 0
+            break
+        if success and file_hash is not None:
+            self._get_manifest_(in_texture_path).record(
+                in_texture_path, file_hash, file_size, self.args_signature
+            )
+        duration = round(time.time() - start_time, 2)
+        return ConvertResult(in_texture_path, output_path, success, duration, message)
+
+    async def run(self, in_texture_paths, in_on_result=None) -> dict:
+        """
+        转换可迭代对象中的所有纹理,in_texture_paths可以是生成器,按需读取
+
+        :param in_texture_paths: 源纹理完整路径的可迭代对象
+        :param in_on_result: 回调(ConvertResult),每完成一个调用一次
+        :return: {"total": 数量, "converted": 数量, "skipped": 数量, "failed": 数量, "seconds": 耗时}
+        :rtype: dict
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        summary = {"total": 0, "converted": 0, "skipped": 0, "failed": 0}
+        start_time = time.time()
+
+        async def producer():
+            for texture_path in in_texture_paths:
+                await queue.put(texture_path)
+            for _ in range(self.max_concurrency):
+                await queue.put(None)
+
+        async def worker():
+            while True:
+                texture_path = await queue.get()
+                if texture_path is None:
+                    return
+                result = await self.convert_one(texture_path, semaphore)
+                summary["total"] += 1
+                if not result.success:
+                    summary["failed"] += 1
+                    logger.error(
+                        f"Failed to Convert {os.path.basename(result.source)},Reason:{result.message}"
+                    )
+                elif result.message in ("Up To Date", "Skipped"):
+                    summary["skipped"] += 1
+                else:
+                    summary["converted"] += 1
+                if in_on_result is not None:
+                    in_on_result(result)
+
+        try:
+            await asyncio.gather(
+                producer(), *(worker() for _ in range(self.max_concurrency))
+            )
+        finally:
+            for manifest in self._manifests.values():
+                manifest.save()
+        summary["seconds"] = round(time.time() - start_time, 2)
+        logger.info(
+            f"Finish Convert {summary['total']} Texture, Use {summary['seconds']} s ,Converted {summary['converted']},Skipped {summary['skipped']},Failed {summary['failed']}"
+        )
+        return summary
+
+
+def convert_textures_async(
+    in_texture_paths, in_engine: AsyncConvertEngine, in_on_progress=None
+) -> list:
+    """
+    用AsyncConvertEngine转换一批纹理并等待完成,供同步代码调用
+
+    :param in_texture_paths: 源纹理完整路径
+    :param in_engine: 转换引擎
+    :param in_on_progress: 回调(已完成数量, 总数量, ConvertResult)
+    :return: 与in_texture_paths顺序一致的ConvertResult列表
+    :rtype: list
+    """
+    texture_paths = list(in_texture_paths)
+    # 重复的路径只转换一次
+    unique_paths = list(dict.fromkeys(texture_paths))
+    texture_count = len(unique_paths)
+    path_results = {}
+
+    def on_result(in_result: ConvertResult):
+        path_results[in_result.source] = in_result
+        if in_on_progress is not None:
+            in_on_progress(len(path_results), texture_count, in_result)
+
+    asyncio.run(in_engine.run(unique_paths, on_result))
+    return [path_results.get(path) for path in texture_paths]
+
+
+def iter_texture_files(in_root_paths, in_image_formats: tuple, in_recursive: bool = True):
+    """
+    逐个产出根目录下的图片完整路径,不预先生成列表
+    """
+    for root_path in in_root_paths:
+        if os.path.isfile(root_path):
+            yield root_path.replace(os.sep, "/")
+            continue
+        pending_dirs = [root_path]
+        while pending_dirs:
+            dir_path = pending_dirs.pop()
+            try:
+                with os.scandir(dir_path) as entries:
+                    for entry in entries:
+                        if entry.name.endswith(in_image_formats) and entry.is_file():
+                            yield entry.path.replace(os.sep, "/")
+                        elif in_recursive and entry.is_dir(follow_symlinks=False):
+                            pending_dirs.append(entry.path)
+            except OSError as error:
+                logger.error(f"Fail To Scan {dir_path}:{error}")
+
+
+def main(in_argv=None) -> int:
+    """
+    农场预转换入口,例如:
+
+        hython -m modules.tx_convert /textures/library --backend imaketx --jobs 16
+    """
+    import argparse
+
+    from modules.texture_utils import SUPPORT_IMAGE_FORMAT
+
+    parser = argparse.ArgumentParser(description="Pre-convert textures to TX")
+    parser.add_argument("roots", nargs="+", help="Texture files or folders")
+    parser.add_argument(
+        "--backend", default=ImaketxBackend.name, choices=sorted(CONVERTER_BACKENDS)
+    )
+    parser.add_argument(
+        "--search-dir",
+        action="append",
+        default=[],
+        help="Extra folder to find the converter in, e.g. $HB",
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=max(1, round((os.cpu_count() or 1) * 0.8))
+    )
+    parser.add_argument("--timeout", type=float, default=None, help="Seconds per texture")
+    parser.add_argument("--retries", type=int, default=2)
+    parser.add_argument("--tile-size", type=int, default=None)
+    parser.add_argument("--compression", default=None)
+    parser.add_argument("--mip-filter", default=None)
+    parser.add_argument("--no-recursive", action="store_true")
+    parser.add_argument(
+        "--force", action="store_true", help="Ignore TX manifests and convert everything"
+    )
+    args = parser.parse_args(in_argv)
+
+    logging.basicConfig(level=logging.INFO)
+    search_dirs = tuple(args.search_dir) + (os.environ.get("HB", ""),)
+    backend = get_converter_backend(
+        args.backend,
+        search_dirs,
+        tile_size=args.tile_size,
+        compression=args.compression,
+        mip_filter=args.mip_filter,
+    )
+    engine = AsyncConvertEngine(
+        backend.build_argv,
+        args.jobs,
+        in_timeout=args.timeout,
+        in_retries=args.retries,
+        in_output_extension=backend.output_extension,
+        in_args_signature=None if args.force else backend.args_signature(),
+    )
+    summary = asyncio.run(
+        engine.run(
+            iter_texture_files(args.roots, SUPPORT_IMAGE_FORMAT, not args.no_recursive)
+        )
+    )
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,309 @@
+"""
+无界面批量创建MaterialX材质,用于在农场上预先构建材质库:
+
+    hython -m tools.BatchMaterialBuilder /library/textures /stage/materiallibrary1 \
+        --recursive --hip scene.hip --save scene_materials.hip --summary summary.json
+
+对比逐个创建和批量模式的耗时与每个材质的节点/参数操作次数:
+
+    hython -m tools.BatchMaterialBuilder /library/textures /stage/materiallibrary1 --benchmark 200
+"""
+import argparse
+import json
+import os
+import time
+
+import hou
+import modules.texture_utils as texture_utils
+import tools.tex_to_mtlx as tex_to_mtlx
+
+
+def collect_texture_sets(
+    in_texture_root: str,
+    in_recursive: bool = False,
+    in_max_depth: int = -1,
+    in_include_globs=(),
+    in_exclude_globs=(),
+) -> dict:
+    """
+    解析纹理根目录,返回与TxToMtlx.tex_collection结构一致的字典
+    """
+    classifier = texture_utils.get_texture_classifier(
+        tex_to_mtlx.TxToMtlx.TEX_TYPE, tex_to_mtlx.MtlxMaterial.TEXTURE_TYPE_SORTED
+    )
+    tex_collection = {}
+
+    def on_folder_parsed(in_dir_path: str, in_rel_path: str, in_collection: dict):
+        texture_utils.merge_folder_collection(
+            tex_collection, in_dir_path, in_rel_path, in_collection
+        )
+
+    texture_utils.crawl_texture_tree(
+        in_texture_root,
+        classifier,
+        texture_utils.SUPPORT_IMAGE_FORMAT,
+        on_folder_parsed,
+        in_max_depth=in_max_depth if in_recursive else 0,
+        in_include_globs=in_include_globs,
+        in_exclude_globs=in_exclude_globs,
+        in_max_workers=min(16, os.cpu_count() or 1),
+    )
+    return tex_collection
+
+
+def get_material_library(in_node_path: str, in_create: bool = False) -> hou.OpNode:
+    """
+    获取目标材质库节点,in_create为True且节点不存在时在父网络中创建materiallibrary
+    """
+    material_lib_node = hou.node(in_node_path)
+    if material_lib_node or not in_create:
+        return material_lib_node
+    parent_path, node_name = in_node_path.rstrip("/").rsplit("/", 1)
+    parent_node = hou.node(parent_path or "/")
+    if not parent_node:
+        return None
+    return parent_node.createNode("materiallibrary", node_name)
+
+
+def build_material_library(
+    in_tex_collection: dict,
+    in_material_lib_node: hou.OpNode,
+    in_use_tx: bool = False,
+    in_chunk_size: int = 50,
+    in_material_options: dict = None,
+) -> dict:
+    """
+    为tex_collection中的每个纹理组创建材质,每个分块以批量模式(见tex_to_mtlx.build_materials)执行,
+    全部分块完成后统一布局,每完成一个分块打印一次吞吐量
+
+    :param in_material_options: 传给MtlxMaterial的分辨率参数,
+        例如{"resolution_policy": "cap", "max_resolution": "4k", "proxy_resolution": "1k"}
+
+    :return: 统计信息字典,见main()写出的json
+    :rtype: dict
+    """
+    base_info = {
+        "b_use_mtlTX": in_use_tx,
+        "node_path": in_material_lib_node.path(),
+        "node_ref": in_material_lib_node,
+        "tex_folder_path": "",
+    }
+    material_names = list(in_tex_collection.keys())
+    summary = {
+        "material_lib": in_material_lib_node.path(),
+        "material_count": len(material_names),
+        "created": 0,
+        "failed": [],
+        "nodes": 0,
+        "tx_converted": 0,
+        "tx_failed": [],
+    }
+    start_time = time.time()
+
+    materials = [
+        tex_to_mtlx.MtlxMaterial(
+            material_name,
+            **base_info,
+            all_texture_dict=in_tex_collection,
+            b_tx_ready=in_use_tx,
+            **(in_material_options or {}),
+        )
+        for material_name in material_names
+    ]
+    materials = tex_to_mtlx.add_proxy_materials(materials)
+    if in_use_tx and materials:
+        convert_start_time = time.time()
+        convert_report = tex_to_mtlx.convert_materials_to_TX(materials)
+        summary["tx_converted"] = sum(1 for result in convert_report if result.success)
+        summary["tx_failed"] = [
+            result.source for result in convert_report if not result.success
+        ]
+        summary["tx_seconds"] = round(time.time() - convert_start_time, 2)
+        print(
+            f"Converted {summary['tx_converted']} Textures In {summary['tx_seconds']}s,Failed {len(summary['tx_failed'])}"
+        )
+
+    build_start_time = time.time()
+    material_nodes = []
+    chunk_size = max(1, in_chunk_size)
+    # 材质原型在所有分块之间复用,最后一个分块结束后才删除
+    try:
+        for chunk_start in range(0, len(materials), chunk_size):
+            chunk = materials[chunk_start : chunk_start + chunk_size]
+            chunk_start_time = time.time()
+            chunk_nodes = 0
+            chunk_material_nodes = tex_to_mtlx.build_materials(
+                chunk, in_layout=False, in_release_prototypes=False
+            )
+            for material, material_node in zip(chunk, chunk_material_nodes):
+                if material_node is None:
+                    summary["failed"].append(material.mat_name)
+                    continue
+                summary["created"] += 1
+                chunk_nodes += 1 + len(material_node.children())
+            material_nodes.extend(chunk_material_nodes)
+            summary["nodes"] += chunk_nodes
+            chunk_seconds = max(time.time() - chunk_start_time, 1e-6)
+            print(
+                f"[{chunk_start + len(chunk)}/{len(materials)}] "
+                f"{len(chunk) / chunk_seconds:.1f} materials/s, {chunk_nodes / chunk_seconds:.1f} nodes/s"
+            )
+    finally:
+        tex_to_mtlx.release_material_prototypes()
+    with tex_to_mtlx.bulk_build_context():
+        tex_to_mtlx.layout_material_nodes(material_nodes)
+    build_seconds = max(time.time() - build_start_time, 1e-6)
+    summary["op_stats"] = tex_to_mtlx.summarize_op_stats(materials)
+    summary["build_seconds"] = round(build_seconds, 2)
+    summary["total_seconds"] = round(time.time() - start_time, 2)
+    summary["materials_per_second"] = round(summary["created"] / build_seconds, 2)
+    summary["nodes_per_second"] = round(summary["nodes"] / build_seconds, 2)
+    print(
+        f"Created {summary['created']}/{len(materials)} Materials,{summary['nodes']} Nodes In {summary['build_seconds']}s "
+        f"({summary['materials_per_second']} materials/s, {summary['nodes_per_second']} nodes/s)"
+    )
+    return summary
+
+
+def benchmark_build_modes(
+    in_tex_collection: dict, in_material_lib_node: hou.OpNode, in_count: int = 100
+) -> dict:
+    """
+    用前in_count个纹理组分别以逐个创建(记录撤销、每个材质布局一次)和批量模式创建材质,
+    比较耗时和每个材质的节点/参数操作次数,测试创建的节点会被删除
+
+    :return: {"legacy": {...}, "bulk": {...}}
+    :rtype: dict
+    """
+    base_info = {
+        "b_use_mtlTX": False,
+        "node_path": in_material_lib_node.path(),
+        "node_ref": in_material_lib_node,
+        "tex_folder_path": "",
+    }
+    material_names = list(in_tex_collection.keys())[:in_count]
+    result = {}
+    for mode in ("legacy", "bulk"):
+        materials = [
+            tex_to_mtlx.MtlxMaterial(
+                material_name, **base_info, all_texture_dict=in_tex_collection
+            )
+            for material_name in material_names
+        ]
+        start_time = time.time()
+        if mode == "bulk":
+            material_nodes = tex_to_mtlx.build_materials(materials)
+        else:
+            material_nodes = [material.create_material() for material in materials]
+        seconds = max(time.time() - start_time, 1e-6)
+        op_stats = tex_to_mtlx.summarize_op_stats(materials)
+        result[mode] = {
+            "seconds": round(seconds, 3),
+            "materials_per_second": round(len(materials) / seconds, 2),
+            "ops_per_material": op_stats["per_material"],
+        }
+        print(
+            f"{mode}: {len(materials)} materials in {seconds:.2f}s "
+            f"({len(materials) / seconds:.1f} materials/s), per material {op_stats['per_material']}"
+        )
+        with hou.undos.disabler():
+            for material_node in material_nodes:
+                if material_node is not None:
+                    material_node.destroy()
+    return result
+
+
+def main(in_argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Build MaterialX materials for every texture set without UI"
+    )
+    parser.add_argument("texture_root", help="Folder that contains texture sets")
+    parser.add_argument("material_lib", help="Material library node path")
+    parser.add_argument("--hip", help="Hip file to load before building")
+    parser.add_argument("--save", help="Hip file to save after building")
+    parser.add_argument(
+        "--create-lib",
+        action="store_true",
+        help="Create a materiallibrary node if the path does not exist",
+    )
+    parser.add_argument("--recursive", action="store_true")
+    parser.add_argument("--max-depth", type=int, default=-1)
+    parser.add_argument(
+        "--include", action="append", default=[], help="Folder include glob"
+    )
+    parser.add_argument(
+        "--exclude", action="append", default=[], help="Folder exclude glob"
+    )
+    parser.add_argument("--tx", action="store_true", help="Convert textures to TX first")
+    parser.add_argument("--chunk-size", type=int, default=50)
+    parser.add_argument(
+        "--resolution",
+        choices=("highest", "lowest"),
+        default="highest",
+        help="Resolution to use when a texture exists in several resolutions",
+    )
+    parser.add_argument(
+        "--max-resolution", help="Use the highest resolution up to this, e.g. 4k"
+    )
+    parser.add_argument(
+        "--proxy-resolution",
+        help="Also build <material>_proxy materials up to this resolution, e.g. 1k",
+    )
+    parser.add_argument("--summary", help="Write a JSON summary to this path")
+    parser.add_argument(
+        "--benchmark",
+        type=int,
+        default=0,
+        metavar="COUNT",
+        help="Compare per-material and bulk build on COUNT materials, then exit",
+    )
+    args = parser.parse_args(in_argv)
+
+    if args.hip:
+        hou.hipFile.load(args.hip, suppress_save_prompt=True, ignore_load_warnings=True)
+    material_lib_node = get_material_library(args.material_lib, args.create_lib)
+    if not material_lib_node:
+        print(f"Invalid Material Library {args.material_lib}")
+        return 1
+
+    scan_start_time = time.time()
+    tex_collection = collect_texture_sets(
+        args.texture_root,
+        args.recursive,
+        args.max_depth,
+        tuple(args.include),
+        tuple(args.exclude),
+    )
+    scan_seconds = round(time.time() - scan_start_time, 2)
+    print(f"Found {len(tex_collection)} Texture Sets In {scan_seconds}s")
+
+    if args.benchmark > 0:
+        benchmark = benchmark_build_modes(
+            tex_collection, material_lib_node, args.benchmark
+        )
+        if args.summary:
+            with open(args.summary, "w", encoding="utf-8") as summary_file:
+                json.dump(benchmark, summary_file, indent=4)
+        return 0
+
+    material_options = {
+        "resolution_policy": "cap" if args.max_resolution else args.resolution,
+        "max_resolution": args.max_resolution,
+        "proxy_resolution": args.proxy_resolution,
+    }
+    summary = build_material_library(
+        tex_collection, material_lib_node, args.tx, args.chunk_size, material_options
+    )
+    summary["texture_root"] = args.texture_root
+    summary["scan_seconds"] = scan_seconds
+    if args.save:
+        hou.hipFile.save(args.save)
+        summary["hip"] = args.save
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as summary_file:
+            json.dump(summary, summary_file, indent=4)
+    return 1 if summary["failed"] or summary["tx_failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,17 +3,22 @@ import os
 import datetime
 import platform
 import shutil
+import sqlite3
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from PySide6 import QtCore, QtUiTools, QtWidgets, QtGui
+import modules.cache_index as cache_index
+import modules.cache_node_registry as cache_node_registry
+import modules.cache_utils as cache_utils
 
 
 class SceneCacheManagerUI(QtWidgets.QMainWindow):
-    # 节点类型和输出数据路径配置的属性名称
-    CACHE_NODES = {
-        "rop_geometry": "sopoutput",
-        "rop_alembic": "filename",
-        "rop_fbx": "sopoutput",
-        "rop_dop": "dopoutput",
-    }
+    # 节点类型和输出数据路径配置的属性名称见modules.cache_node_registry,可通过配置文件扩展
+
+    # 后台统计完成前显示的占位文本
+    SIZING_TEXT = "sizing…"
+    PENDING_TEXT = "…"
 
     KB = 1024
     MB = KB * 1024
@@ -28,9 +33,28 @@ class SceneCacheManagerUI(QtWidgets.QMainWindow):
         self.setWindowTitle("Scene Cache Manager")
         self.setMinimumWidth(1200)
 
+        self.node_discovery = cache_node_registry.get_cache_node_discovery()
+        self.thread_pool = QtCore.QThreadPool(self)
+        self.scan_task: ScanSizingTask = None
         self._init_ui_()
         self._init_bindings_()
         self.cache_data = []
+        # 与cache_data同序的树节点和统计完成的字节数{行号: 字节数}
+        self.cache_items = []
+        self.cache_sizes = {}
+        # $JOB下的持久化统计,重新扫描时只列举有变化的文件夹
+        self.footprint_index = self._open_footprint_index_()
+        # 文件夹大小在一次扫描内缓存,ScanScene开始时重新创建
+        self.size_engine = cache_utils.FolderSizeEngine(
+            in_footprint_index=self.footprint_index
+        )
+
+    def _open_footprint_index_(self):
+        try:
+            return cache_index.CacheFootprintIndex()
+        except (sqlite3.Error, OSError) as error:
+            print(f"Fail To Open Cache Footprint Index,Fallback To Full Scan: {error}")
+            return None
 
     def _init_ui_(self):
         self.cache_tree: QtWidgets.QTreeWidget = self.ui.findChild(
@@ -55,6 +79,24 @@ class SceneCacheManagerUI(QtWidgets.QMainWindow):
             QtWidgets.QPushButton, "bt_scan"
         )
 
+        # 扫描进度和取消按钮,放在Scan按钮右侧
+        self.button_layout: QtWidgets.QHBoxLayout = self.ui.findChild(
+            QtWidgets.QHBoxLayout, "button_layout"
+        )
+        self.scan_progress = QtWidgets.QProgressBar()
+        self.scan_progress.setFormat("Sizing %v/%m")
+        self.scan_progress.setVisible(False)
+        self.bt_cancel_scan = QtWidgets.QPushButton("Cancel")
+        self.bt_cancel_scan.setEnabled(False)
+        self.button_layout.insertWidget(1, self.scan_progress)
+        self.button_layout.insertWidget(2, self.bt_cancel_scan)
+
+        # 帧序列信息列,不在ui文件中
+        self.frames_column = self.cache_tree.columnCount()
+        self.cache_tree.setColumnCount(self.frames_column + 1)
+        self.cache_tree.headerItem().setText(self.frames_column, "Frames")
+
+        self.scan_button.setToolTip("Shift+Click To Reload The Node Registry And Rescan All Nodes")
         self.cache_tree.setSortingEnabled(True)
 
         self.cache_tree.setContextMenuPolicy(QtCore.Qt.CustomContextMenu)
@@ -64,54 +106,238 @@ class SceneCacheManagerUI(QtWidgets.QMainWindow):
         self.cleanup_button.clicked.connect(lambda: self._cleanup_(True))
         self.explorer_button.clicked.connect(self._open_explore_)
         self.scan_button.clicked.connect(self.ScanScene)
+        self.bt_cancel_scan.clicked.connect(self._cancel_scan_)
 
         self.cache_tree.itemDoubleClicked.connect(self._focus_on_node_)
 
     def ScanScene(self):
+        """
+        在主线程中查找缓存节点并立即列出,版本数量、修改时间和大小在后台线程中统计,逐行填入;
+        每次都重新查找节点,按住Shift点击时重新读取节点注册表
+        """
+        b_force_discovery = bool(
+            QtWidgets.QApplication.keyboardModifiers() & QtCore.Qt.ShiftModifier
+        )
+        self._cancel_scan_()
         self.cache_tree.clear()
         self.cache_data = []
+        self.cache_items = []
+        self.cache_sizes = {}
+        self.size_engine = cache_utils.FolderSizeEngine(
+            in_footprint_index=self.footprint_index
+        )
         print("Scan Button Was Clicked")
+        # (节点, 注册表条目, 缓存路径, 帧序列正则, 帧范围)
+        cache_nodes_info = []
 
-        # Scan All Node，前边列举过所有种类的节点和他们输出属性的名称
-        for node_type, output_property in self.CACHE_NODES.items():
-            # 下面两行要一起理解，hou.nodeType需要输入一个category，对应的就是hou.sopNodeTypeCategory()，使用数组方便扩展更多Net的数据
-            for category in [
-                hou.sopNodeTypeCategory(),
-                hou.dopNodeTypeCategory(),
-                hou.ropNodeTypeCategory(),
-            ]:
-                node_type_in_category = hou.nodeType(category, node_type)
-                if not node_type_in_category:
-                    continue
-                cache_nodes = node_type_in_category.instances()
-                for single_cache_node in cache_nodes:
-                    cache_path = single_cache_node.parm(output_property).eval()
-                    if not cache_path:
-                        continue
-                    last_modified_str = self._get_last_modify_time_(cache_path)
-                    total_version_count, node_cache_size_sum = (
-                        self._get_total_version_info_(cache_path)
-                    )
-                    other_version_count = max(0, total_version_count - 1)
-                    # relative_path = self._convert_to_relative_path(cache_path)
-                    node_name, node_path, node_type_real = self._get_node_base_info_(
-                        single_cache_node
-                    )
-                    node_data = {
-                        "node_name": node_name,
-                        "node_path": node_path,
-                        "node_type": node_type_real,
-                        "cache_path": cache_path,
-                        "current_version": self._get_current_version_(node_path),
-                        "other_versions": str(other_version_count),
-                        "lastmodified": last_modified_str,
-                        "total_size": self._convert_byte_to_bigger_unit_(
-                            node_cache_size_sum
-                        ),
-                    }
-                    self._add_to_tree(node_data)
-                    self.cache_data.append(node_data)
+        # Scan All Node，注册表中每种节点类型调用一次instances()
+        for single_cache_node, registry_entry in self.node_discovery.discover(
+            b_force_discovery
+        ):
+            cache_parm = single_cache_node.parm(registry_entry.output_parm)
+            if cache_parm is None:
+                continue
+            cache_path = cache_parm.eval()
+            if not cache_path:
+                continue
+            cache_nodes_info.append(
+                (
+                    single_cache_node,
+                    registry_entry,
+                    cache_path,
+                    self._get_frame_pattern_(
+                        single_cache_node, cache_parm, cache_path
+                    ),
+                    self._get_frame_range_(single_cache_node),
+                )
+            )
+
+        # 统计完成前按插入顺序显示,避免行在填入结果时跳动
+        self.cache_tree.setSortingEnabled(False)
+        # 文件缓存节点和它内部的ROP对应同一行,保留注册表中靠前的条目
+        listed_node_paths = set()
+        row_frame_patterns = []
+        for (
+            single_cache_node,
+            registry_entry,
+            cache_path,
+            frame_regex,
+            frame_range,
+        ) in cache_nodes_info:
+            # relative_path = self._convert_to_relative_path(cache_path)
+            node_name, node_path, node_type_real = self._get_node_base_info_(
+                single_cache_node
+            )
+            if node_path in listed_node_paths:
+                continue
+            listed_node_paths.add(node_path)
+            row_frame_patterns.append((frame_regex, frame_range))
+            node_data = {
+                "node_name": node_name,
+                "node_path": node_path,
+                "node_type": node_type_real,
+                "cache_path": cache_path,
+                "current_version": self._get_current_version_(
+                    node_path, registry_entry.version_parm
+                ),
+                "other_versions": self.PENDING_TEXT,
+                "lastmodified": self.PENDING_TEXT,
+                "total_size": self.SIZING_TEXT,
+                "frames": self.PENDING_TEXT,
+            }
+            self.cache_items.append(self._add_to_tree(node_data))
+            self.cache_data.append(node_data)
         self._update_stat_text_()
+        if not self.cache_data:
+            self.cache_tree.setSortingEnabled(True)
+            return
+
+        task = ScanSizingTask(
+            [node_data["cache_path"] for node_data in self.cache_data],
+            self._get_versions_path_,
+            self._get_last_modify_time_,
+            self.size_engine,
+            row_frame_patterns,
+        )
+        # 信号在任务启动前连接,每次扫描使用独立的信号对象
+        task.signals.row_sized.connect(self._on_row_sized_)
+        task.signals.progress.connect(self._on_scan_progress_)
+        task.signals.finished.connect(self._on_scan_finished_)
+        self.scan_task = task
+        self.scan_progress.setRange(0, len(self.cache_data))
+        self.scan_progress.setValue(0)
+        self.scan_progress.setVisible(True)
+        self.bt_cancel_scan.setEnabled(True)
+        self.thread_pool.start(task)
+
+    def _is_current_scan_(self) -> bool:
+        return self.scan_task is not None and self.sender() is self.scan_task.signals
+
+    def _on_row_sized_(self, in_result: dict):
+        if not self._is_current_scan_():
+            return
+        row = in_result["row"]
+        node_data = self.cache_data[row]
+        node_data["other_versions"] = str(max(0, in_result["version_count"] - 1))
+        node_data["lastmodified"] = in_result["lastmodified"]
+        node_data["total_size"] = self._convert_byte_to_bigger_unit_(
+            in_result["total_bytes"]
+        )
+        self.cache_sizes[row] = in_result["total_bytes"]
+        item = self.cache_items[row]
+        frame_infos = in_result["frames"]
+        node_data["frames"] = "--"
+        if frame_infos is not None:
+            current_folder = os.path.normpath(os.path.dirname(node_data["cache_path"]))
+            current_info = None
+            tooltip_lines = []
+            for version_path, frame_info in sorted(frame_infos.items()):
+                if os.path.normpath(version_path) == current_folder:
+                    current_info = frame_info
+                tooltip_lines.append(
+                    f"{os.path.basename(version_path)}: {self._format_frame_info_(frame_info, True)}"
+                )
+            node_data["frames"] = self._format_frame_info_(current_info)
+            item.setToolTip(self.frames_column, "\n".join(tooltip_lines))
+            # 修改时间使用当前版本最新一帧,而不是当前帧的文件
+            if current_info is not None and current_info.newest_mtime_ns:
+                node_data["lastmodified"] = self._format_time_stamp_(
+                    current_info.newest_mtime_ns / 1e9
+                )
+        data_keys = list(node_data.keys())
+        for key in ("other_versions", "lastmodified", "total_size", "frames"):
+            item.setText(data_keys.index(key), node_data[key])
+
+    def _format_frame_info_(
+        self, in_frame_info: cache_utils.FrameSequenceInfo, in_detail: bool = False
+    ) -> str:
+        """
+        返回"1001-1240 (236/240)"形式的帧范围,in_detail为True时附加缺失帧和单帧大小
+        """
+        if in_frame_info is None or in_frame_info.frame_count == 0:
+            return "No Frames"
+        frame_count = in_frame_info.frame_count
+        missing_count = len(in_frame_info.missing_frames)
+        text = f"{in_frame_info.first_frame}-{in_frame_info.last_frame}"
+        if missing_count:
+            text += f" ({frame_count}/{frame_count + missing_count})"
+        else:
+            text += f" ({frame_count})"
+        if in_detail:
+            if missing_count:
+                text += f", Missing {cache_utils.format_frame_ranges(in_frame_info.missing_frames)}"
+            text += (
+                f", Per Frame {self._convert_byte_to_bigger_unit_(round(in_frame_info.mean_bytes))}"
+                f" (Min {self._convert_byte_to_bigger_unit_(in_frame_info.min_bytes)},"
+                f" Max {self._convert_byte_to_bigger_unit_(in_frame_info.max_bytes)})"
+            )
+        return text
+
+    def _get_frame_pattern_(
+        self, in_node: hou.Node, in_parm: hou.Parm, in_cache_path: str
+    ):
+        """
+        在起始帧和下一帧分别计算输出参数,把文件名中不同的数字段作为帧号转换为帧序列正则;
+        由参数自己计算,$OS、相对路径的chs()等引用都按节点展开。
+        文件名中没有帧号或两帧输出到不同文件夹时返回None
+        """
+        start_parm = in_node.parm("f1")
+        start_frame = start_parm.eval() if start_parm is not None else hou.frame()
+        try:
+            frame_path = in_parm.evalAtFrame(start_frame)
+            next_frame_path = in_parm.evalAtFrame(start_frame + 1)
+        except hou.OperationFailed:
+            return None
+        frame_folder, frame_name = os.path.split(frame_path.replace("\\", "/"))
+        next_frame_folder, next_frame_name = os.path.split(
+            next_frame_path.replace("\\", "/")
+        )
+        if frame_folder != next_frame_folder:
+            return None
+        version_name = os.path.basename(os.path.dirname(in_cache_path))
+        return cache_utils.build_frame_regex(frame_name, next_frame_name, version_name)
+
+    def _get_frame_range_(self, in_node: hou.Node):
+        """
+        返回节点设置的(起始帧, 结束帧, 间隔),只渲染当前帧或没有帧范围参数时返回None
+        """
+        trange_parm = in_node.parm("trange")
+        start_parm = in_node.parm("f1")
+        end_parm = in_node.parm("f2")
+        if not trange_parm or not start_parm or not end_parm or trange_parm.eval() == 0:
+            return None
+        step_parm = in_node.parm("f3")
+        step = step_parm.eval() if step_parm is not None else 1
+        return (int(start_parm.eval()), int(end_parm.eval()), max(1, int(round(step))))
+
+    def _on_scan_progress_(self, in_done: int, in_total: int):
+        if not self._is_current_scan_():
+            return
+        self.scan_progress.setValue(in_done)
+        self._update_stat_text_()
+
+    def _on_scan_finished_(self, in_cancelled: bool):
+        if not self._is_current_scan_():
+            return
+        self.scan_task = None
+        self._finish_scan_()
+        if in_cancelled:
+            # 未完成的行保留占位内容
+            print("Scan Cancelled")
+        self._update_stat_text_()
+
+    def _finish_scan_(self):
+        self.scan_progress.setVisible(False)
+        self.bt_cancel_scan.setEnabled(False)
+        self.cache_tree.setSortingEnabled(True)
+
+    def _cancel_scan_(self):
+        if self.scan_task is None:
+            return
+        self.scan_task.cancel()
+        # 旧任务的信号不再处理,已经填入的结果保留
+        self.scan_task = None
+        self._finish_scan_()
 
     def _add_to_tree(self, in_node_data: dict):
         item = QtWidgets.QTreeWidgetItem(self.cache_tree)
@@ -119,6 +345,7 @@ class SceneCacheManagerUI(QtWidgets.QMainWindow):
         for i in range(len(data_keys)):
             # print(data_keys[i])
             item.setText(i, in_node_data[data_keys[i]])
+        return item
 
     def _get_node_base_info_(self, in_node: hou.Node):
         """
@@ -156,11 +383,15 @@ class SceneCacheManagerUI(QtWidgets.QMainWindow):
             relative_path = in_absolute_path.replace(project_path, "$HIP")
         return relative_path
 
-    def _get_current_version_(self, in_node_path: str) -> str:
+    def _get_current_version_(
+        self, in_node_path: str, in_version_parm: str = "version"
+    ) -> str:
         # 这里有不明原因必须这么做，传入Node即使调用Node.path()也无法获取对应值
         target_node: hou.OpNode = hou.node(in_node_path)
+        if not in_version_parm:
+            return "N/A"
         try:
-            version = target_node.parm("version").eval()
+            version = target_node.parm(in_version_parm).eval()
             # print(type(target_node.parm("version")))
             return str(version) if version else "N/A"
         except:
@@ -212,25 +443,25 @@ class SceneCacheManagerUI(QtWidgets.QMainWindow):
         """
         获取缓存路径中历史版本数量，返回文件数量和总大小,均为int
         """
-        cache_size_sum = 0
         # 先切分文件名和所在路径，再使用dirname返回上一层
         version = self._get_versions_path_(in_cache_dir,True)
         if len(version) == 0:
             return (0, 0)
-        for cache_path in version:
-            cache_size_sum += self._get_folder_size_(cache_path)
+        # 同一次扫描中已经统计过的版本文件夹直接使用缓存结果
+        cache_size_sum = sum(self.size_engine.get_sizes(version).values())
         return (len(version), cache_size_sum)
 
     def _get_last_modify_time_(self, in_file_path: str) -> str:
         if os.path.exists(in_file_path):
-            time_stamp = os.path.getmtime(in_file_path)
-            timestr = datetime.datetime.fromtimestamp(time_stamp).strftime(
-                "%d/%m/%Y, %H:%M"
-            )
-            return timestr
+            return self._format_time_stamp_(os.path.getmtime(in_file_path))
         else:
             return "--"
 
+    def _format_time_stamp_(self, in_time_stamp: float) -> str:
+        return datetime.datetime.fromtimestamp(in_time_stamp).strftime(
+            "%d/%m/%Y, %H:%M"
+        )
+
     def _focus_on_node_(self):
         """
         聚焦到首个所选对象
@@ -313,7 +544,8 @@ class SceneCacheManagerUI(QtWidgets.QMainWindow):
         # 获取对象缓存路径
         for node in target_nodes:
             # 获取历史版本计数，没有历史版本直接跳过
-            if int(node.text(5)) < 1:
+            # 还在统计中的行跳过
+            if not node.text(5).isdigit() or int(node.text(5)) < 1:
                 continue
             current_cache_path = node.text(3)
             other_version_path = self._get_versions_path_(current_cache_path, False)
@@ -335,9 +567,13 @@ class SceneCacheManagerUI(QtWidgets.QMainWindow):
             hou.ui.displayMessage("Cancel Delete", severity=hou.severityType.Message)
             return
         # 确认删除
+        # 删除后大小缓存失效
+        self.size_engine.clear()
         for single_folder in folders_to_delete:
             try:
                 shutil.rmtree(single_folder)
+                if self.footprint_index is not None:
+                    self.footprint_index.forget(single_folder)
             except Exception as Error:
                 hou.ui.displayMessage(
                     f"Fail to Delete {single_folder},Reason {Error}",
@@ -347,19 +583,14 @@ class SceneCacheManagerUI(QtWidgets.QMainWindow):
     def _update_stat_text_(self):
         self.total_node.setText("Total Cache Nodes:" + str(len(self.cache_data)))
 
-        total_cache_size = 0
-        for node_cache_info in self.cache_data:
-            target_cache_path = node_cache_info["cache_path"]
-            cache_size_of_current_node = self._get_total_version_info_(
-                target_cache_path
-            )[1]
-            total_cache_size += cache_size_of_current_node
-            print(
-                f"Node {node_cache_info['node_name']} With Cache Size:{cache_size_of_current_node},At Path{target_cache_path}"
-            )
-        self.total_size.setText(
-            "Total Cache Size:" + self._convert_byte_to_bigger_unit_(total_cache_size)
+        # 使用后台统计的结果,不再重新统计文件夹
+        total_cache_size = sum(self.cache_sizes.values())
+        size_text = "Total Cache Size:" + self._convert_byte_to_bigger_unit_(
+            total_cache_size
         )
+        if len(self.cache_sizes) < len(self.cache_data):
+            size_text += f" ({len(self.cache_sizes)}/{len(self.cache_data)} {self.SIZING_TEXT})"
+        self.total_size.setText(size_text)
 
     def _convert_byte_to_bigger_unit_(self, in_num_in_byte: int) -> str:
         if in_num_in_byte == 0:
@@ -373,13 +604,172 @@ class SceneCacheManagerUI(QtWidgets.QMainWindow):
         return f"{in_num_in_byte/self.GB:.2f} GB"
 
     def _get_folder_size_(self, in_target_path: str) -> int:
-        if not os.path.exists:
-            return 0
-        folder_size = 0
-        for path, dirs, files in os.walk(in_target_path):
-            for file in files:
-                folder_size += os.path.getsize(os.path.join(path, file))
-        return folder_size
+        return self.size_engine.get_size(in_target_path)
+
+
+class ScanSignals(QtCore.QObject):
+    """
+    后台统计向界面线程传递结果的信号
+    row_sized: {"row", "version_count", "total_bytes", "lastmodified"};
+    frames: {版本文件夹: cache_utils.FrameSequenceInfo},没有帧序列正则的行为None;
+    progress: (已完成行数, 总行数); finished: 是否被取消
+    """
+
+    row_sized = QtCore.Signal(object)
+    progress = QtCore.Signal(int, int)
+    finished = QtCore.Signal(bool)
+
+
+class ScanSizingTask(QtCore.QRunnable):
+    """
+    在QThreadPool中统计每个缓存节点的版本文件夹,只做文件系统操作,不调用hou;
+    所有版本文件夹提交到同一个线程池,某一行的文件夹全部完成后立即发出该行结果;
+    有帧序列正则的行,当前版本文件夹每次用一次scandir统计帧信息,
+    其他版本使用CacheFootprintIndex中的记录,文件夹mtime变化时才重新列举
+    """
+
+    def __init__(
+        self,
+        in_cache_paths: list,
+        in_versions_getter,
+        in_modify_time_getter,
+        in_size_engine: cache_utils.FolderSizeEngine,
+        in_frame_patterns: list = None,
+    ):
+        """
+        :param in_cache_paths: 每行节点的缓存输出路径,行号即列表序号
+        :param in_versions_getter: 回调(缓存路径, 是否包含当前版本) -> 版本文件夹列表
+        :param in_modify_time_getter: 回调(缓存路径) -> 修改时间文本
+        :param in_frame_patterns: 每行的(帧序列正则或None, 帧范围或None),
+            帧范围只用于当前版本文件夹,其他版本按各自的首尾帧计算缺失帧
+        """
+        super().__init__()
+        # 任务对象由界面持有,结束后不由线程池删除
+        self.setAutoDelete(False)
+        self.cache_paths = in_cache_paths
+        self.versions_getter = in_versions_getter
+        self.modify_time_getter = in_modify_time_getter
+        self.size_engine = in_size_engine
+        self.frame_patterns = in_frame_patterns or [(None, None)] * len(in_cache_paths)
+        # (版本文件夹, 正则, 帧范围) -> FrameSequenceInfo
+        self.frame_infos = {}
+        # 各节点当前输出的版本文件夹
+        self.current_folders = {
+            os.path.normpath(os.path.dirname(cache_path)) for cache_path in in_cache_paths
+        }
+        # 当前版本可能被原地覆盖(文件夹mtime不变),大小和帧信息都不使用记录
+        self.size_engine.add_fresh_paths(self.current_folders)
+        self.signals = ScanSignals()
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        try:
+            cancelled = self._size_rows_()
+        except Exception as error:
+            print(f"Error In Cache Scan: {type(error).__name__}: {error}")
+            cancelled = True
+        self.signals.finished.emit(cancelled)
+
+    def _size_rows_(self) -> bool:
+        row_count = len(self.cache_paths)
+        # 版本文件夹 -> 使用该文件夹的行号,多个节点写到同一目录时只统计一次
+        folder_rows = defaultdict(list)
+        # 版本文件夹 -> 需要统计的(正则, 帧范围)
+        folder_patterns = defaultdict(set)
+        row_folders = []
+        for row, cache_path in enumerate(self.cache_paths):
+            if self.cancel_event.is_set():
+                return True
+            version_paths = self.versions_getter(cache_path, True)
+            row_folders.append(version_paths)
+            for version_path in version_paths:
+                folder_rows[version_path].append(row)
+                if self.frame_patterns[row][0]:
+                    folder_patterns[version_path].add(
+                        self._get_folder_pattern_(row, version_path)
+                    )
+        remaining = [len(version_paths) for version_paths in row_folders]
+        done_count = 0
+
+        def emit_row(in_row: int):
+            nonlocal done_count
+            sizes = self.size_engine.get_sizes(row_folders[in_row])
+            frame_pattern = self.frame_patterns[in_row]
+            frames = None
+            if frame_pattern[0]:
+                frames = {
+                    version_path: self.frame_infos.get(
+                        (version_path,) + self._get_folder_pattern_(in_row, version_path)
+                    )
+                    for version_path in row_folders[in_row]
+                }
+            self.signals.row_sized.emit(
+                {
+                    "row": in_row,
+                    "version_count": len(row_folders[in_row]),
+                    "total_bytes": sum(sizes.values()),
+                    "lastmodified": self.modify_time_getter(self.cache_paths[in_row]),
+                    "frames": frames,
+                }
+            )
+            done_count += 1
+            self.signals.progress.emit(done_count, row_count)
+
+        # 没有版本文件夹的行直接完成
+        for row in range(row_count):
+            if remaining[row] == 0:
+                emit_row(row)
+
+        executor = ThreadPoolExecutor(
+            max_workers=max(1, min(self.size_engine.max_workers, len(folder_rows)))
+        )
+        try:
+            future_folders = {
+                executor.submit(self._inspect_folder_, folder, folder_patterns[folder]): folder
+                for folder in folder_rows
+            }
+            for future in as_completed(future_folders):
+                if self.cancel_event.is_set():
+                    return True
+                future.result()
+                for row in folder_rows[future_folders[future]]:
+                    remaining[row] -= 1
+                    if remaining[row] == 0:
+                        emit_row(row)
+        finally:
+            # 取消时丢弃尚未开始的统计,不等待正在进行的文件夹
+            executor.shutdown(wait=False, cancel_futures=True)
+        return False
+
+    def _get_folder_pattern_(self, in_row: int, in_version_path: str) -> tuple:
+        """
+        返回该行在版本文件夹中使用的(帧序列正则, 帧范围),节点的帧范围只用于当前版本
+        """
+        frame_regex, frame_range = self.frame_patterns[in_row]
+        current_folder = os.path.normpath(os.path.dirname(self.cache_paths[in_row]))
+        if os.path.normpath(in_version_path) != current_folder:
+            frame_range = None
+        return frame_regex, frame_range
+
+    def _inspect_folder_(self, in_folder: str, in_frame_patterns: set):
+        self.size_engine.get_size(in_folder)
+        # 当前版本重新列举并更新记录,切换版本后记录仍然是最新的
+        b_current_version = os.path.normpath(in_folder) in self.current_folders
+        for frame_regex, frame_range in in_frame_patterns:
+            if self.cancel_event.is_set():
+                return
+            self.frame_infos[(in_folder, frame_regex, frame_range)] = (
+                cache_utils.inspect_frame_sequence(
+                    in_folder,
+                    frame_regex,
+                    frame_range,
+                    self.size_engine.footprint_index,
+                    b_current_version,
+                )
+            )
 
 
 def ShowSceneCacheWidget():
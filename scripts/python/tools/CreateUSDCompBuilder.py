@@ -331,9 +331,9 @@ def _create_materials_(in_parent_node: hou.OpNode, in_tex_folder: str,in_optiona
             return False
     try:
         texture_manager = tex_to_mtlx.TxToMtlx()
-        if texture_manager._contain_any_image_file_(in_tex_folder):
-
-            material_dict = texture_manager._collect_images_in_dir(in_tex_folder)
+        # 使用持久化纹理索引,未变化的文件夹不再重新解析
+        material_dict = texture_manager._load_tex_collection_(in_tex_folder)
+        if material_dict:
             # pprint.pprint(material_dict)
             if len(material_dict) > 0:
                 if not in_tex_folder.endswith("/"):
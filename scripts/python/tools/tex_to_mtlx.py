@@ -1,88 +1,36 @@
 import hou
 import os
-import re
 import pprint
 import pdb
-import subprocess
 import time
 import logging
 import threading
+import sqlite3
+import contextlib
+from collections import OrderedDict
 
-from concurrent.futures import ThreadPoolExecutor,as_completed
-from collections import defaultdict
 from PySide6 import QtCore, QtUiTools, QtWidgets, QtGui
+import modules.image_header as image_header
+import modules.texture_utils as texture_utils
+import modules.texture_index as texture_index
+import modules.thumbnail_cache as thumbnail_cache
+import modules.tx_convert as tx_convert
 
 
 class TxToMtlx(QtWidgets.QMainWindow):
 
-    SUPPORT_IMAGE_FORMAT = (
-        ".jpg",
-        ".jpeg",
-        ".png",
-        ".bmp",
-        ".tif",
-        ".tiff",
-        ".exr",
-        ".targa",
-    )
-    ORDINARY_TEX_REGEX_PATTERN = re.compile(r"(\d+[Kk])")
-    UDIM_TEX_REGEX_PATTERN = re.compile(r"(_\d{4})")
-    TEX_TYPE = (
-        "diffuse",
-        "diff",
-        "albedo",
-        "alb",
-        "base",
-        "col",
-        "color",
-        "basecolor",
-        "metallic",
-        "metalness",
-        "metal",
-        "mlt",
-        "met",
-        "speculatiry",
-        "specular",
-        "spec",
-        "spc",
-        "roughness",
-        "rough",
-        "rgh",
-        "gloss",
-        "glossy",
-        "glossiness",
-        "transmission",
-        "transparency",
-        "trans",
-        "translucency",
-        "sss",
-        "emission",
-        "emissive",
-        "emit",
-        "emm",
-        "opacity",
-        "opac",
-        "alpha",
-        "ambient_occlusion",
-        "ao",
-        "occlusion",
-        "cavity",
-        "bump",
-        "bmp",
-        "displacement",
-        "displace",
-        "disp",
-        "dsp",
-        "heightmap",
-        "height",
-        "user",
-        "mask",
-        "normal",
-        "nor",
-        "nrm",
-        "nrml",
-        "norm",
+    SUPPORT_IMAGE_FORMAT = texture_utils.SUPPORT_IMAGE_FORMAT
+    TEX_TYPE = texture_utils.TEX_TYPE
+    # (显示名称, 分辨率选择方式, 分辨率上限)
+    RESOLUTION_CHOICES = (
+        ("Highest Resolution", "highest", None),
+        ("Lowest Resolution", "lowest", None),
+        ("Up To 4K", "cap", "4k"),
+        ("Up To 2K", "cap", "2k"),
+        ("Up To 1K", "cap", "1k"),
     )
+    PROXY_RESOLUTION = "1k"
+    THUMBNAIL_SIZE = 48
 
     def __init__(self):
         super().__init__()
@@ -101,6 +49,12 @@ class TxToMtlx(QtWidgets.QMainWindow):
         ## DATA
         self.mtlTX: bool = False
 
+        # 后台任务线程池,只执行不依赖hou的解析、分类、TX转换和哈希
+        self.thread_pool = QtCore.QThreadPool(self)
+        self.current_task: BackgroundTask = None
+        # 正在分片创建节点的TimeSlicedMaterialBuilder
+        self.material_builder: TimeSlicedMaterialBuilder = None
+
         self._setup_help_section()
         self._setup_material_section()
         self._setup_list_section()
@@ -112,6 +66,8 @@ class TxToMtlx(QtWidgets.QMainWindow):
         # 用户选择的纹理文件夹路径
         self.tex_folder: str = ""
         self.tex_collection: dict = {}
+        # 持久化的纹理索引,首次打开文件夹时创建
+        self.texture_index: texture_index.TextureIndexCache = None
 
     def _setup_help_section(self):
         """Setup the help button section"""
@@ -139,6 +95,43 @@ class TxToMtlx(QtWidgets.QMainWindow):
         self.bt_open_folder.setMinimumHeight(40)
         self.bt_open_folder.setEnabled(False)
         self.material_layout.addWidget(self.bt_open_folder, 1, 1)
+        # RECURSIVE CRAWL
+        self.cb_recursive = QtWidgets.QCheckBox("Recursive")
+        self.cb_recursive.setToolTip("Parse All Sub Folders Of The Selected Folder")
+        self.material_layout.addWidget(self.cb_recursive, 2, 0)
+        self.sp_depth = QtWidgets.QSpinBox()
+        self.sp_depth.setRange(-1, 64)
+        self.sp_depth.setValue(-1)
+        self.sp_depth.setSpecialValueText("Unlimited Depth")
+        self.sp_depth.setPrefix("Depth: ")
+        self.sp_depth.setEnabled(False)
+        self.material_layout.addWidget(self.sp_depth, 2, 1)
+        self.le_include = QtWidgets.QLineEdit()
+        self.le_include.setPlaceholderText("Include globs, e.g. wood*;metal/*")
+        self.le_include.setEnabled(False)
+        self.material_layout.addWidget(self.le_include, 3, 0, 1, 2)
+        self.le_exclude = QtWidgets.QLineEdit()
+        self.le_exclude.setPlaceholderText("Exclude globs, e.g. _old;*backup*")
+        self.le_exclude.setEnabled(False)
+        self.material_layout.addWidget(self.le_exclude, 4, 0, 1, 2)
+        # RESOLUTION VARIANTS
+        self.cmb_resolution = QtWidgets.QComboBox()
+        self.cmb_resolution.setToolTip(
+            "Resolution To Use When A Texture Exists In Several Resolutions"
+        )
+        for label, policy, max_resolution in self.RESOLUTION_CHOICES:
+            self.cmb_resolution.addItem(label, (policy, max_resolution))
+        self.material_layout.addWidget(self.cmb_resolution, 5, 0)
+        self.cb_proxy = QtWidgets.QCheckBox(f"{self.PROXY_RESOLUTION.upper()} Proxy")
+        self.cb_proxy.setToolTip(
+            f"Also Create A Low Resolution Material Named <Material>{MtlxMaterial.PROXY_SUFFIX}"
+        )
+        self.material_layout.addWidget(self.cb_proxy, 5, 1)
+        self.cb_no_undo = QtWidgets.QCheckBox("Bulk Build (No Undo)")
+        self.cb_no_undo.setToolTip(
+            "Faster For Large Libraries,But The Created Materials Can Not Be Undone"
+        )
+        self.material_layout.addWidget(self.cb_no_undo, 6, 0, 1, 2)
 
         self.main_layout.addLayout(self.material_layout)
 
@@ -152,22 +145,41 @@ class TxToMtlx(QtWidgets.QMainWindow):
         self.lb_material_list = QtWidgets.QLabel("List of Materials:")
         self.bt_sel_all = QtWidgets.QPushButton("All")
         self.bt_sel_non = QtWidgets.QPushButton("Reset")
+        self.bt_cancel_scan = QtWidgets.QPushButton("Cancel")
 
         self.bt_sel_all.setEnabled(False)
         self.bt_sel_non.setEnabled(False)
+        self.bt_cancel_scan.setEnabled(False)
 
         self.header_layout.addWidget(self.lb_material_list)
         self.header_layout.addWidget(self.bt_sel_all)
         self.header_layout.addWidget(self.bt_sel_non)
+        self.header_layout.addWidget(self.bt_cancel_scan)
+
+        # FILTER
+        self.le_filter = QtWidgets.QLineEdit()
+        self.le_filter.setPlaceholderText("Filter Materials...")
+        self.le_filter.setClearButtonEnabled(True)
 
         # MATERIAL LIST
         self.material_list = QtWidgets.QListView()
         self.material_list.setMinimumHeight(200)
-        self.model = QtGui.QStandardItemModel()
+        self.model = MaterialListModel(self)
         self.material_list.setModel(self.model)
         self.material_list.setSelectionMode(QtWidgets.QListView.MultiSelection)
+        # 所有行高度一致,视图不需要逐行计算尺寸
+        self.material_list.setUniformItemSizes(True)
+        self.material_list.setIconSize(
+            QtCore.QSize(self.THUMBNAIL_SIZE, self.THUMBNAIL_SIZE)
+        )
+        # 缩略图只在视图请求可见行的图标时解码
+        self.thumbnail_loader = ThumbnailLoader(
+            self._get_thumbnail_source_, self.THUMBNAIL_SIZE, self
+        )
+        self.model.set_thumbnail_loader(self.thumbnail_loader)
 
         self.list_layout.addLayout(self.header_layout)
+        self.list_layout.addWidget(self.le_filter)
         self.list_layout.addWidget(self.material_list)
         self.main_layout.addLayout(self.list_layout)
 
@@ -185,7 +197,12 @@ class TxToMtlx(QtWidgets.QMainWindow):
         self.progress_bar.setMinimumHeight(30)
         self.progress_bar.setValue(0)
 
+        # 取消分片创建节点,与后台任务的Cancel分开
+        self.bt_cancel_create = QtWidgets.QPushButton("Cancel Creating")
+        self.bt_cancel_create.setEnabled(False)
+
         self.create_layout.addWidget(self.bt_create)
+        self.create_layout.addWidget(self.bt_cancel_create)
         self.create_layout.addWidget(self.progress_bar)
 
         self.main_layout.addLayout(self.create_layout)
@@ -199,6 +216,12 @@ class TxToMtlx(QtWidgets.QMainWindow):
         self.bt_sel_non.clicked.connect(self._deselect_all_in_matlist_)
         self.bt_create.clicked.connect(self._create_materials_)
         self.checkbox.stateChanged.connect(self._change_use_mtlTX_)
+        self.cb_recursive.toggled.connect(self.sp_depth.setEnabled)
+        self.cb_recursive.toggled.connect(self.le_include.setEnabled)
+        self.cb_recursive.toggled.connect(self.le_exclude.setEnabled)
+        self.bt_cancel_scan.clicked.connect(self._cancel_task_)
+        self.bt_cancel_create.clicked.connect(self._cancel_material_build_)
+        self.le_filter.textChanged.connect(self.model.set_filter)
 
     def _show_help_(self):
         message = """
@@ -252,95 +275,248 @@ class TxToMtlx(QtWidgets.QMainWindow):
         """
         打开包含纹理的文件路径
         """
-        self.model.clear()
+        self._cancel_task_()
+        self.model.set_keys(())
+        self.thumbnail_loader.clear()
+        self.tex_collection = {}
+        self.lb_material_list.setText("List of Materials:")
         folder_path: str = QtWidgets.QFileDialog.getExistingDirectory(
             self, "Please Select Your Texture Folder"
         )
-        if not os.path.exists(folder_path):
+        if self.cb_recursive.isChecked():
+            if not folder_path or not os.path.isdir(folder_path):
+                hou.ui.displayMessage("Given Path Is Not Valid,Please Check")
+                return
+            self._start_crawl_(folder_path)
+            return
+        # 优先使用持久化索引,文件夹未变化时不再列举和解析;解析在后台线程中执行
+        self.lb_material_list.setText("List of Materials: Scanning...")
+        self._start_task_(
+            lambda _in_task: (folder_path, self._load_tex_collection_(folder_path)),
+            self._on_folder_loaded_,
+        )
+
+    def _on_folder_loaded_(self, in_result):
+        if not self._is_current_task_():
+            return
+        self._finish_task_()
+        self.lb_material_list.setText("List of Materials:")
+        folder_path, tex_collection = in_result
+        if tex_collection is None:
             hou.ui.displayMessage("Given Path Is Not Valid,Please Check")
             return
         # 检查给定路径中是否包含图片文件
-        if not self._contain_any_image_file_(folder_path):
+        if len(tex_collection) == 0:
             hou.ui.displayMessage(
                 "Given Path Doesn't Any Valid Image File,Please Check and Select Other Folder"
             )
             return
         # 查找图片信息
         self.tex_folder = folder_path
-        self.tex_collection = self._collect_images_in_dir(folder_path)
-        if len(self.tex_collection) == 0:
-            return
+        self.tex_collection = tex_collection
         # pprint.pprint(self.tex_collection)
-        # 把图片信息添加到List
-        for tex_group in self.tex_collection:
-            self.model.appendRow(QtGui.QStandardItem(tex_group))
+        # 把图片信息添加到List,列表按需分批加载
+        self.model.set_keys(self.tex_collection.keys())
         self.bt_sel_all.setEnabled(True)
         self.bt_sel_non.setEnabled(True)
         self.bt_create.setEnabled(True)
 
-    def _contain_any_image_file_(self, in_dir_path: str) -> bool:
+    def _get_thumbnail_source_(self, in_material_key: str):
         """
-        检查给定路径是否包含图片文件,不递归
+        返回材质缩略图使用的图片路径:BaseColor纹理,UDIM纹理取编号最小的一张;没有时返回None
         """
-        if not os.path.exists(in_dir_path) or not os.path.isdir(in_dir_path):
-            return False
-        for elem in os.listdir(in_dir_path):
-            current_testing_path = os.path.join(in_dir_path, elem)
-            # 不递归，排除文件夹
-            if not os.path.isfile(current_testing_path):
-                continue
-            if elem.endswith(self.SUPPORT_IMAGE_FORMAT):
-                # print(
-                #     f"Find Image File In Given Path {in_dir_path},Image File Name {elem}"
-                # )
-                if "_" in elem:
-                    #print(f"Image File Name {elem} with Underscore Seperator")
-                    return True
-        return False
-
-    def _collect_images_in_dir(self, in_dir_path: str) -> dict:
-        # 解析文件夹中的纹理，构造一个二维字典
-        if not os.path.exists(in_dir_path):
-            hou.ui.displayMessage("Given Path Is Not Valid,Please Check")
-            return {}
-        material_collection = defaultdict(lambda: defaultdict(list))
-        for elem in os.listdir(in_dir_path):
-            current_testing_path = os.path.join(in_dir_path, elem)
-            if not os.path.isfile(current_testing_path):
-                continue
-            if not elem.endswith(self.SUPPORT_IMAGE_FORMAT):
-                continue
-            file_name = elem.split(".")[0].lower()
-            # 使用_分段
-            name_keywords = file_name.split("_")
-            material_name = name_keywords[0]
-            # 使用关键词匹配纹理种类
-            texure_type = ""
-            for type in self.TEX_TYPE:
-                for name_keyword in name_keywords[1:]:
-                    if type in name_keyword:
-                        texure_type = name_keyword
-                        break
-            # 没有匹配的字段，纹理不加入纹理组
-            if texure_type == "":
-                continue
-            material_collection[material_name][texure_type].append(elem)
-            # 使用正则表达式获取纹理分辨率
-            tex_res = self.ORDINARY_TEX_REGEX_PATTERN.search(elem)
-            if not tex_res == None:
-                material_collection[material_name]["res"] = tex_res.group(1)
-            # 使用正则表达式匹配UDIM
-            is_UDIM = self.UDIM_TEX_REGEX_PATTERN.search(elem)
-            material_collection[material_name]["UDIM"] = (
-                True if is_UDIM != None else False
+        material_info: dict = self.tex_collection.get(in_material_key)
+        if not material_info:
+            return None
+        classifier = texture_utils.get_texture_classifier(
+            self.TEX_TYPE, MtlxMaterial.TEXTURE_TYPE_SORTED
+        )
+        for key, files in material_info.items():
+            if isinstance(files, list) and files:
+                if "texturesColor" in classifier.channels_of(key):
+                    return os.path.join(
+                        material_info.get("folder", self.tex_folder), min(files)
+                    ).replace(os.sep, "/")
+        return None
+
+    def _start_task_(
+        self, in_function, in_on_finished, in_on_partial=None, in_on_progress=None
+    ):
+        """
+        取消当前后台任务并在线程池中启动新任务,信号在任务启动前连接;
+        每个任务使用独立的信号对象,取消后旧任务的结果不会再进入界面
+        """
+        self._cancel_task_()
+        task = BackgroundTask(in_function)
+        task.signals.finished.connect(in_on_finished)
+        task.signals.failed.connect(self._on_task_failed_)
+        if in_on_partial is not None:
+            task.signals.partial_result.connect(in_on_partial)
+        if in_on_progress is not None:
+            task.signals.progress.connect(in_on_progress)
+        self.current_task = task
+        self.bt_cancel_scan.setEnabled(True)
+        self.thread_pool.start(task)
+
+    def _is_current_task_(self) -> bool:
+        return (
+            self.current_task is not None
+            and self.sender() is self.current_task.signals
+        )
+
+    def _finish_task_(self):
+        self.bt_cancel_scan.setEnabled(False)
+
+    def _on_task_failed_(self, in_message: str):
+        if not self._is_current_task_():
+            return
+        self._finish_task_()
+        self.bt_create.setEnabled(bool(self.tex_collection))
+        print(f"Error In Background Task :{in_message}")
+        hou.ui.displayMessage(in_message, severity=hou.severityType.Error)
+
+    def _cancel_task_(self):
+        # 只取消后台任务,打开新文件夹时不影响正在创建的材质
+        if self.current_task is not None:
+            self.current_task.cancel()
+
+    def _cancel_material_build_(self):
+        if self.material_builder is not None:
+            self.material_builder.cancel()
+
+    def _start_crawl_(self, in_root_path: str):
+        """
+        在后台线程中递归解析纹理库,每解析完一个文件夹就把材质追加到列表
+        """
+        self.tex_folder = in_root_path
+        self.lb_material_list.setText("List of Materials: Scanning...")
+
+        classifier = texture_utils.get_texture_classifier(
+            self.TEX_TYPE, MtlxMaterial.TEXTURE_TYPE_SORTED
+        )
+        crawl_args = {
+            "in_max_depth": self.sp_depth.value(),
+            "in_include_globs": self._split_globs_(self.le_include.text()),
+            "in_exclude_globs": self._split_globs_(self.le_exclude.text()),
+            "in_max_workers": min(16, os.cpu_count() or 1),
+        }
+
+        def crawl_task(in_task: BackgroundTask) -> int:
+            return texture_utils.crawl_texture_tree(
+                in_root_path,
+                classifier,
+                self.SUPPORT_IMAGE_FORMAT,
+                lambda *folder_result: in_task.signals.partial_result.emit(
+                    folder_result
+                ),
+                in_cancel_event=in_task.cancel_event,
+                **crawl_args,
             )
 
-        if len(material_collection) == 0:
-            return {}
-        result: dict = {}
-        for name, tex_data in material_collection.items():
-            result[name] = dict(tex_data)
-        return result
+        self._start_task_(
+            crawl_task, self._on_crawl_finished_, in_on_partial=self._on_folder_parsed_
+        )
+
+    def _split_globs_(self, in_text: str) -> tuple:
+        return tuple(
+            pattern.strip()
+            for pattern in in_text.replace(",", ";").split(";")
+            if pattern.strip()
+        )
+
+    def _on_folder_parsed_(self, in_folder_result: tuple):
+        if not self._is_current_task_():
+            return
+        in_dir_path, in_rel_path, in_collection = in_folder_result
+        self.model.append_keys(
+            texture_utils.merge_folder_collection(
+                self.tex_collection, in_dir_path, in_rel_path, in_collection
+            )
+        )
+        self.bt_sel_all.setEnabled(True)
+        self.bt_sel_non.setEnabled(True)
+        self.bt_create.setEnabled(True)
+
+    def _on_crawl_finished_(self, in_folder_count: int):
+        if not self._is_current_task_():
+            return
+        cancelled = self.current_task.cancel_event.is_set()
+        self._finish_task_()
+        self.lb_material_list.setText(
+            f"List of Materials: {len(self.tex_collection)} From {in_folder_count} Folders"
+            + (" (Cancelled)" if cancelled else "")
+        )
+        if len(self.tex_collection) == 0 and not cancelled:
+            hou.ui.displayMessage(
+                "Given Path Doesn't Any Valid Image File,Please Check and Select Other Folder"
+            )
+
+    def _load_tex_collection_(self, in_dir_path: str):
+        """
+        通过持久化纹理索引获取文件夹解析结果,路径无效时返回None,
+        索引数据库不可用时退回到直接解析
+        """
+        if not in_dir_path:
+            return None
+        classifier = texture_utils.get_texture_classifier(
+            self.TEX_TYPE, MtlxMaterial.TEXTURE_TYPE_SORTED
+        )
+        try:
+            if self.texture_index is None:
+                self.texture_index = texture_index.TextureIndexCache()
+            return self.texture_index.load_collection(
+                in_dir_path, classifier, self.SUPPORT_IMAGE_FORMAT
+            )
+        except sqlite3.Error as error:
+            print(f"Texture Index Unavailable,Fallback To Direct Scan:{error}")
+        except OSError:
+            return None
+        image_files = self._scan_dir_(in_dir_path)
+        if image_files is None:
+            return None
+        return self._collect_images_in_dir(in_dir_path, image_files)
+
+    def _scan_dir_(self, in_dir_path: str):
+        """
+        列举路径中的图片文件,不递归,路径无效时返回None
+        """
+        if not in_dir_path:
+            return None
+        try:
+            return texture_utils.scan_texture_dir(in_dir_path, self.SUPPORT_IMAGE_FORMAT)
+        except OSError:
+            return None
+
+    def _contain_any_image_file_(self, in_dir_path: str, in_image_files=None) -> bool:
+        """
+        检查给定路径是否包含图片文件,不递归
+
+        :param in_image_files: 已经由_scan_dir_获得的图片列表,传入时不再列举文件夹
+        """
+        if in_image_files is None:
+            in_image_files = self._scan_dir_(in_dir_path)
+            if in_image_files is None:
+                return False
+        return texture_utils.contain_texture_file(in_image_files)
+
+    def _collect_images_in_dir(self, in_dir_path: str, in_image_files=None) -> dict:
+        """
+        解析文件夹中的纹理，构造一个二维字典
+
+        :param in_image_files: 已经由_scan_dir_获得的图片列表,传入时不再列举文件夹
+        """
+        if in_image_files is None:
+            in_image_files = self._scan_dir_(in_dir_path)
+            if in_image_files is None:
+                hou.ui.displayMessage("Given Path Is Not Valid,Please Check")
+                return {}
+        # 分类器每个进程只构建一次,每个文件只解析一遍
+        classifier = texture_utils.get_texture_classifier(
+            self.TEX_TYPE, MtlxMaterial.TEXTURE_TYPE_SORTED
+        )
+        return texture_utils.build_texture_collection(
+            in_image_files, classifier, self.SUPPORT_IMAGE_FORMAT
+        )
 
     def _change_use_mtlTX_(self, status):
         print(f"{status} ,{QtCore.Qt.CheckState.Checked.value}")
@@ -354,18 +530,30 @@ class TxToMtlx(QtWidgets.QMainWindow):
 
     def _select_all_in_matlist_(self):
         # self.material_list.selectAll()
-        # 另一种选择方式
+        # 另一种选择方式:先加载全部(过滤后的)行,再一次选择整个范围
+        self.model.fetch_all()
+        row_count = self.model.rowCount()
+        if row_count == 0:
+            return
         selection_model = self.material_list.selectionModel()
-        for row in range(self.model.rowCount()):
-            index = self.model.index(row, 0)
-            selection_model.select(
-                index, QtCore.QItemSelectionModel.SelectionFlag.Select
-            )
+        selection_model.select(
+            QtCore.QItemSelection(
+                self.model.index(0, 0), self.model.index(row_count - 1, 0)
+            ),
+            QtCore.QItemSelectionModel.SelectionFlag.Select,
+        )
 
     def _deselect_all_in_matlist_(self):
         self.material_list.clearSelection()
 
     def _create_materials_(self):
+        if self.material_builder is not None:
+            # 创建过程中打开其他文件夹会重新启用Create按钮
+            hou.ui.displayMessage(
+                "Materials Are Still Being Created,Please Wait Or Cancel First",
+                severity=hou.severityType.Warning,
+            )
+            return
         # 重置状态
         self.progress_bar.setValue(0)
         selected_mat_items = self.material_list.selectedIndexes()
@@ -375,31 +563,549 @@ class TxToMtlx(QtWidgets.QMainWindow):
             )
             return
         self.progress_bar.setMaximum(len(selected_mat_items))
-        current_progress = 0
         base_info = {
             "b_use_mtlTX": self.mtlTX,
             "node_path": self.material_lib_path,
             "node_ref": self.material_lib_node,
             "tex_folder_path": self.tex_folder,
         }
+        resolution_policy, max_resolution = self.cmb_resolution.currentData()
+        # 先创建全部材质对象,纹理去重后在同一个线程池中统一转换,再依次构建节点网络
+        material_creators = []
         for item in selected_mat_items:
-            item_index = item.row()
-            # 这有点问题，dict的key是保序的么
-            material_name = list(self.tex_collection.keys())[item_index]
-            material_creator = MtlxMaterial(
-                material_name, **base_info, texture_list=self.tex_collection
+            material_creators.append(
+                MtlxMaterial(
+                    self.model.key_at(item.row()),
+                    **base_info,
+                    all_texture_dict=self.tex_collection,
+                    b_tx_ready=self.mtlTX,
+                    resolution_policy=resolution_policy,
+                    max_resolution=max_resolution,
+                    proxy_resolution=self.PROXY_RESOLUTION
+                    if self.cb_proxy.isChecked()
+                    else None,
+                    texture_index_cache=self.texture_index,
+                )
             )
-            material_creator.create_material()
+        material_creators = add_proxy_materials(material_creators)
+        b_convert_tx = self.mtlTX
+
+        # 纹理准备和TX转换在后台线程执行,完成后在主线程中分片创建节点
+        def prepare_task(in_task: BackgroundTask) -> tuple:
+            for material_creator in material_creators:
+                if in_task.cancel_event.is_set():
+                    break
+                material_creator.prepare_textures()
+            convert_report = []
+            if b_convert_tx and not in_task.cancel_event.is_set():
+                convert_report = convert_materials_to_TX(
+                    material_creators,
+                    in_task.signals.progress.emit,
+                    in_task.cancel_event,
+                )
+            return material_creators, convert_report
 
-            current_progress += 1
-            self.progress_bar.setValue(current_progress)
+        self.bt_create.setEnabled(False)
+        self._start_task_(
+            prepare_task,
+            self._on_materials_prepared_,
+            in_on_progress=self._on_convert_progress_,
+        )
 
+    def _on_materials_prepared_(self, in_result: tuple):
+        if not self._is_current_task_():
+            return
+        material_creators, convert_report = in_result
+        # 后台准备已经结束,之后的节点创建由bt_cancel_create取消
+        self._finish_task_()
+        if self.current_task.cancel_event.is_set():
+            self.bt_create.setEnabled(True)
+            self.progress_bar.setFormat("Cancelled")
+            return
+        self.progress_bar.setFormat("%p%")
+        self.progress_bar.setValue(0)
+        self.progress_bar.setMaximum(len(material_creators))
+        # 默认整个创建过程是一个撤销组,勾选Bulk Build时不记录撤销
+        self.material_builder = TimeSlicedMaterialBuilder(
+            material_creators,
+            self._on_build_progress_,
+            lambda _in_material_nodes: self._on_materials_built_(convert_report),
+            in_undo_label=None if self.cb_no_undo.isChecked() else "Create Materials",
+        )
+        self.bt_cancel_create.setEnabled(not self.cb_no_undo.isChecked())
+        self.material_builder.start()
+
+    def _on_materials_built_(self, in_convert_report: list):
+        cancelled = self.material_builder.cancel_event.is_set()
+        self.material_builder = None
+        self.bt_cancel_create.setEnabled(False)
+        self.bt_create.setEnabled(True)
+        failed_textures = [
+            os.path.basename(result.source)
+            for result in in_convert_report
+            if not result.success and result.message != "Cancelled"
+        ]
+        message = "Finish Creating Material" + (" (Cancelled)" if cancelled else "")
+        if failed_textures:
+            message += f"\nFailed To Convert {len(failed_textures)} Textures To TX:\n"
+            message += "\n".join(failed_textures)
         hou.ui.displayMessage(
-            "Finish Creating Material", severity=hou.severityType.Message
+            message,
+            severity=hou.severityType.Warning
+            if failed_textures
+            else hou.severityType.Message,
         )
 
+    def _on_build_progress_(self, in_finished: int, _in_total: int):
+        self.progress_bar.setValue(in_finished)
+
+    def _on_convert_progress_(self, in_finished: int, in_total: int):
+        """
+        TX转换进度,每完成一张纹理更新一次
+        """
+        self.progress_bar.setFormat("TX %v/%m")
+        self.progress_bar.setMaximum(in_total)
+        self.progress_bar.setValue(in_finished)
+
+
+class MaterialListModel(QtCore.QAbstractListModel):
+    """
+    材质列表模型,只保存材质名称列表,行号到材质名的查找为O(1);
+    行通过canFetchMore/fetchMore分批提供给视图,过滤条件变窄时只在当前结果中继续过滤
+    """
+
+    FETCH_BATCH_SIZE = 500
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._keys: list = []
+        # 材质名 -> 小写名称,用于不区分大小写的过滤
+        self._lower_keys: dict = {}
+        self._filter_text = ""
+        # 满足过滤条件的材质名,行号即下标
+        self._filtered_keys: list = []
+        # 已经提供给视图的行数
+        self._loaded_count = 0
+        # 材质名 -> 行号,缩略图完成时用于定位需要刷新的行
+        self._rows: dict = {}
+        self.thumbnail_loader: ThumbnailLoader = None
+
+    def set_thumbnail_loader(self, in_loader: "ThumbnailLoader"):
+        self.thumbnail_loader = in_loader
+        in_loader.thumbnail_ready.connect(self._on_thumbnail_ready_)
+
+    def _on_thumbnail_ready_(self, in_material_key: str):
+        row = self._rows.get(in_material_key)
+        if row is None or row >= self._loaded_count:
+            return
+        index = self.index(row, 0)
+        self.dataChanged.emit(index, index, [QtCore.Qt.DecorationRole])
+
+    def _update_rows_(self):
+        self._rows = {key: row for row, key in enumerate(self._filtered_keys)}
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self._loaded_count
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid() or index.row() >= self._loaded_count:
+            return None
+        if role in (QtCore.Qt.DisplayRole, QtCore.Qt.ToolTipRole):
+            return self._filtered_keys[index.row()]
+        if role == QtCore.Qt.DecorationRole and self.thumbnail_loader is not None:
+            # 视图只请求可见行的图标,未生成的缩略图在这里排队,完成后刷新该行
+            return self.thumbnail_loader.thumbnail_of(self._filtered_keys[index.row()])
+        return None
+
+    def canFetchMore(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return False
+        return self._loaded_count < len(self._filtered_keys)
+
+    def fetchMore(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return
+        self._fetch_rows_(self.FETCH_BATCH_SIZE)
+
+    def _fetch_rows_(self, in_count: int):
+        fetch_count = min(in_count, len(self._filtered_keys) - self._loaded_count)
+        if fetch_count <= 0:
+            return
+        self.beginInsertRows(
+            QtCore.QModelIndex(),
+            self._loaded_count,
+            self._loaded_count + fetch_count - 1,
+        )
+        self._loaded_count += fetch_count
+        self.endInsertRows()
+
+    def fetch_all(self):
+        self._fetch_rows_(len(self._filtered_keys) - self._loaded_count)
+
+    def key_at(self, in_row: int) -> str:
+        return self._filtered_keys[in_row]
+
+    def set_keys(self, in_keys):
+        """
+        替换全部材质,保留当前过滤条件
+        """
+        self.beginResetModel()
+        self._keys = list(in_keys)
+        self._lower_keys = {key: key.lower() for key in self._keys}
+        self._filtered_keys = self._match_filter_(self._keys, self._filter_text)
+        self._update_rows_()
+        self._loaded_count = min(self.FETCH_BATCH_SIZE, len(self._filtered_keys))
+        self.endResetModel()
+
+    def append_keys(self, in_keys):
+        """
+        追加材质,用于递归解析时逐个文件夹写入结果
+        """
+        new_keys = list(in_keys)
+        if not new_keys:
+            return
+        self._keys.extend(new_keys)
+        for key in new_keys:
+            self._lower_keys[key] = key.lower()
+        for key in self._match_filter_(new_keys, self._filter_text):
+            self._rows[key] = len(self._filtered_keys)
+            self._filtered_keys.append(key)
+        # 第一批还没填满时直接显示,之后由视图滚动到底部时按需加载
+        self._fetch_rows_(self.FETCH_BATCH_SIZE - self._loaded_count)
+
+    def set_filter(self, in_text: str):
+        """
+        按名称过滤(不区分大小写),新条件包含旧条件时只在当前结果中过滤
+        """
+        filter_text = in_text.strip().lower()
+        if filter_text == self._filter_text:
+            return
+        if self._filter_text and self._filter_text in filter_text:
+            source_keys = self._filtered_keys
+        else:
+            source_keys = self._keys
+        self.beginResetModel()
+        self._filtered_keys = self._match_filter_(source_keys, filter_text)
+        self._update_rows_()
+        self._filter_text = filter_text
+        self._loaded_count = min(self.FETCH_BATCH_SIZE, len(self._filtered_keys))
+        self.endResetModel()
+
+    def _match_filter_(self, in_keys, in_filter_text: str) -> list:
+        if not in_filter_text:
+            return list(in_keys)
+        lower_keys = self._lower_keys
+        return [key for key in in_keys if in_filter_text in lower_keys[key]]
+
+
+class ThumbnailLoader(QtCore.QObject):
+    """
+    材质缩略图:内存中保留最近使用的图标,磁盘上使用thumbnail_cache.ThumbnailCache,
+    都没有时在独立的线程池中用QImageReader按缩略图尺寸解码(JPEG等格式解码时直接缩小,不读取完整分辨率)
+    """
+
+    thumbnail_ready = QtCore.Signal(str)
+    MAX_MEMORY_ICONS = 2000
+
+    def __init__(self, in_source_getter, in_thumbnail_size: int, parent=None):
+        """
+        :param in_source_getter: 回调(材质名) -> 图片路径或None
+        :param in_thumbnail_size: 缩略图最长边像素
+        """
+        super().__init__(parent)
+        self.source_getter = in_source_getter
+        self.thumbnail_size = in_thumbnail_size
+        self.disk_cache = thumbnail_cache.ThumbnailCache()
+        self.thread_pool = QtCore.QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(max(1, (os.cpu_count() or 2) // 2))
+        # 材质名 -> QIcon,None表示无法生成缩略图;按最近使用排序,最早使用的在前
+        self._icons: OrderedDict = OrderedDict()
+        self._pending: set = set()
+        # clear()时递增,丢弃之前提交的任务返回的结果(例如切换文件夹后的同名材质)
+        self._generation = 0
+        self._signals = ThumbnailSignals(self)
+        self._signals.decoded.connect(self._on_decoded_)
+
+    def thumbnail_of(self, in_material_key: str):
+        """
+        返回已生成的QIcon,还没有时排队生成并返回None
+        """
+        if in_material_key in self._icons:
+            self._icons.move_to_end(in_material_key)
+            return self._icons[in_material_key]
+        if in_material_key not in self._pending:
+            source_path = self.source_getter(in_material_key)
+            if source_path is None:
+                self._store_icon_(in_material_key, None)
+                return None
+            self._pending.add(in_material_key)
+            self.thread_pool.start(
+                ThumbnailTask(
+                    self._generation,
+                    in_material_key,
+                    source_path,
+                    self.thumbnail_size,
+                    self.disk_cache,
+                    self._signals,
+                )
+            )
+        return None
+
+    def clear(self):
+        # 已经在运行的任务无法取消,它们的结果按generation丢弃
+        self.thread_pool.clear()
+        self._generation += 1
+        self._icons.clear()
+        self._pending.clear()
+
+    def _store_icon_(self, in_material_key: str, in_icon):
+        self._icons[in_material_key] = in_icon
+        self._icons.move_to_end(in_material_key)
+        while len(self._icons) > self.MAX_MEMORY_ICONS:
+            # 丢弃最久没有使用的图标
+            self._icons.popitem(last=False)
+
+    def _on_decoded_(self, in_generation: int, in_material_key: str, in_image):
+        if in_generation != self._generation or in_material_key not in self._pending:
+            return
+        self._pending.discard(in_material_key)
+        self._store_icon_(
+            in_material_key,
+            QtGui.QIcon(QtGui.QPixmap.fromImage(in_image))
+            if in_image is not None and not in_image.isNull()
+            else None,
+        )
+        self.thumbnail_ready.emit(in_material_key)
+
+
+class ThumbnailSignals(QtCore.QObject):
+    """
+    缩略图线程向界面线程传递解码结果,参数为(generation, 材质名, QImage或None)
+    """
+
+    decoded = QtCore.Signal(int, str, object)
+
+
+class ThumbnailTask(QtCore.QRunnable):
+    """
+    读取磁盘缓存或解码单张缩略图,QImage可以在非界面线程中使用
+    """
+
+    def __init__(
+        self,
+        in_generation: int,
+        in_material_key: str,
+        in_source_path: str,
+        in_thumbnail_size: int,
+        in_disk_cache: thumbnail_cache.ThumbnailCache,
+        in_signals: ThumbnailSignals,
+    ):
+        super().__init__()
+        self.generation = in_generation
+        self.material_key = in_material_key
+        self.source_path = in_source_path
+        self.thumbnail_size = in_thumbnail_size
+        self.disk_cache = in_disk_cache
+        self.signals = in_signals
+
+    def run(self):
+        image = None
+        try:
+            image = self._load_()
+        except Exception as error:
+            print(f"Fail To Create Thumbnail For {self.source_path}: {error}")
+        self.signals.decoded.emit(self.generation, self.material_key, image)
+
+    def _load_(self):
+        cache_key = self.disk_cache.key_of(self.source_path, self.thumbnail_size)
+        cache_path = self.disk_cache.get(cache_key)
+        if cache_path is not None:
+            image = QtGui.QImage(cache_path)
+            if not image.isNull():
+                return image
+        reader = QtGui.QImageReader(self.source_path)
+        source_size = reader.size()
+        if source_size.isValid():
+            reader.setScaledSize(
+                source_size.scaled(
+                    self.thumbnail_size,
+                    self.thumbnail_size,
+                    QtCore.Qt.KeepAspectRatio,
+                )
+            )
+        image = reader.read()
+        if image.isNull():
+            # 不支持的格式(例如没有EXR插件时)
+            return None
+        if image.width() > self.thumbnail_size or image.height() > self.thumbnail_size:
+            image = image.scaled(
+                self.thumbnail_size,
+                self.thumbnail_size,
+                QtCore.Qt.KeepAspectRatio,
+                QtCore.Qt.SmoothTransformation,
+            )
+        if image.save(self.disk_cache.reserve(cache_key), "PNG"):
+            self.disk_cache.commit(cache_key)
+        return image
+
+
+class TaskSignals(QtCore.QObject):
+    """
+    后台任务向界面线程传递结果的信号
+    progress: (已完成数量, 总数量); partial_result: 部分结果; finished: 任务返回值; failed: 错误信息
+    """
+
+    progress = QtCore.Signal(int, int)
+    partial_result = QtCore.Signal(object)
+    finished = QtCore.Signal(object)
+    failed = QtCore.Signal(str)
+
+
+class BackgroundTask(QtCore.QRunnable):
+    """
+    在QThreadPool中执行的任务,只能执行不调用hou的纯python代码;
+    任务函数接收任务对象本身,通过signals回传进度和部分结果,通过cancel_event检查是否已取消
+    """
+
+    def __init__(self, in_function):
+        super().__init__()
+        # 任务对象由界面持有,结束后不由线程池删除
+        self.setAutoDelete(False)
+        self.function = in_function
+        self.signals = TaskSignals()
+        self.cancel_event = threading.Event()
+
+    def run(self):
+        try:
+            result = self.function(self)
+        except Exception as error:
+            self.signals.failed.emit(f"{type(error).__name__}: {error}")
+            return
+        self.signals.finished.emit(result)
+
+    def cancel(self):
+        self.cancel_event.set()
+
+
+class TimeSlicedMaterialBuilder:
+    """
+    在主线程中分片创建材质节点:每片最多占用SLICE_SECONDS,
+    下一片通过hdefereval排到Houdini事件循环空闲时执行,两片之间界面可以重绘和响应;
+    全部分片记录在同一个撤销组中,一次撤销删除本次创建的全部材质。
+    两片之间用户可以编辑场景,因此材质原型在每片结束时删除,不会留在场景中被修改;
+    不记录撤销时不分片,一次创建全部材质,避免用户的编辑与未记录撤销的节点交错
+    """
+
+    SLICE_SECONDS = 0.05
+
+    def __init__(
+        self,
+        in_materials: list,
+        in_progress_callback=None,
+        in_finished_callback=None,
+        in_undo_label: str = None,
+    ):
+        """
+        :param in_materials: MtlxMaterial列表
+        :param in_progress_callback: 回调(已完成数量, 总数量),每片结束时调用
+        :param in_finished_callback: 回调(材质subnet列表),全部完成或取消后调用
+        :param in_undo_label: 撤销组名称,为None时不记录撤销并且不分片
+        """
+        self.materials = in_materials
+        self.progress_callback = in_progress_callback
+        self.finished_callback = in_finished_callback
+        self.undo_label = in_undo_label
+        self.cancel_event = threading.Event()
+        self.material_nodes: list = []
+        self._next_index = 0
+        self._undo_group = None
+
+    def start(self):
+        # hdefereval只在图形界面中可用,不在模块级导入以免影响hython中的批量创建
+        import hdefereval
+
+        self._execute_deferred_ = hdefereval.executeDeferred
+        if self.undo_label is not None:
+            # 撤销组跨越多个分片,在全部完成、取消或出错时关闭
+            self._undo_group = hou.undos.group(self.undo_label)
+            self._undo_group.__enter__()
+        self._build_slice_()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def _build_slice_(self):
+        try:
+            b_finished = self._build_next_materials_()
+        except BaseException:
+            release_material_prototypes()
+            self._close_undo_group_()
+            # 出错时按取消处理,界面可以恢复Create按钮
+            self.cancel_event.set()
+            if self.finished_callback is not None:
+                self.finished_callback(self.material_nodes)
+            raise
+        if b_finished and self.finished_callback is not None:
+            self.finished_callback(self.material_nodes)
+
+    def _build_next_materials_(self) -> bool:
+        """
+        创建一片材质,还有剩余时排队下一片并返回False,全部完成或取消后布局并返回True
+        """
+        start_time = time.perf_counter()
+        with bulk_build_context(in_disable_undo=self.undo_label is None):
+            while self._next_index < len(self.materials):
+                if self.cancel_event.is_set():
+                    break
+                material = self.materials[self._next_index]
+                material.b_bulk_build = True
+                self.material_nodes.append(material.create_material())
+                self._next_index += 1
+                if (
+                    self.undo_label is not None
+                    and time.perf_counter() - start_time >= self.SLICE_SECONDS
+                ):
+                    break
+            release_material_prototypes()
+        if self.progress_callback is not None:
+            self.progress_callback(self._next_index, len(self.materials))
+        if self._next_index < len(self.materials) and not self.cancel_event.is_set():
+            self._execute_deferred_(self._build_slice_)
+            return False
+        with bulk_build_context(in_disable_undo=self.undo_label is None):
+            layout_material_nodes(self.material_nodes)
+        self._close_undo_group_()
+        return True
+
+    def _close_undo_group_(self):
+        if self._undo_group is not None:
+            self._undo_group.__exit__(None, None, None)
+            self._undo_group = None
+
+
+# 批量创建材质时使用的材质原型,{材质库路径: 原型subnet}
+MATERIAL_PROTOTYPE_NAME = "__mtlx_prototype__"
+MATERIAL_PROTOTYPE_PREFIX = "prototype"
+_MATERIAL_PROTOTYPES = {}
+
 
 class MtlxMaterial:
+    TEXTURE_TYPE_SORTED = texture_utils.TEXTURE_TYPE_SORTED
+    # 超过该大小的纹理只用文件大小和首尾数据块判断是否变化,设为None时总是完整计算哈希
+    TX_PARTIAL_HASH_THRESHOLD = tx_convert.PARTIAL_HASH_THRESHOLD
+    # TX转换器后端,见tx_convert.CONVERTER_BACKENDS,可选imaketx、maketx、iconvert、null
+    TX_BACKEND_NAME = "imaketx"
+    # 转换器参数,例如{"tile_size": 64, "compression": "zip", "mip_filter": "box"}
+    TX_BACKEND_OPTIONS: dict = {}
+    # 单张纹理转换超时时间(秒)和临时错误的重试次数
+    TX_TIMEOUT = 600
+    TX_RETRIES = 2
+    # 同一纹理有多个分辨率时的默认选择方式,见texture_utils.RESOLUTION_POLICIES
+    RESOLUTION_POLICY = "highest"
+    PROXY_SUFFIX = "_proxy"
+
     def __init__(
         self,
         mat_name,
@@ -408,6 +1114,13 @@ class MtlxMaterial:
         node_ref: hou.OpNode,
         tex_folder_path,
         all_texture_dict,
+        progress_callback=None,
+        b_tx_ready=False,
+        b_bulk_build=False,
+        resolution_policy=None,
+        max_resolution=None,
+        proxy_resolution=None,
+        texture_index_cache=None,
     ) -> None:
         self.mat_name = mat_name
         self.b_mtlTX = b_use_mtlTX
@@ -415,35 +1128,37 @@ class MtlxMaterial:
         self.node_ref: hou.OpNode = node_ref
         self.tex_folder_path = tex_folder_path
         self.texture_list = all_texture_dict
+        # 回调(已完成数量, 总数量),用于回传TX转换进度
+        self.progress_callback = progress_callback
+        # 本材质所有TX转换的结果
+        self.convert_report: list = []
+        # 为True时表示纹理已经提前转换为tx,创建材质时不再转换
+        self.b_tx_ready = b_tx_ready
+        # 批量模式下由build_materials统一关闭撤销、推迟布局
+        self.b_bulk_build = b_bulk_build
+        # 分辨率选择方式和上限(例如"4k"),proxy_resolution不为空时可以额外创建低分辨率代理材质
+        self.resolution_policy = resolution_policy or self.RESOLUTION_POLICY
+        self.max_resolution = max_resolution
+        self.proxy_resolution = proxy_resolution
+        self._material_info: dict = None
+        # 用于缓存图片文件头的texture_index.TextureIndexCache,为None时直接读取文件头
+        self.texture_index_cache = texture_index_cache
+        # {文件名: image_header.ImageHeader}
+        self.texture_headers: dict = {}
+        self._b_textures_prepared = False
+        # 节点/参数/连接操作计数,用于评估批量模式的开销
+        self.op_stats = {
+            "nodes": 0,
+            "parms": 0,
+            "parm_calls": 0,
+            "inputs": 0,
+            "layouts": 0,
+            "copies": 0,
+        }
         self._init_constants()
         self.setup_imaketx()
 
     def _init_constants(self):
-        self.TEXTURE_TYPE_SORTED = {
-            "texturesColor": [
-                "diffuse",
-                "diff",
-                "albedo",
-                "alb",
-                "base",
-                "col",
-                "color",
-                "basecolor",
-            ],
-            "texturesMetal": ["metallic", "metalness", "metal", "mlt", "met"],
-            "texturesSpecular": ["speculatiry", "specular", "spec", "spc"],
-            "texturesRough": ["roughness", "rough", "rgh"],
-            "texturesGloss": ["gloss", "glossy", "glossiness"],
-            "texturesTrans": ["transmission", "transparency", "trans"],
-            "texturesEmm": ["emission", "emissive", "emit", "emm"],
-            "texturesAplha": ["opacity", "opac", "alpha"],
-            "texturesAO": ["ambient_occlusion", "ao", "occlusion"],
-            "texturesBump": ["bump", "bmp", "height"],
-            "texturesDisp": ["displacement", "displace", "disp", "dsp", "heightmap"],
-            "texturesExtra": ["user", "mask"],
-            "texturesNormal": ["normal", "nor", "nrm", "nrml", "norm"],
-            "texturesSSS": ["translucency", "sss"],
-        }
         self.TEXTURE_TYPE_TO_INPUT_NAME = {
             "texturesColor": {
                 "input": "base_color",
@@ -489,19 +1204,31 @@ class MtlxMaterial:
         self.PROCESS_USE_LIMIT=round(max(1.0,int(self.MAX_WORK_PROCESS)*0.8))
 
     def create_material(self):
+        """
+        创建材质节点网络,成功时返回材质subnet节点,失败时返回None
+        """
         if not (self.node_ref and self.mat_name and self.texture_list):
-            return
+            return None
 
         try:
 
             # TX转换等
             target_material_info = self._prepare_material_info_()
-            # 构建基础subnet并改造成mtlmaterial对应的输入输出
-            subnet_context = self._create_material_subnet_(target_material_info)
-            # 构建mtlmaterial中的基础节点，返回接收纹理的节点
-            mtlx_surface_node, mtlx_displace_node = self._create_base_nodes_in_subnet_(
-                subnet_context
-            )
+            if self.b_bulk_build:
+                # 批量模式下从材质库中的原型复制基础subnet和基础节点
+                (
+                    subnet_context,
+                    mtlx_surface_node,
+                    mtlx_displace_node,
+                ) = self._clone_material_subnet_(target_material_info)
+            else:
+                # 构建基础subnet并改造成mtlmaterial对应的输入输出
+                subnet_context = self._create_material_subnet_(target_material_info)
+                # 构建mtlmaterial中的基础节点，返回接收纹理的节点
+                (
+                    mtlx_surface_node,
+                    mtlx_displace_node,
+                ) = self._create_base_nodes_in_subnet_(subnet_context)
             # UV缩放，内部UDIM短路
             place2d_nodes = self._create_place2d_(subnet_context, target_material_info)
             #print(target_material_info)
@@ -513,10 +1240,13 @@ class MtlxMaterial:
                 mtlx_displace_node,
                 place2d_nodes,
             )
-            # 节点布局
-            self._layout_nodes_(subnet_context)
+            # 节点布局,批量模式下在全部材质创建后统一布局
+            if not self.b_bulk_build:
+                self._layout_nodes_(subnet_context)
+            return subnet_context
         except Exception as error:
             print(f"Error In [create_material] :{error}")
+        return None
 
     def _prepare_material_info_(self):
         """
@@ -535,16 +1265,16 @@ class MtlxMaterial:
         }
         """
         try:
-            target_material_info: dict = self.texture_list[self.mat_name]
-            if self.b_mtlTX:
-                texture_summary = []
-                for key, value in target_material_info.items():
-                    if key not in ("UDIM", "Size"):
-                        if isinstance(value, list):
-                            texture_summary.extend(value)
+            target_material_info: dict = self.prepare_textures()
+            # 批量创建时纹理已经统一转换过(见convert_materials_to_TX)
+            if self.b_mtlTX and not self.b_tx_ready:
+                texture_summary = self._collect_texture_files_(target_material_info)
                 if len(texture_summary)>0:
                     print(f"Prepare to convert {len(texture_summary)} textures")
-                    self._convert_to_TX_(texture_summary)
+                    self._convert_to_TX_(
+                        texture_summary,
+                        self._get_texture_folder_(target_material_info),
+                    )
             # 执行TX转换操作
             return target_material_info
         except Exception as error:
@@ -552,79 +1282,186 @@ class MtlxMaterial:
             return {}
 
     def setup_imaketx(self):
-        imaketx_tool="imaketx.exe"
-        self.imaketx_path=None
-        houdini_path=hou.text.expandString("$HB")
-
-        if not os.path.exists(houdini_path):
-            raise RuntimeError("Fail To Find Houdini Path ,Please Set imaketx.exe path Manually")
+        """
+        查找TX转换器后端,转换器在会话内只查找一次;
+        默认在$HB和PATH中查找imaketx,可通过TX_BACKEND_NAME和TX_BACKEND_OPTIONS切换
+        """
+        self.tx_backend: tx_convert.ConverterBackend = None
+        self.imaketx_path = None
+        houdini_path = hou.text.expandString("$HB")
+        try:
+            self.tx_backend = tx_convert.get_converter_backend(
+                self.TX_BACKEND_NAME, (houdini_path,), **self.TX_BACKEND_OPTIONS
+            )
+        except RuntimeError:
+            # 不需要转换时找不到转换器也可以正常创建材质
+            if self.b_mtlTX:
+                raise RuntimeError(
+                    f"Fail To Find {self.TX_BACKEND_NAME} In Houdini Path Or PATH,Please Set TX Converter Manually"
+                )
             return
-        self.imaketx_path=os.path.join(houdini_path,imaketx_tool).replace(os.sep,"/")
-        if not os.path.exists(self.imaketx_path):
-            raise RuntimeError("Fail To Find Houdini Path ,Please Set imaketx.exe path Manually")
+        self.imaketx_path = self.tx_backend.executable
         return
 
-    def _convert_to_TX_(self,in_texture_array:list):
-        if self.b_mtlTX==False:
+    def _get_material_info_(self) -> dict:
+        """
+        返回按分辨率选择方式筛选后的材质信息,每个纹理key只保留一种分辨率
+        """
+        if self._material_info is None:
+            self._material_info = texture_utils.resolve_resolution_variants(
+                self.texture_list[self.mat_name],
+                self.resolution_policy,
+                self.max_resolution,
+            )
+        return self._material_info
+
+    def prepare_textures(self) -> dict:
+        """
+        选择分辨率、检查UDIM并读取纹理文件头,不调用hou,可以在后台线程中提前执行;
+        多次调用只执行一次,返回筛选后的材质信息
+        """
+        material_info = self._get_material_info_()
+        if not self._b_textures_prepared:
+            self._check_udim_tiles_(material_info)
+            self._load_texture_headers_(material_info)
+            self._b_textures_prepared = True
+        return material_info
+
+    def _load_texture_headers_(self, in_material_info: dict):
+        """
+        读取材质全部纹理的文件头,用于选择颜色空间
+        """
+        texture_folder = self._get_texture_folder_(in_material_info)
+        file_names = self._collect_texture_files_(in_material_info)
+        try:
+            if self.texture_index_cache is not None:
+                self.texture_headers = self.texture_index_cache.get_image_headers(
+                    texture_folder, file_names
+                )
+            else:
+                self.texture_headers = {}
+                for file_name in file_names:
+                    header = image_header.probe_image_header(
+                        os.path.join(texture_folder, file_name)
+                    )
+                    if header is not None:
+                        self.texture_headers[file_name] = header
+        except (OSError, sqlite3.Error) as error:
+            print(f"Fail To Read Texture Headers Of {self.mat_name}: {error}")
             return
-        # 定义记录器
-        logging.basicConfig(level=logging.INFO)
-        logger=logging.getLogger("TX Convertion")
-        # 定义子任务
-        def single_convert_task(in_single_image_path:str):
-            thread_id=threading.current_thread().ident
-            start_time=time.time()
-            try:
-                logger.info(f"Thread {thread_id}:Starting Convert {os.path.basename(in_single_image_path)}")
-                # 设置输入输出调用"inputPath" "outputPath" "Param"
-                output_path=os.path.splitext(in_single_image_path)[0]+".tx"
-                command=f'"{self.imaketx_path}" "{in_single_image_path}" "{output_path}" --newer'
-                result=subprocess.run(command,shell=True,capture_output=True,text=True)
-
-                end_time=time.time()
-                duration=round(end_time-start_time,2)
-                if result.returncode==0:
-                    logger.info(f"Thread {thread_id}:Completed Convert {os.path.basename(in_single_image_path)} in {duration}")
-                    return True
-                else:
-                    logger.error(f"Thread {thread_id}:Failed to Convert {os.path.basename(in_single_image_path)} in {duration}")
-                    return False
-            except Exception as error:
-                logger.error(f"Thread {thread_id}:Failed to Convert {os.path.basename(in_single_image_path)},Reason:{error}")
-                return False
 
-        # 调用执行
+    def _check_udim_tiles_(self, in_material_info: dict):
+        """
+        UDIM纹理缺失或重复编号时打印警告
+        """
+        for key, inventory in texture_utils.get_udim_inventory(
+            in_material_info
+        ).items():
+            if inventory.missing:
+                print(
+                    f"Material {self.mat_name} [{key}] Missing UDIM Tiles: {list(inventory.missing)}"
+                )
+            if inventory.duplicates:
+                print(
+                    f"Material {self.mat_name} [{key}] Duplicated UDIM Tiles: {list(inventory.duplicates)}"
+                )
+
+    def create_proxy_material(self):
+        """
+        返回使用不超过proxy_resolution的纹理、名为{材质名}_proxy的MtlxMaterial,
+        没有设置proxy_resolution或没有更低分辨率可用时返回None
+        """
+        if not self.proxy_resolution:
+            return None
+        proxy_info = texture_utils.resolve_resolution_variants(
+            self.texture_list[self.mat_name], "cap", self.proxy_resolution
+        )
+        if proxy_info == self._get_material_info_():
+            return None
+        proxy_name = self.mat_name + self.PROXY_SUFFIX
+        return MtlxMaterial(
+            proxy_name,
+            self.b_mtlTX,
+            self.node_path,
+            self.node_ref,
+            self.tex_folder_path,
+            {proxy_name: proxy_info},
+            progress_callback=self.progress_callback,
+            b_tx_ready=self.b_tx_ready,
+            b_bulk_build=self.b_bulk_build,
+            texture_index_cache=self.texture_index_cache,
+        )
+
+    def _collect_texture_files_(self, in_material_info: dict) -> list:
+        """
+        返回材质引用的全部纹理文件名
+        """
+        texture_summary = []
+        for key, value in in_material_info.items():
+            if key not in ("UDIM", "Size"):
+                if isinstance(value, list):
+                    texture_summary.extend(value)
+        return texture_summary
+
+    def collect_texture_paths(self) -> list:
+        """
+        返回材质引用的全部纹理完整路径
+        """
+        material_info: dict = self._get_material_info_()
+        texture_folder = self._get_texture_folder_(material_info)
+        return [
+            os.path.join(texture_folder, file_name).replace(os.sep, "/")
+            for file_name in self._collect_texture_files_(material_info)
+        ]
+
+    def _convert_textures_(
+        self, in_texture_paths, in_on_progress, in_cancel_event=None
+    ) -> list:
+        # 转换器以参数列表直接执行,不经过shell;
+        # 是否需要重新转换由tx清单中的内容哈希决定,不再使用--newer比较时间戳
+        engine = tx_convert.AsyncConvertEngine(
+            self.tx_backend.build_argv,
+            self.PROCESS_USE_LIMIT,
+            in_timeout=self.TX_TIMEOUT,
+            in_retries=self.TX_RETRIES,
+            in_output_extension=self.tx_backend.output_extension,
+            in_args_signature=self.tx_backend.args_signature(),
+            in_partial_threshold=self.TX_PARTIAL_HASH_THRESHOLD,
+            in_cancel_event=in_cancel_event,
+        )
+        return tx_convert.convert_textures_async(
+            in_texture_paths, engine, in_on_progress
+        )
+
+    def _get_texture_folder_(self, in_material_info: dict) -> str:
+        """
+        递归解析得到的材质记录了自己所在的文件夹,否则使用tex_folder_path
+        """
+        return in_material_info.get("folder", self.tex_folder_path)
+
+    def _convert_to_TX_(self,in_texture_array:list,in_texture_folder:str=None)->list:
+        """
+        把纹理转换为tx,所有任务一次性提交,完成进度通过progress_callback实时回传
+
+        :param in_texture_array: 纹理文件名
+        :param in_texture_folder: 纹理所在文件夹,默认为tex_folder_path
+        :return: 每个纹理的tx_convert.ConvertResult
+        :rtype: list
+        """
+        if self.b_mtlTX==False:
+            return []
+        logging.basicConfig(level=logging.INFO)
         texture_paths=[]
         for single_texture in in_texture_array:
-            texture_paths.append(os.path.join(self.tex_folder_path,single_texture).replace(os.sep,"/"))
-        texture_count=float(len(texture_paths))
-        convert_start_time=time.time()
-        completed=0
-        failed=0
-        with ThreadPoolExecutor(max_workers=self.PROCESS_USE_LIMIT) as executor:
-            future_texture={}
-            for path in texture_paths:
-                future_texture[executor.submit(single_convert_task,path)]=path
-                #这部分被遍历过的不会移除
-                fail_count=0
-                current_finished=0
-                for finished in as_completed(future_texture):
-                    texture_path=future_texture[finished]
-                    current_finished+=1
-                    try:
-                        if not finished.result():
-                            fail_count+=1
-                    except Exception as error:
-                        logger.error(f"Error Processing {os.path.basename(texture_path)}:{str(error)}")
-                        failed+=1
-                process=((current_finished)*1.0/texture_count)*100
-                logger.info(f"Progress:{process}% ({current_finished}/{texture_count})")
-                failed=fail_count
-                completed=current_finished-failed
-        convert_end_time=time.time()
-        total_time=round(convert_end_time-convert_start_time,2)
-        logger.info(f"Finish Convert {texture_count} Texture, Use {total_time} s ,Success Count: {completed},Failed {failed}")
-        return completed>0 and failed==0
+            texture_paths.append(os.path.join(in_texture_folder or self.tex_folder_path,single_texture).replace(os.sep,"/"))
+
+        def on_progress(in_finished:int,in_total:int,_in_result):
+            if self.progress_callback is not None:
+                self.progress_callback(in_finished,in_total)
+
+        report=self._convert_textures_(texture_paths,on_progress)
+        self.convert_report.extend(report)
+        return report
 
     def _create_material_subnet_(self, in_material_info: dict):
         """
@@ -632,21 +1469,14 @@ class MtlxMaterial:
         :param in_material_info: 记录材质参数的字典
         :type in_material_info: dict
         """
-        material_node_name = (
-            self.mat_name + f"_{in_material_info['size']}K"
-            if "size" in in_material_info
-            else self.mat_name
-        )
+        material_node_name = self._get_material_node_name_(in_material_info)
         # 检查是否已经存在同名节点
-        duplicated_node = self.node_ref.node(material_node_name)
-
-        if duplicated_node:
-            duplicated_node.destroy()
+        self._destroy_duplicated_node_(material_node_name)
         # 创建新的节点
         # print("Type of Parent Node")
         # print(type(self.node_ref))
         # print(self.node_ref.path())
-        material_node = self.node_ref.createNode("subnet", material_node_name)
+        material_node = self._create_node_(self.node_ref, "subnet", material_node_name)
         # 这两个函数返回值一样都是Node
         # subnet_as_opnode = material_node
         subnet_as_opnode = self.node_ref.node(material_node.name())
@@ -662,6 +1492,62 @@ class MtlxMaterial:
         # 创建Subnet内基础组成部分
         return subnet_as_opnode
 
+    def _get_material_node_name_(self, in_material_info: dict) -> str:
+        return (
+            self.mat_name + f"_{in_material_info['size']}K"
+            if "size" in in_material_info
+            else self.mat_name
+        )
+
+    def _destroy_duplicated_node_(self, in_node_name: str):
+        duplicated_node = self.node_ref.node(in_node_name)
+        if duplicated_node:
+            duplicated_node.destroy()
+
+    def _get_material_prototype_(self) -> hou.OpNode:
+        """
+        返回材质库中的材质原型:已配置好参数界面、输出节点、surface和displacement节点的subnet,
+        每个材质库只创建一次,材质标记关闭并在网络编辑器中隐藏,由release_material_prototypes删除
+        """
+        library_path = self.node_ref.path()
+        prototype = _MATERIAL_PROTOTYPES.get(library_path)
+        if prototype is not None:
+            try:
+                prototype.path()
+                return prototype
+            except hou.ObjectWasDeleted:
+                pass
+        # 上一次批量创建异常中断时可能残留原型
+        self._destroy_duplicated_node_(MATERIAL_PROTOTYPE_NAME)
+        prototype = self._create_node_(self.node_ref, "subnet", MATERIAL_PROTOTYPE_NAME)
+        for item in prototype.allItems():
+            item.destroy()
+        self._setup_material_parameters_(prototype)
+        self._create_base_nodes_in_subnet_(prototype, MATERIAL_PROTOTYPE_PREFIX)
+        prototype.setMaterialFlag(False)
+        prototype.hide(True)
+        _MATERIAL_PROTOTYPES[library_path] = prototype
+        return prototype
+
+    def _clone_material_subnet_(self, in_material_info: dict) -> tuple:
+        """
+        复制材质原型并按材质名重命名,返回(材质subnet, standard_surface节点, displacement节点)
+        """
+        material_node_name = self._get_material_node_name_(in_material_info)
+        self._destroy_duplicated_node_(material_node_name)
+        prototype = self._get_material_prototype_()
+        material_node = hou.copyNodesTo((prototype,), self.node_ref)[0]
+        self.op_stats["copies"] += 1
+        material_node.setName(material_node_name)
+        material_node.hide(False)
+        material_node.setMaterialFlag(True)
+        base_nodes = []
+        for suffix in ("_mtlxSurface", "_mtlxDisplacement"):
+            base_node = material_node.node(MATERIAL_PROTOTYPE_PREFIX + suffix)
+            base_node.setName(self.mat_name + suffix)
+            base_nodes.append(base_node)
+        return material_node, base_nodes[0], base_nodes[1]
+
     def _setup_material_parameters_(self, in_mtlx_node):
         # 对已创建的节点调用AsCode并调整
         hou_parm_template_group = hou.ParmTemplateGroup()
@@ -806,12 +1692,15 @@ class MtlxMaterial:
         hou_parm_template_group.append(hou_parm_template)
         in_mtlx_node.setParmTemplateGroup(hou_parm_template_group)
 
-    def _create_base_nodes_in_subnet_(self, in_material_net_node: hou.Node) -> tuple:
+    def _create_base_nodes_in_subnet_(
+        self, in_material_net_node: hou.Node, in_name_prefix: str = None
+    ) -> tuple:
         """
         Docstring for _create_base_nodes_in_subnet_
 
         :param in_mtlx_node: 节点所在的父节点
         :type in_mtlx_node: hou.Node
+        :param in_name_prefix: 节点名前缀,默认为材质名
         :return: 返回standard_surface和displacement节点（非输出节点）
         :rtype: tuple[Any, ...]
         """
@@ -820,22 +1709,23 @@ class MtlxMaterial:
             in_material_net_node, "displacement"
         )
 
-        mtlx_standard_surf = in_material_net_node.createNode(
-            "mtlxstandard_surface", self.mat_name + "_mtlxSurface"
+        name_prefix = in_name_prefix or self.mat_name
+        mtlx_standard_surf = self._create_node_(
+            in_material_net_node, "mtlxstandard_surface", name_prefix + "_mtlxSurface"
         )
-        mtlx_displacement = in_material_net_node.createNode(
-            "mtlxdisplacement", self.mat_name + "_mtlxDisplacement"
+        mtlx_displacement = self._create_node_(
+            in_material_net_node, "mtlxdisplacement", name_prefix + "_mtlxDisplacement"
         )
 
         # 设置连接
-        surface_output.setInput(0, mtlx_standard_surf)
-        displace_output.setInput(0, mtlx_displacement)
+        self._set_input_(surface_output, 0, mtlx_standard_surf)
+        self._set_input_(displace_output, 0, mtlx_displacement)
 
         return mtlx_standard_surf, mtlx_displacement
 
     def _create_output_node_(self, in_material_net_node: hou.Node, in_output_name: str):
-        output_node = in_material_net_node.createNode(
-            "subnetconnector", f"{in_output_name}_output"
+        output_node = self._create_node_(
+            in_material_net_node, "subnetconnector", f"{in_output_name}_output"
         )
 
         if not output_node:
@@ -845,10 +1735,15 @@ class MtlxMaterial:
             )
             return
 
-        output_node.parm("connectorkind")._set("output")
-        output_node.parm("parmname")._set(in_output_name.lower())
-        output_node.parm("parmlabel")._set(in_output_name.capitalize())
-        output_node.parm("parmtype")._set(in_output_name.lower())
+        self._set_parms_(
+            output_node,
+            {
+                "connectorkind": "output",
+                "parmname": in_output_name.lower(),
+                "parmlabel": in_output_name.capitalize(),
+                "parmtype": in_output_name.lower(),
+            },
+        )
 
         color = (
             hou.Color(0.89, 0.69, 0.6)
@@ -865,35 +1760,60 @@ class MtlxMaterial:
         if not in_material_info.get("UDIM", False):
             #print("Create Place2D Nodes")
             nodes = {
-                "coord": in_material_net_node.createNode(
-                    "mtlxtexcoord", f"{self.mat_name}_texcoord"
+                "coord": self._create_node_(
+                    in_material_net_node, "mtlxtexcoord", f"{self.mat_name}_texcoord"
                 ),
-                "scale": in_material_net_node.createNode(
-                    "mtlxconstant", f"{self.mat_name}_scale"
+                "scale": self._create_node_(
+                    in_material_net_node, "mtlxconstant", f"{self.mat_name}_scale"
                 ),
-                "rotate": in_material_net_node.createNode(
-                    "mtlxconstant", f"{self.mat_name}_rotation"
+                "rotate": self._create_node_(
+                    in_material_net_node, "mtlxconstant", f"{self.mat_name}_rotation"
                 ),
-                "offset": in_material_net_node.createNode(
-                    "mtlxconstant", f"{self.mat_name}_offset"
+                "offset": self._create_node_(
+                    in_material_net_node, "mtlxconstant", f"{self.mat_name}_offset"
                 ),
-                "place2d": in_material_net_node.createNode(
-                    "mtlxplace2d", f"{self.mat_name}_place2d"
+                "place2d": self._create_node_(
+                    in_material_net_node, "mtlxplace2d", f"{self.mat_name}_place2d"
                 ),
             }
-            nodes["scale"].parm("value")._set(1)
+            self._set_parms_(nodes["scale"], {"value": 1})
             # 连接节点
-            nodes["place2d"].setInput(0, nodes["coord"])
-            nodes["place2d"].setInput(2, nodes["scale"])
-            nodes["place2d"].setInput(3, nodes["rotate"])
-            nodes["place2d"].setInput(4, nodes["offset"])
+            self._set_input_(nodes["place2d"], 0, nodes["coord"])
+            self._set_input_(nodes["place2d"], 2, nodes["scale"])
+            self._set_input_(nodes["place2d"], 3, nodes["rotate"])
+            self._set_input_(nodes["place2d"], 4, nodes["offset"])
             return nodes["place2d"]
         return None
 
     def _layout_nodes_(self, in_material_net_node: hou.Node):
+        self.op_stats["layouts"] += 2
         in_material_net_node.layoutChildren()
         self.node_ref.layoutChildren()
 
+    def _create_node_(
+        self, in_parent_node: hou.Node, in_node_type: str, in_node_name: str
+    ) -> hou.Node:
+        self.op_stats["nodes"] += 1
+        return in_parent_node.createNode(in_node_type, in_node_name)
+
+    def _set_parms_(self, in_node: hou.Node, in_parms: dict):
+        """
+        一次setParms设置节点的全部参数,代替逐个parm()._set
+        """
+        self.op_stats["parms"] += len(in_parms)
+        self.op_stats["parm_calls"] += 1
+        in_node.setParms(in_parms)
+
+    def _set_input_(
+        self,
+        in_node: hou.Node,
+        in_index: int,
+        in_input_node: hou.Node,
+        in_output_index: int = 0,
+    ):
+        self.op_stats["inputs"] += 1
+        in_node.setInput(in_index, in_input_node, in_output_index)
+
     def _process_textures_(
         self,
         in_material_net_node: hou.Node,
@@ -913,20 +1833,23 @@ class MtlxMaterial:
         """
         #print("Get In Process texture")
         attribute_names = in_surface_node.inputNames()
+        # 同一文件、同一采样类型只创建一个采样节点,打包纹理共用一个采样和拆分节点
+        sampler_nodes = {}
         for texture_type, texture_info in self._surface_texture_sort_iterator_(
             in_material_info
         ):
             #print(f"Current Iterator {texture_type}")
-            texture_sampler_node = self._create_texture_sample_node_(
-                in_material_net_node, texture_info, in_material_info
+            texture_sampler_node, output_index = self._get_texture_sample_node_(
+                in_material_net_node,
+                texture_info,
+                in_material_info,
+                in_place2d_nodes,
+                sampler_nodes,
             )
-            if in_place2d_nodes and not in_material_info.get("UDIM", False):
-                coord_index = texture_sampler_node.inputNames().index("texcoord")
-                texture_sampler_node.setInput(coord_index, in_place2d_nodes)
             #print(f"trying to find:{texture_type}")
             if texture_type == "texturesDisp":
                 self._setup_displacement_connect_(
-                    texture_sampler_node, in_displace_node
+                    texture_sampler_node, in_displace_node, output_index
                 )
                 continue
             pin_name: str = (
@@ -948,6 +1871,7 @@ class MtlxMaterial:
                 in_surface_node,
                 in_displace_node,
                 connect_index,
+                output_index,
             )
         self._setup_normal_bump_(
             in_material_net_node,
@@ -967,6 +1891,9 @@ class MtlxMaterial:
         skip_keys = [
             "UDIM",
             "Size",
+            "folder",
+            texture_utils.VARIANTS_KEY,
+            texture_utils.UDIM_TILES_KEY,
             "bump",
             "bmp",
             "normal",
@@ -975,19 +1902,122 @@ class MtlxMaterial:
             "nrml",
             "norm",
         ]
+        classifier = texture_utils.get_texture_classifier(
+            TxToMtlx.TEX_TYPE, self.TEXTURE_TYPE_SORTED
+        )
+        packed_keys = []
+        dedicated_types = set()
         for texture_key in in_material_info.keys():
             if texture_key in skip_keys:
                 continue
-            for texture_type, type_indicators in self.TEXTURE_TYPE_SORTED.items():
-                if any(
-                    indicator in texture_key.lower() for indicator in type_indicators
-                ):
-                    texture_info = {
-                        "name": texture_key,
-                        "file": in_material_info[texture_key][0],
-                        "type": texture_type,
-                    }
-                    yield texture_type, texture_info
+            if classifier.packed_layout(texture_key):
+                packed_keys.append(texture_key)
+                continue
+            for texture_type in classifier.channels_of(texture_key):
+                dedicated_types.add(texture_type)
+                texture_info = {
+                    "name": texture_key,
+                    "file": in_material_info[texture_key][0],
+                    "type": texture_type,
+                }
+                yield texture_type, texture_info
+        # 同一输入只连接一张纹理:单独的纹理(例如rough)优先于打包纹理中的对应分量,
+        # 多个打包纹理按名称排序,先出现的为准
+        for texture_key in sorted(packed_keys):
+            # 打包纹理按R/G/B分量各输出一次,共用同一个文件
+            for output_name, texture_type in zip(
+                texture_utils.PACKED_TEXTURE_OUTPUTS,
+                classifier.packed_layout(texture_key),
+            ):
+                if texture_type in dedicated_types:
+                    continue
+                dedicated_types.add(texture_type)
+                texture_info = {
+                    "name": texture_key,
+                    "file": in_material_info[texture_key][0],
+                    "type": texture_type,
+                    "packed_output": output_name,
+                }
+                yield texture_type, texture_info
+
+    def _get_texture_sample_node_(
+        self,
+        in_parent_node: hou.Node,
+        in_texture_info: dict,
+        in_material_info: dict,
+        in_place2d_nodes,
+        io_sampler_nodes: dict,
+    ) -> tuple:
+        """
+        返回(采样节点, 输出序号),相同文件和采样类型的节点从io_sampler_nodes中复用;
+        打包纹理返回mtlxseparate3c节点和对应分量的输出序号
+        """
+        packed_output = in_texture_info.get("packed_output")
+        if packed_output:
+            sampler_key = (in_texture_info["file"], "packed")
+        else:
+            sampler_key = (
+                in_texture_info["file"],
+                self._get_sample_model_(in_texture_info["type"]),
+            )
+        sampler_node = io_sampler_nodes.get(sampler_key)
+        if sampler_node is None:
+            if packed_output:
+                sampler_node = self._create_packed_sample_node_(
+                    in_parent_node, in_texture_info, in_material_info, in_place2d_nodes
+                )
+            else:
+                sampler_node = self._create_texture_sample_node_(
+                    in_parent_node, in_texture_info, in_material_info
+                )
+                self._connect_texcoord_(
+                    sampler_node, in_place2d_nodes, in_material_info
+                )
+            io_sampler_nodes[sampler_key] = sampler_node
+        if packed_output:
+            return sampler_node, texture_utils.PACKED_TEXTURE_OUTPUTS.index(
+                packed_output
+            )
+        return sampler_node, 0
+
+    def _connect_texcoord_(
+        self, in_sample_node: hou.Node, in_place2d_nodes, in_material_info: dict
+    ):
+        if in_place2d_nodes and not in_material_info.get("UDIM", False):
+            coord_index = in_sample_node.inputNames().index("texcoord")
+            self._set_input_(in_sample_node, coord_index, in_place2d_nodes)
+
+    def _create_packed_sample_node_(
+        self,
+        in_parent_node: hou.Node,
+        in_texture_info: dict,
+        in_material_info: dict,
+        in_place2d_nodes,
+    ) -> hou.Node:
+        """
+        打包纹理(ORM/ARM等)只采样一次,经mtlxseparate3c拆分为R/G/B三个分量
+        """
+        sample_node_class = (
+            "mtlximage" if not in_material_info.get("UDIM", False) else "mtlxtiledimage"
+        )
+        packed_name = in_texture_info["name"].upper()
+        texture_sample_node = self._create_node_(
+            in_parent_node, sample_node_class, packed_name + "_sampler"
+        )
+        texture_path = self._get_texture_path_(
+            in_texture_info["name"], in_material_info
+        )
+        # 打包的是线性数据,按color3读取但不做颜色空间转换
+        self._set_parms_(
+            texture_sample_node,
+            {"signature": "color3", "filecolorspace": "raw", "file": texture_path},
+        )
+        self._connect_texcoord_(texture_sample_node, in_place2d_nodes, in_material_info)
+        separate_node = self._create_node_(
+            in_parent_node, "mtlxseparate3c", packed_name + "_SPLIT"
+        )
+        self._set_input_(separate_node, 0, texture_sample_node)
+        return separate_node
 
     def _create_texture_sample_node_(
         self, in_parent_node: hou.Node, in_texture_info: dict, in_material_info: dict
@@ -1009,7 +2039,8 @@ class MtlxMaterial:
         sample_node_class = (
             "mtlximage" if not in_material_info.get("UDIM", False) else "mtlxtiledimage"
         )
-        texture_sample_node: hou.VopNode = in_parent_node.createNode(
+        texture_sample_node: hou.VopNode = self._create_node_(
+            in_parent_node,
             sample_node_class,
             in_texture_info["type"][self.PREFIX_LENGTH :] + "_sampler",
         )
@@ -1018,11 +2049,13 @@ class MtlxMaterial:
         texture_path = self._get_texture_path_(
             in_texture_info["name"], in_material_info
         )
-        texture_sample_node.parm("file")._set(texture_path)
         #print("Finish Setting Path")
-        # 设置采样节点类型
+        # 设置采样节点类型,和路径一起设置
         self._configure_texture_sample_node_(
-            in_texture_info["type"], texture_sample_node
+            in_texture_info["type"],
+            texture_sample_node,
+            texture_path,
+            self.texture_headers.get(in_texture_info["file"]),
         )
         #print("Finish configure Node")
         return texture_sample_node
@@ -1048,28 +2081,45 @@ class MtlxMaterial:
         file_name = in_material_info[in_texture_name][0]
         # inmaterialinfo中只有文件信息，没有路径信息
         if self.b_mtlTX:
-            file_name_without_extension = file_name.split(".")[0]
-            file_name = file_name_without_extension + ".tx"
+            file_name_without_extension = os.path.splitext(file_name)[0]
+            file_name = file_name_without_extension + (
+                self.tx_backend.output_extension if self.tx_backend else ".tx"
+            )
         if in_material_info.get("UDIM", True):
-            file_name = re.sub(r"\d{4}", "<UDIM>", file_name)
-        file_path = os.path.join(self.tex_folder_path, file_name).replace(os.sep, "/")
+            # 只替换作为独立字段的UDIM编号,不影响名称中的其他数字
+            file_name = texture_utils.replace_udim_token(file_name)
+        file_path = os.path.join(
+            self._get_texture_folder_(in_material_info), file_name
+        ).replace(os.sep, "/")
         #print(f"Finish Setting Path,Targte Path:{file_path}")
         return file_path
 
     def _configure_texture_sample_node_(
-        self, _in_texture_type_: str, in_sample_node: hou.OpNode
+        self,
+        _in_texture_type_: str,
+        in_sample_node: hou.OpNode,
+        in_file_path: str = None,
+        in_header: image_header.ImageHeader = None,
     ):
         if not in_sample_node:
             #print("Config Node Failed,The Node Doesn't Exist")
             return
-        sample_model = "float"
+        sample_model = self._get_sample_model_(_in_texture_type_)
         color_space = "raw"
-        # 对于BaseColor和次表面散射使用Color3 SRGB
-        if _in_texture_type_ in ("texturesColor", "texturesSSS"):
-            sample_model = "color3"
+        # 对于BaseColor和次表面散射使用Color3 SRGB,文件头表明是线性数据(例如浮点EXR)时使用线性颜色空间
+        if sample_model == "color3":
             color_space = "srgb_texture"
-        in_sample_node.parm("signature")._set(sample_model)
-        in_sample_node.parm("filecolorspace")._set(color_space)
+            if in_header is not None and (
+                in_header.is_float or in_header.color_space == "linear"
+            ):
+                color_space = "lin_rec709"
+        sample_parms = {"signature": sample_model, "filecolorspace": color_space}
+        if in_file_path is not None:
+            sample_parms["file"] = in_file_path
+        self._set_parms_(in_sample_node, sample_parms)
+
+    def _get_sample_model_(self, in_texture_type: str) -> str:
+        return "color3" if in_texture_type in ("texturesColor", "texturesSSS") else "float"
 
     def _setup_ordinary_connect_(
         self,
@@ -1078,29 +2128,36 @@ class MtlxMaterial:
         in_texture_sample_node: hou.Node,
         in_surface_node: hou.Node,
         in_connect_index: int,
+        in_output_index: int = 0,
     ):
         bis_color_type: bool = in_texture_type in ("texturesColor", "texturesSSS")
         range_node_name = in_texture_type[self.PREFIX_LENGTH :] + (
             "_CC" if bis_color_type else "_ADJ"
         )
-        range_node = in_parent_node.createNode("mtlxrange", range_node_name)
-        range_node.setInput(0, in_texture_sample_node)
+        range_node = self._create_node_(in_parent_node, "mtlxrange", range_node_name)
+        self._set_input_(range_node, 0, in_texture_sample_node, in_output_index)
+        range_parms = {}
         if bis_color_type:
-            range_node.parm("signature")._set("color3")
+            range_parms["signature"] = "color3"
             if in_texture_type == "texturesSSS":
-                in_surface_node.parm("subsurface")._set(1)
+                self._set_parms_(in_surface_node, {"subsurface": 1})
         if in_texture_type == "texturesGloss":
-            range_node.parm("outlow")._set(1)
-            range_node.parm("outhigh")._set(0)
-        in_surface_node.setInput(in_connect_index, range_node)
+            range_parms["outlow"] = 1
+            range_parms["outhigh"] = 0
+        if range_parms:
+            self._set_parms_(range_node, range_parms)
+        self._set_input_(in_surface_node, in_connect_index, range_node)
 
     def _setup_direct_connect(
         self,
         in_texture_sample_node: hou.Node,
         in_surface_node: hou.Node,
         in_connect_index: int,
+        in_output_index: int = 0,
     ):
-        in_surface_node.setInput(in_connect_index, in_texture_sample_node)
+        self._set_input_(
+            in_surface_node, in_connect_index, in_texture_sample_node, in_output_index
+        )
 
     def _setup_mask_connect(
         self,
@@ -1109,20 +2166,25 @@ class MtlxMaterial:
         in_texture_sample_node: hou.Node,
         in_surface_node: hou.Node,
     ):
-        in_parent_node.createNode(
-            "mtlxseoarate3c", in_texture_type[self.PREFIX_LENGTH :] + "_SPLIT"
+        self._create_node_(
+            in_parent_node,
+            "mtlxseoarate3c",
+            in_texture_type[self.PREFIX_LENGTH :] + "_SPLIT",
         )
-        in_surface_node.setInput(0, in_texture_sample_node)
+        self._set_input_(in_surface_node, 0, in_texture_sample_node)
 
     def _setup_displacement_connect_(
         self,
         in_texture_sample_node: hou.Node,
         in_dispalcement_node: hou.Node,
+        in_output_index: int = 0,
     ):
         # print(
         #     f"try Connect Displacement,from {in_texture_sample_node.path()} to {in_dispalcement_node.path}"
         # )
-        in_dispalcement_node.setInput(0, in_texture_sample_node)
+        self._set_input_(
+            in_dispalcement_node, 0, in_texture_sample_node, in_output_index
+        )
 
     def _connect_index_(
         self,
@@ -1132,6 +2194,7 @@ class MtlxMaterial:
         in_surface_node: hou.Node,
         in_displacement_node: hou.Node,
         in_connect_index: int,
+        in_output_index: int = 0,
     ):
 
         if in_texture_type in self.TEXTURE_TYPE_TO_INPUT_NAME.keys():
@@ -1146,6 +2209,7 @@ class MtlxMaterial:
                 in_texture_sample_node,
                 in_surface_node,
                 in_connect_index,
+                in_output_index,
             )
         # mask和user
         elif in_texture_type == "textureExtra":
@@ -1186,52 +2250,202 @@ class MtlxMaterial:
             return
 
         def _create_bump_():
-            bump_node = in_material_net_node.createNode("mtlxbump", "mtlxBump")
-            bump_image = in_material_net_node.createNode(node_type, "Bump_sampler")
-            bump_image.parm("signature")._set("float")
-            bump_image.parm("filecolorspace")._set("raw")
+            bump_node = self._create_node_(in_material_net_node, "mtlxbump", "mtlxBump")
+            bump_image = self._create_node_(in_material_net_node, node_type, "Bump_sampler")
             bump_image_path = self._get_texture_path_(
                 search_result["texturesBump"], in_material_info
             )
-            bump_image.parm("file").set(bump_image_path)
+            self._set_parms_(
+                bump_image,
+                {"signature": "float", "filecolorspace": "raw", "file": bump_image_path},
+            )
             if in_place2d_nodes and not bis_UDIM:
                 coord_index = bump_image.inputNames().index("texcoord")
-                bump_image.setInput(coord_index, in_place2d_nodes)
-            bump_node.setInput(0, bump_image)
+                self._set_input_(bump_image, coord_index, in_place2d_nodes)
+            self._set_input_(bump_node, 0, bump_image)
             return bump_node
 
         def _create_nomal_():
-            normal_node = in_material_net_node.createNode("mtlxnormalmap", "mtlxNormal")
-            normal_image = in_material_net_node.createNode(node_type, "Normal_sampler")
-            normal_image.parm("signature")._set("vector3")
-            normal_image.parm("filecolorspace")._set("raw")
+            normal_node = self._create_node_(
+                in_material_net_node, "mtlxnormalmap", "mtlxNormal"
+            )
+            normal_image = self._create_node_(
+                in_material_net_node, node_type, "Normal_sampler"
+            )
             normal_path = self._get_texture_path_(
                 search_result["texturesNormal"], in_material_info
             )
-            normal_image.parm("file").set(normal_path)
+            self._set_parms_(
+                normal_image,
+                {"signature": "vector3", "filecolorspace": "raw", "file": normal_path},
+            )
             if in_place2d_nodes and not bis_UDIM:
                 coord_index = normal_image.inputNames().index("texcoord")
-                normal_image.setInput(coord_index, in_place2d_nodes)
-            normal_node.setInput(0, normal_image)
+                self._set_input_(normal_image, coord_index, in_place2d_nodes)
+            self._set_input_(normal_node, 0, normal_image)
             return normal_node
 
         bump_nodes = None
         normal_nodes = None
         if search_result["texturesBump"]:
             bump_nodes = _create_bump_()
-            in_surface_node.setInput(normal_pin_index, bump_nodes)
+            self._set_input_(in_surface_node, normal_pin_index, bump_nodes)
         if search_result["texturesNormal"]:
             normal_nodes = _create_nomal_()
 
         if bump_nodes and normal_nodes:
             input_index = bump_nodes.inputNames().index("normal")
-            bump_nodes.setInput(input_index, normal_nodes)
+            self._set_input_(bump_nodes, input_index, normal_nodes)
             return
         elif normal_nodes:
-            in_surface_node.setInput(normal_pin_index, normal_nodes)
+            self._set_input_(in_surface_node, normal_pin_index, normal_nodes)
         return
 
 
+def add_proxy_materials(in_materials: list) -> list:
+    """
+    在每个设置了proxy_resolution的材质后面插入对应的代理材质
+    """
+    materials = []
+    for material in in_materials:
+        materials.append(material)
+        proxy_material = material.create_proxy_material()
+        if proxy_material is not None:
+            materials.append(proxy_material)
+    return materials
+
+
+def convert_materials_to_TX(
+    in_materials: list, in_progress_callback=None, in_cancel_event=None
+) -> list:
+    """
+    收集所有材质引用的纹理,去重后在一个线程池中统一转换为tx,
+    避免每个材质单独创建线程池、材质之间CPU空闲
+
+    :param in_materials: MtlxMaterial列表
+    :param in_progress_callback: 回调(已完成数量, 总数量)
+    :param in_cancel_event: threading.Event,设置后剩余纹理不再转换
+    :return: 每个纹理的tx_convert.ConvertResult
+    :rtype: list
+    """
+    if len(in_materials) == 0:
+        return []
+    texture_paths = {}
+    for material in in_materials:
+        for texture_path in material.collect_texture_paths():
+            texture_paths[texture_path] = None
+    print(
+        f"Prepare to convert {len(texture_paths)} textures for {len(in_materials)} materials"
+    )
+    logging.basicConfig(level=logging.INFO)
+
+    def on_progress(in_finished: int, in_total: int, _in_result):
+        if in_progress_callback is not None:
+            in_progress_callback(in_finished, in_total)
+
+    return in_materials[0]._convert_textures_(
+        texture_paths, on_progress, in_cancel_event
+    )
+
+
+@contextlib.contextmanager
+def bulk_build_context(in_disable_undo: bool = True):
+    """
+    批量创建节点时把更新模式切换为手动,避免每创建一个节点都触发cook和网络编辑器刷新,
+    退出时恢复原更新模式
+
+    :param in_disable_undo: 同时关闭撤销记录,用于hython和BatchMaterialBuilder;
+        界面中默认保留撤销,由调用者放在撤销组中
+    """
+    update_mode = hou.updateModeSetting()
+    hou.setUpdateMode(hou.updateMode.Manual)
+    try:
+        with hou.undos.disabler() if in_disable_undo else contextlib.nullcontext():
+            yield
+    finally:
+        hou.setUpdateMode(update_mode)
+
+
+def layout_material_nodes(in_material_nodes: list):
+    """
+    对材质subnet内部和所在的材质库各执行一次布局
+    """
+    parent_nodes = {}
+    for material_node in in_material_nodes:
+        if material_node is None:
+            continue
+        material_node.layoutChildren()
+        parent_node = material_node.parent()
+        parent_nodes[parent_node.path()] = parent_node
+    for parent_node in parent_nodes.values():
+        parent_node.layoutChildren()
+
+
+def build_materials(
+    in_materials: list,
+    in_progress_callback=None,
+    in_layout: bool = True,
+    in_release_prototypes: bool = True,
+) -> list:
+    """
+    批量模式构建材质:整个批次在bulk_build_context中执行,参数按节点合并为一次setParms,
+    基础subnet从每个材质库一份的原型复制,节点布局推迟到最后一个材质创建完成后统一执行
+
+    :param in_materials: MtlxMaterial列表
+    :param in_progress_callback: 回调(已完成数量, 总数量)
+    :param in_layout: 为False时不布局,由调用者在全部批次结束后调用layout_material_nodes
+    :param in_release_prototypes: 为False时保留材质原型供后续批次复用,
+        由调用者在全部批次结束后调用release_material_prototypes;出错时总是删除
+    :return: 与in_materials顺序一致的材质subnet,创建失败的为None
+    :rtype: list
+    """
+    material_nodes = []
+    with bulk_build_context():
+        try:
+            for index, material in enumerate(in_materials):
+                material.b_bulk_build = True
+                material_nodes.append(material.create_material())
+                if in_progress_callback is not None:
+                    in_progress_callback(index + 1, len(in_materials))
+        except BaseException:
+            release_material_prototypes()
+            raise
+        if in_release_prototypes:
+            release_material_prototypes()
+        if in_layout:
+            layout_material_nodes(material_nodes)
+    return material_nodes
+
+
+def release_material_prototypes():
+    """
+    删除批量创建时生成的材质原型
+    """
+    for prototype in _MATERIAL_PROTOTYPES.values():
+        try:
+            prototype.destroy()
+        except hou.ObjectWasDeleted:
+            pass
+    _MATERIAL_PROTOTYPES.clear()
+
+
+def summarize_op_stats(in_materials: list) -> dict:
+    """
+    汇总材质的节点/参数/连接操作次数,返回{"total": {...}, "per_material": {...}}
+    """
+    total = {}
+    for material in in_materials:
+        for key, value in material.op_stats.items():
+            total[key] = total.get(key, 0) + value
+    material_count = max(1, len(in_materials))
+    return {
+        "total": total,
+        "per_material": {
+            key: round(value / material_count, 2) for key, value in total.items()
+        },
+    }
+
+
 def ShowTexToMatTool():
     window_gui = TxToMtlx()
     window_gui.show()